@@ -226,11 +226,15 @@ class Notifier(PlaybackAdapter):
         if media_icon and self.settings.use_media_icons:
             icon_name = media_icon
         elif self.settings.show_covers:
-            cover_data = covers.MANAGER.get_cover(
-                track, set_only=True, use_default=True
-            )
-            size = DEFAULT_ICON_SIZE if self.settings.resize_covers else None
-            new_icon = pixbuf_from_data(cover_data, size)
+            if self.settings.resize_covers:
+                cover_data = covers.MANAGER.get_cover_thumbnail(
+                    track, max(DEFAULT_ICON_SIZE), set_only=True, use_default=True
+                )
+            else:
+                cover_data = covers.MANAGER.get_cover(
+                    track, set_only=True, use_default=True
+                )
+            new_icon = pixbuf_from_data(cover_data)
             self.notification.set_image_from_pixbuf(new_icon)
         return icon_name
 
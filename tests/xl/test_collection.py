@@ -0,0 +1,35 @@
+import os
+import shutil
+
+import pytest
+
+from xl import collection, settings
+
+TRACK_PATH = os.path.join(
+    os.path.dirname(__file__),
+    os.pardir,
+    'data',
+    'music',
+    'delerium',
+    'chimera',
+    '05 - Truly.mp3',
+)
+
+
+@pytest.mark.parametrize('threads', [1, 2])
+def test_rescan_large_directory(tmp_path, threads):
+    # More files than the parallel scan reads at once
+    for i in range(threads * 8 + 14):
+        shutil.copy(TRACK_PATH, str(tmp_path / ('%02d.mp3' % i)))
+
+    scan_threads = settings.get_option('collection/scan_threads', 1)
+    settings.set_option('collection/scan_threads', threads)
+    try:
+        coll = collection.Collection('test', location='')
+        library = collection.Library(tmp_path.as_uri())
+        coll.add_library(library)
+        library.rescan()
+    finally:
+        settings.set_option('collection/scan_threads', scan_threads)
+
+    assert len(coll) == threads * 8 + 14
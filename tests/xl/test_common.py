@@ -0,0 +1,43 @@
+from xl.common import MetadataList
+
+
+def _make_list():
+    l = MetadataList(range(6))
+    l.set_meta_key(1, 'a', 1)
+    l.set_meta_key(4, 'b', 2)
+    return l
+
+
+def test_metadata_list_slices():
+    l = _make_list()
+    assert l[1:5].metadata == [{'a': 1}, None, None, {'b': 2}]
+    assert l[::-2].metadata == [None, None, {'a': 1}]
+
+    l[2:4] = MetadataList(['x'], [{'c': 3}])
+    assert list(l) == [0, 1, 'x', 4, 5]
+    assert l.metadata == [None, {'a': 1}, {'c': 3}, {'b': 2}, None]
+
+    del l[::2]
+    assert list(l) == [1, 4]
+    assert l.metadata == [{'a': 1}, {'b': 2}]
+
+
+def test_metadata_list_meta_keys():
+    l = _make_list()
+    assert l.get_meta_key(-2, 'b') == 2
+    assert l.get_meta_key(0, 'b', 5) == 5
+
+    l.del_meta_key(1, 'a')
+    assert l.meta_items() == [(4, {'b': 2})]
+
+    l.pop(0)
+    l.insert(0, 'y', {'d': 4})
+    assert l.meta_items() == [(0, {'d': 4}), (4, {'b': 2})]
+
+
+def test_metadata_list_permuted():
+    l = _make_list()
+    p = l.permuted([4, 3, 2, 1, 0, 5])
+    assert list(p) == [4, 3, 2, 1, 0, 5]
+    assert p.meta_items() == [(0, {'b': 2}), (3, {'a': 1})]
+    assert l.with_items('abcdef').meta_items() == l.meta_items()
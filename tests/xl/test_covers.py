@@ -0,0 +1,190 @@
+import os
+import pickle
+import threading
+import time
+
+from xl import providers
+from xl.covers import (
+    CoverManager,
+    CoverSearchMethod,
+    LocalFileCoverFetcher,
+    ThumbnailCache,
+)
+from xl.trax import Track
+
+
+def test_thumbnail_cache(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), 1000)
+    cache.add('a', 48, b'x' * 300)
+    cache.add('a', 100, b'y' * 300)
+    assert cache.get('a', 48) == b'x' * 300
+    assert cache.get('a', 100) == b'y' * 300
+    assert cache.get('a', 300) is None
+    assert cache.get('b', 48) is None
+
+    cache.remove('a')
+    assert cache.get('a', 48) is None
+    assert cache.get('a', 100) is None
+
+
+def test_thumbnail_cache_eviction(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), 1000)
+    for i, key in enumerate('abc'):
+        cache.add(key, 48, b'x' * 300)
+        os.utime(os.path.join(str(tmp_path), '48', key), (i, i))
+    # Using a thumbnail keeps it
+    assert cache.get('a', 48) is not None
+
+    cache.add('d', 48, b'x' * 300)
+    assert cache.get('b', 48) is None
+    assert cache.get('c', 48) is None
+    assert cache.get('a', 48) is not None
+    assert cache.get('d', 48) is not None
+
+
+def test_thumbnail_cache_overwrite(tmp_path):
+    cache = ThumbnailCache(str(tmp_path), 1000)
+    for key in 'abc':
+        cache.add(key, 48, b'x' * 260)
+    # Replacing a thumbnail does not count its old size
+    cache.add('c', 48, b'y' * 260)
+    for key in 'abc':
+        assert cache.get(key, 48) is not None
+
+
+def test_cover_db_moved_to_sqlite(tmp_path):
+    with open(str(tmp_path / 'covers.db'), 'wb') as f:
+        pickle.dump({'version': 2, 'album\0a': 'cache:abc'}, f)
+
+    track = Track('file:///tmp/exaile-test-cover.mp3', scan=False)
+    track.set_tag_raw('album', 'b')
+
+    def open_manager():
+        manager = CoverManager(str(tmp_path))
+        providers.unregister('covers', manager.tag_fetcher)
+        providers.unregister('covers', manager.localfile_fetcher)
+        return manager
+
+    manager = open_manager()
+    assert manager.db.get('album\0a') == 'cache:abc'
+    manager.set_cover(track, 'localfile:file:///tmp/b.jpg')
+
+    manager = open_manager()
+    assert manager.db.get('album\0a') == 'cache:abc'
+    assert manager.get_db_string(track) == 'localfile:file:///tmp/b.jpg'
+    manager.remove_cover(track)
+
+    manager = open_manager()
+    assert manager.get_db_string(track) is None
+    assert manager.db.get('version') == CoverManager.DB_VERSION
+
+
+class FakeCoverSearch(CoverSearchMethod):
+    name = 'fake'
+    use_cache = False
+
+    def __init__(self):
+        self.searched = []
+
+    def find_covers(self, track, limit=-1):
+        album = track.get_tag_raw('album')[0]
+        self.searched.append(album)
+        return [album] if album != 'none' else []
+
+    def get_cover_data(self, db_string):
+        return db_string.encode()
+
+
+def test_get_covers(tmp_path):
+    manager = CoverManager(str(tmp_path))
+    providers.unregister('covers', manager.tag_fetcher)
+    providers.unregister('covers', manager.localfile_fetcher)
+    method = FakeCoverSearch()
+    providers.register('covers', method)
+    try:
+        tracks = []
+        for album in ['a', 'b', 'none']:
+            track = Track('file:///tmp/exaile-test-%s.mp3' % album, scan=False)
+            track.set_tag_raw('album', album)
+            tracks.append(track)
+
+        covers = dict(manager.get_covers(tracks))
+        assert covers == {tracks[0]: b'a', tracks[1]: b'b', tracks[2]: None}
+        assert manager.get_db_string(tracks[0]) == 'fake:a'
+
+        # Albums without a cover are not searched again until it expires
+        del method.searched[:]
+        assert list(manager.get_covers(tracks[2:])) == [(tracks[2], None)]
+        assert method.searched == []
+
+        key = manager._get_track_key(tracks[2])
+        expired = manager.missing[key] - CoverManager.MISSING_COVER_EXPIRY
+        manager.missing[key] = expired
+        list(manager.get_covers(tracks[2:]))
+        assert manager.missing[key] > expired
+
+        # Fetching a single cover always searches
+        track = Track('file:///tmp/exaile-test-c.mp3', scan=False)
+        track.set_tag_raw('album', 'c')
+        manager.missing[manager._get_track_key(track)] = time.time()
+        assert list(manager.get_covers([track])) == [(track, None)]
+        assert manager.get_cover(track, save_cover=False) == b'c'
+
+        # Only new methods may find the albums without covers
+        manager.on_provider_added(method)
+        assert key in manager.missing
+        # Removing a method does not make covers appear
+        providers.unregister('covers', method)
+        assert key in manager.missing
+        providers.register('covers', method)
+        assert key not in manager.missing
+
+        stopper = threading.Event()
+        stopper.set()
+        assert list(manager.get_covers(tracks, stopper=stopper)) == []
+    finally:
+        providers.unregister('covers', method)
+
+
+def test_localfile_listing_cache(tmp_path):
+    for name in ['front.jpg', 'cover.png', 'notes.txt', 'track.mp3']:
+        (tmp_path / name).write_bytes(b'x')
+    os.utime(str(tmp_path), (1000, 1000))
+    track = Track((tmp_path / 'track.mp3').as_uri(), scan=False)
+
+    fetcher = LocalFileCoverFetcher()
+    expected = [(tmp_path / 'cover.png').as_uri(), (tmp_path / 'front.jpg').as_uri()]
+    assert fetcher.find_covers(track) == expected
+
+    # The listing is reused while the directory's mtime is the same
+    (tmp_path / 'back.jpg').write_bytes(b'x')
+    os.utime(str(tmp_path), (1000, 1000))
+    assert fetcher.find_covers(track) == expected
+
+    os.utime(str(tmp_path), (2000, 2000))
+    assert sorted(fetcher.find_covers(track)) == sorted(
+        expected + [(tmp_path / 'back.jpg').as_uri()]
+    )
+
+
+def test_localfile_listing_cache_lru(tmp_path):
+    tracks = {}
+    for album in 'abc':
+        (tmp_path / album).mkdir()
+        (tmp_path / album / 'cover.jpg').write_bytes(b'x')
+        os.utime(str(tmp_path / album), (1000, 1000))
+        tracks[album] = Track((tmp_path / album / 'track.mp3').as_uri(), scan=False)
+
+    fetcher = LocalFileCoverFetcher()
+    fetcher.LISTING_CACHE_SIZE = 2
+    fetcher.find_covers(tracks['a'])
+    fetcher.find_covers(tracks['b'])
+    # Using a listing keeps it
+    fetcher.find_covers(tracks['a'])
+    fetcher.find_covers(tracks['c'])
+
+    for album in 'ab':
+        (tmp_path / album / 'front.jpg').write_bytes(b'x')
+        os.utime(str(tmp_path / album), (1000, 1000))
+    assert len(fetcher.find_covers(tracks['a'])) == 1
+    assert len(fetcher.find_covers(tracks['b'])) == 2
@@ -0,0 +1,29 @@
+from xl.dynamic import DynamicManager
+from xl.trax import Track
+from xl.trax.trackdb import TrackDB
+
+
+def test_find_similar_tracks(test_tracks, tmp_path):
+    tracks = [Track(test_tracks.get(ext).filename) for ext in ('.aac', '.flac', '.mp3')]
+    for track, artist in zip(tracks, ('Foo', 'foo', 'Bar "Baz"')):
+        track.set_tag_raw('artist', artist, notify_changed=False)
+    db = TrackDB()
+    db.add_tracks(tracks)
+
+    manager = DynamicManager(db)
+    manager.cache_location = str(tmp_path / 'dynamic.cache')
+    found = manager.find_artist_tracks(['FOO', 'Bar "Baz"', 'none'])
+    assert {artist: set(found[artist]) for artist in found} == {
+        'FOO': set(tracks[:2]),
+        'Bar "Baz"': {tracks[2]},
+        'none': set(),
+    }
+
+    seed = Track('file:///tmp/exaile-test-seed.mp3', scan=False)
+    seed.set_tag_raw('artist', 'seed')
+    manager._save_info(seed, [(0.9, 'foo'), (0.5, 'Bar "Baz"')])
+    assert manager.find_similar_artists(seed) == [(0.9, 'foo'), (0.5, 'Bar "Baz"')]
+
+    similar = manager.find_similar_tracks(seed, exclude=[tracks[0]])
+    assert sorted(similar, key=tracks.index) == tracks[1:]
+    manager.on_quit_application()
@@ -96,3 +96,84 @@ def test_thread_events():
     ncb.destroy()
 
     _finish_events()
+
+
+class BatchCallback:
+    def __init__(self, ui=False):
+        self.batches = []
+        if ui:
+            event.add_ui_batch_callback(self.on_cb, 'test')
+        else:
+            event.add_batch_callback(self.on_cb, 'test')
+
+    def destroy(self):
+        event.remove_callback(self.on_cb, 'test')
+
+    def on_cb(self, type, events):
+        self.batches.append([(e.object, e.data) for e in events])
+
+
+def test_batch_events():
+    _init_events()
+    bcb = BatchCallback()
+    ncb = NormalCallback()
+
+    on_ui_thread[0] = True
+    event.log_event('test', ncb, 0)
+    assert bcb.batches == [[(ncb, 0)]]
+
+    with event.batch():
+        event.log_event('test', ncb, 1)
+        assert ncb.called is True
+        with event.batch():
+            event.log_event('test', ncb, 2)
+        event.log_event('other', ncb, 3)
+        assert len(bcb.batches) == 1
+    assert bcb.batches == [[(ncb, 0)], [(ncb, 1), (ncb, 2)]]
+
+    bcb.destroy()
+    ncb.destroy()
+
+    _finish_events()
+    assert len(event.EVENT_MANAGER.all_batch_callbacks) == 0
+
+
+def test_thread_batch_events():
+    _init_events()
+    ucb = BatchCallback(ui=True)
+    bcb = BatchCallback()
+
+    def _run():
+        on_ui_thread[0] = False
+        with event.batch():
+            event.log_event('test', bcb, 1)
+            event.log_event('test', bcb, 2)
+
+    t = threading.Thread(target=_run)
+    t.start()
+    t.join()
+
+    assert ucb.batches == bcb.batches == [[(bcb, 1), (bcb, 2)]]
+
+    ucb.destroy()
+    bcb.destroy()
+
+    _finish_events()
+
+
+def test_callbacks_added_later():
+    _init_events()
+    ncb = NormalCallback()
+    event.log_event('test', ncb, None)
+
+    other = NormalCallback()
+    event.log_event('test', ncb, None)
+    assert other.called is True
+
+    other.destroy()
+    other.called = False
+    event.log_event('test', ncb, None)
+    assert other.called is False
+
+    ncb.destroy()
+    _finish_events()
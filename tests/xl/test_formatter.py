@@ -0,0 +1,27 @@
+from xl.formatter import Formatter, TrackFormatter
+from xl.trax import Track
+
+
+def test_format_parameters():
+    formatter = Formatter('$$${a:prefix=[, suffix=]} ${b:pad=3, padstring=0} $c $a')
+    formatter._substitutions = {'a': 'x', 'b': lambda: '7'}
+    assert formatter.format() == '$[x] 007 $c x'
+    assert formatter.extract()['b:pad=3, padstring=0'] == (
+        'b',
+        {'pad': '3', 'padstring': '0'},
+    )
+
+
+def test_format_many():
+    tracks = [Track('file:///tmp/exaile-test-%d.mp3' % i, scan=False) for i in range(3)]
+    for i, track in enumerate(tracks):
+        track.set_tag_raw('title', 'title %d' % i)
+        track.set_tag_raw('tracknumber', '%d/3' % (i + 1))
+
+    formatter = TrackFormatter('${tracknumber:pad=2, padstring=0}. $title')
+    assert formatter.format(tracks[0]) == '01. title 0'
+    assert formatter.format_many(tracks) == [
+        '01. title 0',
+        '02. title 1',
+        '03. title 2',
+    ]
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+
+import pytest
+
+from xl.playlist import Playlist
+from xl.trax.track import Track
+
+
+@pytest.fixture
+def tracks():
+    return [Track('file:///tmp/exaile-test-%d.mp3' % i, scan=False) for i in range(6)]
+
+
+def test_positions_follow_changes(tracks):
+    pl = Playlist('test', tracks[:4])
+    pl.current_position = 1
+    pl.spat_position = 2
+
+    pl[0:0] = [tracks[4]]
+    assert (pl.current_position, pl.spat_position) == (2, 3)
+
+    pl.append(tracks[5])
+    assert (pl.current_position, pl.spat_position) == (2, 3)
+
+    del pl[-1]
+    del pl[0]
+    assert (pl.current_position, pl.spat_position) == (1, 2)
+
+    del pl[2]
+    assert (pl.current_position, pl.spat_position) == (1, -1)
+
+
+def test_positions_follow_tracks_when_sorting(tracks):
+    for i, track in enumerate(tracks):
+        track.set_tag_raw('title', str(len(tracks) - i), notify_changed=False)
+    pl = Playlist('test', tracks)
+    pl.spat_position = 1
+
+    pl.sort(['title'])
+    assert pl[pl.spat_position] is tracks[1]
+
+
+def test_shuffle_plays_every_track_once(tracks):
+    pl = Playlist('test', tracks[:4])
+    pl.shuffle_mode = 'track'
+    pl.current_position = 0
+
+    played = [pl.current]
+    while pl.next() is not None:
+        played.append(pl.current)
+        if len(played) == 2:
+            pl.extend(tracks[4:])
+    assert sorted(played, key=tracks.index) == tracks
+
+
+def test_shuffle_albums_in_track_order(tracks):
+    for i, track in enumerate(tracks):
+        track.set_tag_raw('album', 'ab'[i % 2], notify_changed=False)
+        track.set_tag_raw('tracknumber', str(i), notify_changed=False)
+    pl = Playlist('test', tracks)
+    pl.shuffle_mode = 'album'
+
+    played = []
+    while pl.next() is not None:
+        played.append(pl.current)
+    assert played in (
+        tracks[0::2] + tracks[1::2],
+        tracks[1::2] + tracks[0::2],
+    )
+
+
+def test_load_uses_saved_tags(tracks, tmp_path):
+    location = str(tmp_path / 'playlist')
+    tracks[0].set_tag_raw('title', 'known', notify_changed=False)
+    tracks[1].set_tag_raw('title', 'saved', notify_changed=False)
+    Playlist('test', tracks[:2]).save_to_location(location)
+
+    uri = tracks[1].get_loc_for_io()
+    del tracks[1:]
+    assert Track.get_existing(uri) is None
+    # Tracks loaded already keep their tags
+    tracks[0].set_tag_raw('title', 'newer', notify_changed=False)
+
+    pl = Playlist('loaded')
+    pl.load_from_location(location)
+    assert pl[0] is tracks[0]
+    assert pl[0].get_tag_raw('title') == ['newer']
+    assert pl[1].get_loc_for_io() == uri
+    assert pl[1].get_tag_raw('title') == ['saved']
+    assert pl.name == 'test'
+
+
+@pytest.fixture
+def collection_tracks(test_tracks):
+    return [
+        Track(test_tracks.get(ext).filename)
+        for ext in ('.aac', '.aiff', '.flac', '.mp3', '.mp4')
+    ]
+
+
+def test_smart_playlist_follows_collection(collection_tracks):
+    from xl.playlist import SmartPlaylist
+    from xl.trax.trackdb import TrackDB
+
+    tracks = collection_tracks
+    for track in tracks:
+        track.set_tag_raw('artist', 'other', notify_changed=False)
+    tracks[0].set_tag_raw('artist', 'foo', notify_changed=False)
+    db = TrackDB()
+    db.add_tracks(tracks[:3])
+    sp = SmartPlaylist('foo', collection=db)
+    sp.add_param('artist', '==', 'foo')
+    assert list(sp.get_playlist()) == [tracks[0]]
+
+    tracks[1].set_tag_raw('artist', 'foo')
+    tracks[4].set_tag_raw('artist', 'foo')
+    db.add_tracks(tracks[3:])
+    db.remove_tracks([tracks[0]])
+    assert set(sp.get_playlist()) == {tracks[1], tracks[4]}
+
+
+def test_smart_playlist_cycle(collection_tracks):
+    from xl.playlist import SmartPlaylist
+    from xl.trax.trackdb import TrackDB
+
+    class Playlists:
+        def get_playlist(self, name):
+            raise ValueError(name)
+
+    class SmartPlaylists:
+        def get_playlist(self, name):
+            sp = SmartPlaylist(name, collection=db)
+            sp.add_param('__playlist', 'pin', name)
+            return sp
+
+    class Exaile:
+        playlists = Playlists()
+        smart_playlists = SmartPlaylists()
+
+    db = TrackDB()
+    db.add_tracks(collection_tracks)
+    with patch('xl.main.exaile', return_value=Exaile()):
+        with pytest.raises(ValueError):
+            Exaile.smart_playlists.get_playlist('loop').get_playlist()
@@ -0,0 +1,37 @@
+from xl.settings import SettingsManager
+
+
+def test_get_option_cached():
+    settings = SettingsManager(None)
+    assert settings.get_option('test/value', 5) == 5
+
+    settings.set_option('test/value', 1, save=False)
+    assert settings.get_option('test/value', 5) == 1
+    assert settings.get_option('test/value', 5) == 1
+
+    settings.set_option('test/Value', 2, save=False)
+    assert settings.get_option('test/value') == 2
+
+    settings.remove_option('test/value')
+    assert settings.get_option('test/value', 5) == 5
+
+
+def test_get_option_copies_lists():
+    settings = SettingsManager(None)
+    settings.set_option('test/list', ['a', ['b']], save=False)
+
+    value = settings.get_option('test/list')
+    value.append('c')
+    value[1].append('d')
+    assert settings.get_option('test/list') == ['a', ['b']]
+
+
+def test_copy_settings_invalidates():
+    settings = SettingsManager(None)
+    settings.set_option('test/value', 'old', save=False)
+    other = SettingsManager(None)
+    other.set_option('test/value', 'new', save=False)
+    assert settings.get_option('test/value') == 'old'
+
+    other.copy_settings(settings)
+    assert settings.get_option('test/value') == 'new'
@@ -108,3 +108,14 @@ def test_context_manager():
             pass
         with pytest.raises(Exception):
             len(db)
+
+
+def test_wal():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        dbpath = os.path.join(tmpdir, "music.db")
+
+        with sqlitedbm.SqliteDbm(dbpath, autocommit=False, wal=True) as db:
+            db[b'key1'] = b'value1'
+        with sqlitedbm.SqliteDbm(dbpath, mode='ro') as db:
+            assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert db[b'key1'] == b'value1'
@@ -421,3 +421,62 @@ class TestSearchTracks:
         assert next(gen).track == tracks[2]
         with pytest.raises(StopIteration):
             next(gen)
+
+
+class TestTagIndex:
+    def setup_method(self):
+        self.tracks = [track.Track(x) for x in ('foo', 'bar', 'baz', 'quux')]
+        self.tracks[0].set_tag_raw('artist', 'Foooo')
+        self.tracks[1].set_tag_raw('artist', ['Bar', 'foo'])
+        self.tracks[2].set_tag_raw('artist', 'foooooo')
+        self.index = search.TagIndex(lambda: self.tracks)
+
+    def test_lookup(self):
+        assert self.index.lookup('artist', 'foooo') == {self.tracks[0]}
+        assert self.index.lookup('artist', 'FOO') == {self.tracks[1]}
+        assert self.index.lookup('artist', 'nothing') == set()
+
+    def test_find(self):
+        assert self.index.find('artist', 'fooo') == {self.tracks[0], self.tracks[2]}
+
+    def test_update(self):
+        self.index.lookup('artist', 'foo')
+        self.tracks[0].set_tag_raw('artist', 'quux')
+        self.index.update_track(self.tracks[0])
+        assert self.index.lookup('artist', 'quux') == {self.tracks[0]}
+        assert self.index.lookup('artist', 'foooo') == set()
+
+        self.index.remove_tracks([self.tracks[2]])
+        assert self.index.find('artist', 'fooo') == set()
+        self.index.add_tracks([self.tracks[2]])
+        assert self.index.find('artist', 'fooo') == {self.tracks[2]}
+
+    @pytest.mark.parametrize(
+        "sstr",
+        [
+            "foo",
+            "artist=foo",
+            "artist==foo",
+            "artist==Foooo",
+            "! foo",
+            "foo | bar",
+            "( artist=ba | artist=quux ) foo",
+            "artist~^f",
+            "artist==__null__",
+        ],
+    )
+    @pytest.mark.parametrize("case_sensitive", [True, False])
+    def test_search_same_results(self, sstr, case_sensitive):
+        def search_with(index):
+            return [
+                srtr.track
+                for srtr in search.search_tracks_from_string(
+                    self.tracks,
+                    sstr,
+                    case_sensitive=case_sensitive,
+                    keyword_tags=['artist'],
+                    index=index,
+                )
+            ]
+
+        assert search_with(self.index) == search_with(None)
@@ -81,7 +81,14 @@ def random_str(l=8):
 
 class TestTrack:
     def verify_tags_exist(self, tr, test_track, deleted=None):
-        internal_tags = {'__length', '__modified', '__basedir', '__basename', '__loc'}
+        internal_tags = {
+            '__length',
+            '__modified',
+            '__filesize',
+            '__basedir',
+            '__basename',
+            '__loc',
+        }
         if test_track.ext not in ['aac', 'spx']:
             internal_tags.add('__bitrate')
 
@@ -162,6 +169,19 @@ class TestTrack:
         tr = track.Track(test_track.filename)
         assert tr.get_size() == test_track.size
 
+    def test_unchanged_by_mtime_and_size(self, test_track):
+        tr = track.Track(test_track.filename)
+        mtime = tr.get_tag_raw('__modified')
+        assert tr.get_tag_raw('__filesize') == test_track.size
+        assert tr._is_unchanged(mtime, test_track.size)
+        assert not tr._is_unchanged(mtime + 1, test_track.size)
+        # Rewritten within the same second
+        assert not tr._is_unchanged(mtime, test_track.size + 1)
+
+        # Tracks read by older versions have no size
+        tr.set_tag_raw('__filesize', None)
+        assert tr._is_unchanged(mtime, test_track.size + 1)
+
     def test_str(self, test_track):
         loc = test_track.filename
         tr = track.Track(loc)
@@ -472,6 +492,45 @@ class TestTrack:
         tr.set_tag_raw('coverart', val)
         assert tr.get_tag_sort('coverart') == ret
 
+    def test_get_sort_tag_cached(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', 'foo')
+        assert tr.get_tag_sort('artist') == 'foo foo foo foo'
+        assert tr._keys
+        tr.set_tag_raw('artist', 'bar')
+        assert tr.get_tag_sort('artist') == 'bar bar bar bar'
+
+        keys = tr._get_keys()
+        tr2 = track.Track('/bar')
+        tr2._set_keys(keys)
+        assert tr2.get_tag_sort('artist') == 'bar bar bar bar'
+
+    def test_get_search_tag_cached_copy(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', ['foo', 'bar'])
+        tr._set_saved()
+        values = tr.get_tag_search('artist', format=False)
+        values.append('baz')
+        assert tr.get_tag_search('artist', format=False) == ['foo', 'bar']
+        # Caching new values doesn't make the track need saving
+        assert tr not in track.Track._get_unsaved_key_tracks()
+
+    def test_get_sort_tag_cached_cuts(self):
+        tr = track.Track('/foo')
+        tr.set_tag_raw('artist', 'the foo')
+        strip_list = settings.get_option('collection/strip_list', [])
+        try:
+            settings.set_option('collection/strip_list', [])
+            track.Track._the_cuts_cb(None, None, 'collection/strip_list')
+            assert tr.get_tag_sort('artist') == 'the foo the foo the foo the foo'
+
+            settings.set_option('collection/strip_list', ['the'])
+            track.Track._the_cuts_cb(None, None, 'collection/strip_list')
+            assert tr.get_tag_sort('artist') == 'foo the foo the foo the foo'
+        finally:
+            settings.set_option('collection/strip_list', strip_list)
+            track.Track._the_cuts_cb(None, None, 'collection/strip_list')
+
     ## Display Tags
     def test_get_display_tag_loc(self):
         import sys
@@ -0,0 +1,234 @@
+import os.path
+import tempfile
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from xl.trax.track import Track
+from xl.trax.search import search_tracks_from_string
+from xl.trax.trackdb import TrackDB
+
+
+@pytest.fixture
+def dbpath():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        yield os.path.join(tmpdir, "music.db")
+
+
+def _make_db(dbpath, test_tracks, exts, **kwargs):
+    db = TrackDB(location=dbpath, **kwargs)
+    db.add_tracks([Track(test_tracks.get(ext).filename) for ext in exts])
+    db.save_to_location()
+    return db
+
+
+@pytest.mark.parametrize('engine', ['shelve', 'sqlite'])
+def test_save_and_load(dbpath, test_tracks, engine):
+    db = _make_db(dbpath, test_tracks, ['.mp3', '.ogg'], engine=engine)
+    tags = {tr.get_loc_for_io(): tr._pickles() for tr in db}
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine=engine)
+    assert {tr.get_loc_for_io(): tr._pickles() for tr in db} == tags
+
+
+def test_switch_engine(dbpath, test_tracks):
+    db = _make_db(dbpath, test_tracks, ['.mp3'], engine='shelve')
+    tags = [tr._pickles() for tr in db]
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='sqlite')
+    assert [tr._pickles() for tr in db] == tags
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='shelve')
+    assert [tr._pickles() for tr in db] == tags
+
+
+def test_lazy_load(dbpath, test_tracks):
+    db = _make_db(dbpath, test_tracks, ['.mp3', '.ogg'], engine='sqlite')
+    tags = {tr.get_loc_for_io(): tr._pickles() for tr in db}
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='sqlite', lazy_cache_size=1)
+    first, second = db.get_tracks()
+    assert first._loader is not None and second._loader is not None
+
+    assert first._pickles() == tags[first.get_loc_for_io()]
+    assert first._loader is None
+    assert Track(first.get_loc_for_io()) is first
+
+    # Loading another track unloads the first one again
+    assert second._pickles() == tags[second.get_loc_for_io()]
+    assert first._loader is not None
+    assert first.get_tag_raw('title') == tags[first.get_loc_for_io()]['title']
+
+
+def test_lazy_unloads_least_recently_used(dbpath, test_tracks):
+    _make_db(dbpath, test_tracks, ['.mp3', '.ogg', '.flac'], engine='sqlite')
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='sqlite', lazy_cache_size=2)
+    first, second, third = db.get_tracks()
+    first.get_tag_raw('title')
+    second.get_tag_raw('title')
+    # Using the first track again makes the second one the oldest
+    first.get_tag_raw('title')
+    third.get_tag_raw('title')
+    assert first._loader is None
+    assert second._loader is not None
+
+
+def test_lazy_keeps_changes(dbpath, test_tracks):
+    _make_db(dbpath, test_tracks, ['.mp3', '.ogg'], engine='sqlite')
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='sqlite', lazy_cache_size=1)
+    first, second = db.get_tracks()
+    first.set_tags(title='changed')
+    second.get_tag_raw('title')
+    assert first._loader is None  # dirty, so not unloaded
+
+    db.save_to_location()
+    Track._Track__tracksdict.clear()
+    db = TrackDB(location=dbpath, engine='sqlite', lazy_cache_size=1)
+    assert db.get_track_by_loc(first.get_loc_for_io()).get_tag_raw('title') == [
+        'changed'
+    ]
+
+
+def test_lazy_skips_tracks_being_changed(dbpath, test_tracks):
+    _make_db(dbpath, test_tracks, ['.mp3', '.ogg'], engine='sqlite')
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine='sqlite', lazy_cache_size=1)
+    first, second = db.get_tracks()
+    first.get_tag_raw('title')
+
+    # Another thread is in the middle of changing a track's tags
+    edit_lock = Track._Track__edit_lock
+    locked = threading.Event()
+    release = threading.Event()
+
+    def change():
+        with edit_lock:
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=change)
+    thread.start()
+    locked.wait()
+    try:
+        second.get_tag_raw('title')
+        assert first._loader is None
+    finally:
+        release.set()
+        thread.join()
+
+
+@pytest.mark.parametrize('engine', ['shelve', 'sqlite'])
+def test_save_writes_only_changes(dbpath, test_tracks, engine):
+    db = _make_db(dbpath, test_tracks, ['.mp3', '.ogg', '.flac'], engine=engine)
+    assert db._prepare_save() is None
+
+    first, second, third = db.get_tracks()
+    first.set_tags(title='changed')
+    db.remove(third)
+    pending = db._prepare_save()
+    assert [row[0] for row in pending.rows] == [db.tracks[first.get_loc_for_io()]._key]
+    assert len(pending.deleted_keys) == 1
+    db._write_save(pending)
+    assert db._prepare_save() is None
+
+    Track._Track__tracksdict.clear()
+    db = TrackDB(location=dbpath, engine=engine)
+    assert len(db) == 2
+    assert db.get_track_by_loc(first.get_loc_for_io()).get_tag_raw('title') == [
+        'changed'
+    ]
+
+
+def test_failed_save_is_rolled_back(dbpath, test_tracks):
+    db = _make_db(dbpath, test_tracks, ['.mp3', '.ogg'], engine='shelve')
+    first, second = db.get_tracks()
+    first.set_tags(title='changed')
+    second.set_tags(title='changed')
+    pending = db._prepare_save()
+    # Writing the second track fails
+    pending.rows[1] = (pending.rows[1][0], lambda: None, {})
+    db._write_save(pending)
+    assert db._prepare_save() is not None
+
+    Track._Track__tracksdict.clear()
+    db = TrackDB(location=dbpath, engine='shelve')
+    assert all(tr.get_tag_raw('title') != ['changed'] for tr in db.get_tracks())
+
+
+@pytest.mark.parametrize('engine', ['shelve', 'sqlite'])
+def test_save_copy_keeps_changes(dbpath, test_tracks, engine):
+    db = _make_db(dbpath, test_tracks, ['.mp3'], engine=engine)
+    (track,) = db.get_tracks()
+    track.set_tags(title='changed')
+    db.save_to_location(dbpath + '.copy')
+    # Still unsaved in the db's own location
+    pending = db._prepare_save()
+    assert [row[0] for row in pending.rows] == [db.tracks[track.get_loc_for_io()]._key]
+
+
+def test_saves_written_in_order(dbpath, test_tracks):
+    db = _make_db(dbpath, test_tracks, ['.mp3'], engine='sqlite')
+    (track,) = db.get_tracks()
+    track.set_tags(title='old')
+    older = db._prepare_save()
+    track.set_tags(title='new')
+    newer = db._prepare_save()
+
+    # The newer save waits until the older one is written
+    thread = threading.Thread(target=db._write_save, args=(newer,))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+    db._write_save(older)
+    thread.join()
+
+    Track._Track__tracksdict.clear()
+    db = TrackDB(location=dbpath, engine='sqlite')
+    assert db.get_track_by_loc(track.get_loc_for_io()).get_tag_raw('title') == ['new']
+
+
+def test_search_uses_tag_index(test_tracks):
+    db = TrackDB()
+    tracks = [Track(test_tracks.get(ext).filename) for ext in ('.mp3', '.ogg')]
+    db.add_tracks(tracks)
+
+    def search(query):
+        return [srtr.track for srtr in search_tracks_from_string(db, query)]
+
+    assert search('artist==foo') == []
+    tracks[0].set_tag_raw('artist', 'foo')
+    assert search('artist==foo') == [tracks[0]]
+
+    db.remove_tracks([tracks[0]])
+    assert search('artist==foo') == []
+
+    # Only the index's candidates are looked at
+    tracks[1].set_tag_raw('artist', 'foo')
+    with patch.object(TrackDB, '__iter__', side_effect=AssertionError):
+        assert search('artist==foo') == [tracks[1]]
+
+
+@pytest.mark.parametrize('engine', ['shelve', 'sqlite'])
+def test_save_sort_keys(dbpath, test_tracks, engine):
+    db = _make_db(dbpath, test_tracks, ['.mp3'], engine=engine)
+    (tr,) = db.get_tracks()
+    # Cached values are saved with the track's next change
+    tr.set_tags(title='changed')
+    sort_value = tr.get_tag_sort('artist')
+    db.save_to_location()
+    Track._Track__tracksdict.clear()
+
+    db = TrackDB(location=dbpath, engine=engine)
+    (tr,) = db.get_tracks()
+    assert tr._keys
+    assert tr.get_tag_sort('artist') == sort_value
@@ -0,0 +1,88 @@
+import os.path
+import shelve
+import tempfile
+
+from xl import common, sqlitedbm
+from xl.migrations.database import to_normalized
+from xl.trax.trackstore import SqliteTrackStore
+
+TAGS = {
+    '__loc': 'file:///music/a.ogg',
+    'artist': ['Artist'],
+    'title': ['Title'],
+    'genre': ['Rock', 'Pop'],
+    'comment': ['rare tag'],
+    'album': None,
+    '__bitrate': '128000',
+    '__length': 181.5,
+    '__playcount': 3,
+    '__compilation': ('/music', 'album'),
+}
+
+
+def test_roundtrip():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        dbpath = os.path.join(tmpdir, "music.db")
+
+        with SqliteTrackStore(dbpath) as store, store.transaction():
+            store.put_track(4, TAGS, {'extra': 1})
+            store.set_meta('name', 'Collection')
+
+        assert SqliteTrackStore.is_track_store(dbpath)
+        with SqliteTrackStore(dbpath) as store:
+            assert list(store.iter_tracks()) == [(4, TAGS, {'extra': 1})]
+            assert list(store.iter_handles()) == [(4, TAGS['__loc'], {'extra': 1})]
+            assert store.get_track(4) == (TAGS, {'extra': 1})
+            assert store.get_track(5) is None
+            assert store.get_meta('name') == 'Collection'
+            assert store.keys() == {4}
+
+
+def test_replace_and_delete():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        dbpath = os.path.join(tmpdir, "music.db")
+
+        with SqliteTrackStore(dbpath) as store:
+            store.put_track(1, TAGS)
+            store.put_track(1, {'__loc': TAGS['__loc'], 'artist': ['Other']})
+            store.commit()
+            assert store.get_track(1) == (
+                {'__loc': TAGS['__loc'], 'artist': ['Other']},
+                {},
+            )
+            store.delete_tracks([1])
+            store.commit()
+            assert len(store) == 0
+
+
+def test_not_a_track_store():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        dbpath = os.path.join(tmpdir, "music.db")
+
+        assert not SqliteTrackStore.is_track_store(dbpath)
+        sqlitedbm.SqliteDbm(dbpath).close()
+        assert not SqliteTrackStore.is_track_store(dbpath)
+
+
+def test_migration_roundtrip():
+    with tempfile.TemporaryDirectory(prefix="exaile-") as tmpdir:
+        dbpath = os.path.join(tmpdir, "music.db")
+
+        with common.open_shelf(dbpath) as db:
+            db['tracks-7'] = (TAGS, 7, {})
+            db['name'] = 'Collection'
+            db['_dbversion'] = 2.0
+
+        assert to_normalized.migrate(dbpath)
+        with SqliteTrackStore(dbpath) as store:
+            assert list(store.iter_tracks()) == [(7, TAGS, {})]
+            assert store.get_meta('_dbversion') == 2.0
+
+        assert to_normalized.revert(dbpath)
+        assert not SqliteTrackStore.is_track_store(dbpath)
+        with common.open_shelf(dbpath) as db:
+            assert dict(db.items()) == {
+                'tracks-7': (TAGS, 7, {}),
+                'name': 'Collection',
+                '_dbversion': 2.0,
+            }
@@ -0,0 +1,43 @@
+from unittest.mock import MagicMock, patch
+
+from xl.playlist import Playlist
+from xl.trax import Track
+from xlgui.widgets.playlist import VirtualPlaylistModel
+
+
+def _make_model(tracks):
+    with patch.object(VirtualPlaylistModel, '_setup_icons'):
+        return VirtualPlaylistModel(Playlist('test', tracks), [], MagicMock(), None)
+
+
+def _make_tracks(count):
+    return [Track('/tmp/exaile-test-%d.mp3' % i, scan=False) for i in range(count)]
+
+
+def test_virtual_model_walk():
+    tracks = _make_tracks(3)
+    model = _make_model(tracks)
+    assert [row[model.COL_TRACK] for row in model] == tracks
+
+    assert model.iter_next(model.iter_nth_child(None, 2)) is None
+    itr = model.iter_previous(model.iter_nth_child(None, 1))
+    assert model.get_path(itr).get_indices() == [0]
+    assert model.iter_previous(itr) is None
+
+
+def test_virtual_model_tags_changed():
+    tracks = _make_tracks(3)
+    model = _make_model(tracks + [tracks[0]])
+    changed = []
+    model.connect('row-changed', lambda model, path, itr: changed.append(path[0]))
+
+    model._redraw_queue = [tracks[0]]
+    model._on_track_tags_changed()
+    assert changed == [0, 3]
+
+    # Rows added at the end are found too
+    model.on_tracks_added(None, model.playlist, [(4, tracks[1])])
+    del changed[:]
+    model._redraw_queue = [tracks[1]]
+    model._on_track_tags_changed()
+    assert changed == [1, 4]
@@ -35,9 +35,21 @@ collection.
 """
 
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import logging
 import threading
-from typing import Deque, Dict, Iterable, List, MutableSequence, Optional, Set, Tuple
+import time
+from typing import (
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Optional,
+    Set,
+    Tuple,
+)
 
 from gi.repository import (
     GLib,
@@ -139,8 +151,19 @@ class Collection(trax.TrackDB):
         self._running_total_count = 0
         self._frozen = False
         self._libraries_dirty = False
-        pickle_attrs += ['_serial_libraries']
-        trax.TrackDB.__init__(self, name, location=location, pickle_attrs=pickle_attrs)
+        #: Directory fingerprints of the last scan of each library, see
+        #: _LibraryWalk. The dicts are replaced, not modified, so that they
+        #: can be saved while a scan is running.
+        self._dir_fingerprints: Dict[str, Dict[str, Tuple]] = {}
+        pickle_attrs += ['_serial_libraries', '_dir_fingerprints']
+        trax.TrackDB.__init__(
+            self,
+            name,
+            location=location,
+            pickle_attrs=pickle_attrs,
+            engine=settings.get_option('collection/database_engine', 'shelve'),
+            lazy_cache_size=settings.get_option('collection/lazy_track_cache_size', 0),
+        )
         COLLECTIONS.add(self)
 
     def freeze_libraries(self) -> None:
@@ -196,6 +219,11 @@ class Collection(trax.TrackDB):
                 del self.libraries[k]
                 break
 
+        if library.location in self._dir_fingerprints:
+            fingerprints = dict(self._dir_fingerprints)
+            del fingerprints[library.location]
+            self._dir_fingerprints = fingerprints
+
         to_rem = []
         if "://" not in library.location:
             location = "file://" + library.location
@@ -519,6 +547,129 @@ class LibraryMonitor(GObject.Object):
                 self.emit('location-removed', directory)
 
 
+class _LibraryWalk:
+    """
+    Walks a library like :func:`common.walk_with_info`, but skips the files
+    of directories that did not change since the last scan.
+
+    A directory is unchanged if its modification time and number of entries
+    are the same as in its fingerprint from the last scan. Unchanged
+    directories are only counted, not enumerated with file attributes; their
+    known subdirectories are walked as usual. Files that are modified in
+    place, without touching their directory, are not noticed in unchanged
+    directories; a forced rescan (no fingerprints) reads everything.
+
+    For each enumerated directory, a ``library_directory_listed`` event is
+    emitted with a (directory URI, mtime, regular file names) tuple, so that
+    e.g. :class:`xl.covers.LocalFileCoverFetcher` can reuse the listing.
+    """
+
+    #: Directories with entries modified less than this many seconds before
+    #: the walk get no fingerprint, since files in them may still be written
+    RECENT_SECONDS = 60
+
+    def __init__(self, root: Gio.File, fingerprints: Dict[str, Tuple]):
+        """
+        :param root: the library directory
+        :param fingerprints: the fingerprints from the last walk, as
+            :attr:`fingerprints` of that walk
+        """
+        self.root = root
+        self.old_fingerprints = fingerprints
+        #: Fingerprints of the walked directories, by directory URI. Each
+        #: is a (mtime, entry count, subdirectory names) tuple.
+        self.fingerprints: Dict[str, Tuple[int, int, Tuple[str, ...]]] = {}
+        #: URIs of the directories whose files were skipped
+        self.unchanged: Set[str] = set()
+        #: Number of directories and files skipped, for progress reporting
+        self.skipped = 0
+
+    def __iter__(self) -> Iterator[Tuple[Gio.File, Gio.FileInfo]]:
+        recent = time.time() - self.RECENT_SECONDS
+        try:
+            root_info = self.root.query_info(
+                common.WALK_ATTRIBUTES, Gio.FileQueryInfoFlags.NONE, None
+            )
+        except GLib.Error:
+            logger.exception("Unhandled exception while walking on %s.", self.root)
+            return
+        queue: Deque[Tuple[Gio.File, Gio.FileInfo]] = deque()
+        queue.append((self.root, root_info))
+
+        while len(queue) > 0:
+            dir, dir_info = queue.pop()
+            uri = dir.get_uri()
+            mtime = _get_mtime(dir_info)
+
+            fingerprint = self.old_fingerprints.get(uri)
+            if fingerprint is not None and self.__is_unchanged(dir, mtime, fingerprint):
+                self.fingerprints[uri] = fingerprint
+                self.unchanged.add(uri)
+                _mtime, entries, subdirs = fingerprint
+                self.skipped += 1 + entries - len(subdirs)
+                for name in subdirs:
+                    subdir = dir.get_child(name)
+                    try:
+                        info = subdir.query_info(
+                            common.WALK_ATTRIBUTES, Gio.FileQueryInfoFlags.NONE, None
+                        )
+                    except GLib.Error:
+                        continue
+                    queue.append((subdir, info))
+                continue
+
+            yield dir, dir_info
+            entries = 0
+            subdirs = []
+            names = []
+            newest = mtime
+            try:
+                for fil, fileinfo in common.walk_children(dir, self.root):
+                    entries += 1
+                    if fileinfo.get_file_type() == Gio.FileType.REGULAR:
+                        names.append(fileinfo.get_name())
+                    if fil is None:
+                        continue
+                    newest = max(newest, _get_mtime(fileinfo))
+                    type = fileinfo.get_file_type()
+                    if type == Gio.FileType.DIRECTORY:
+                        subdirs.append(fileinfo.get_name())
+                        queue.append((fil, fileinfo))
+                    elif type == Gio.FileType.REGULAR:
+                        yield fil, fileinfo
+            except GLib.Error:  # why doesn't gio offer more-specific errors?
+                logger.exception("Unhandled exception while walking on %s.", dir)
+                continue
+
+            event.log_event('library_directory_listed', self, (uri, mtime, names))
+            if mtime and newest < recent:
+                self.fingerprints[uri] = (mtime, entries, tuple(subdirs))
+
+    @staticmethod
+    def __is_unchanged(dir: Gio.File, mtime: int, fingerprint: Tuple) -> bool:
+        if mtime != fingerprint[0]:
+            return False
+        # Only the names are needed to count entries, which avoids a stat
+        # call per entry
+        try:
+            entries = sum(
+                1
+                for _info in dir.enumerate_children(
+                    'standard::name', Gio.FileQueryInfoFlags.NONE, None
+                )
+            )
+        except GLib.Error:
+            return False
+        return entries == fingerprint[1]
+
+
+def _get_mtime(info: Gio.FileInfo) -> int:
+    modified = info.get_modification_date_time()
+    if modified is None:
+        return 0
+    return modified.to_unix()
+
+
 class Library:
     """
     Scans and watches a folder for tracks, and adds them to
@@ -539,6 +690,10 @@ class Library:
     >>>
     """
 
+    #: Number of new tracks to collect before adding them to the collection
+    #: during a parallel scan
+    ADD_BATCH_SIZE = 200
+
     def __init__(
         self,
         location: str,
@@ -639,15 +794,23 @@ class Library:
     def _count_files(self) -> int:
         """
         Counts the number of files present in this directory
+
+        Unchanged directories are counted like a rescan does, see
+        :class:`_LibraryWalk`, so that the progress of the rescan matches.
         """
+        fingerprints = {}
+        if self.collection:
+            fingerprints = self.collection._dir_fingerprints.get(self.location, {})
+        walk = _LibraryWalk(Gio.File.new_for_uri(self.location), fingerprints)
+
         count = 0
-        for file in common.walk(Gio.File.new_for_uri(self.location)):
+        for file in walk:
             if self.collection:
                 if self.collection._scan_stopped:
                     break
             count += 1
 
-        return count
+        return count + walk.skipped
 
     def _check_compilation(
         self,
@@ -719,27 +882,83 @@ class Library:
 
         returns: the Track object, None if it could not be updated
         """
+        tr, is_new = self._scan_track(gloc, force_update)
+        if is_new:
+            self.collection.add(tr)
+        return tr
+
+    def _scan_track(
+        self,
+        gloc: Gio.File,
+        force_update: bool = False,
+        info: Optional[Gio.FileInfo] = None,
+    ) -> Tuple[Optional[trax.Track], bool]:
+        """
+        Read the tags of the track at a given location, without adding it to
+        the collection. Safe to call from several threads at once.
+
+        :param info: the file's info from :func:`common.walk_with_info`. If
+            given, its modification time and size are used instead of
+            querying the file, and tracks that have not changed are not read
+            at all.
+        :returns: the Track object (None if it could not be updated), and
+            whether it should be added to the collection
+        """
         uri = gloc.get_uri()
         if not uri:  # we get segfaults if this check is removed
-            return None
+            return None, False
+
+        mtime = size = None
+        if info is not None:
+            modified = info.get_modification_date_time()
+            if modified is not None:
+                mtime = modified.to_unix()
+                size = info.get_size()
 
+        is_new = False
         tr = self.collection.get_track_by_loc(uri)
         if tr:
-            tr.read_tags(force=force_update)
+            if not force_update and mtime is not None and tr._is_unchanged(mtime, size):
+                # Unchanged, and only supported tracks are in the collection
+                return tr, False
+            tr.read_tags(force=force_update, mtime=mtime, size=size)
         else:
             tr = trax.Track(uri)
             if tr._scan_valid:
-                self.collection.add(tr)
+                is_new = True
 
             # Track already existed. This fixes trax.get_tracks_from_uri
             # on windows, unknown why fix isn't needed on linux.
             elif not tr._init:
-                self.collection.add(tr)
+                is_new = True
 
         if not tr.is_supported():
-            return None
+            # the collection does not take unsupported tracks anyway
+            return None, False
 
-        return tr
+        return tr, is_new
+
+    def _mark_compilations(self, dirtracks: Iterable[trax.Track]) -> None:
+        """
+        Run the compilation heuristic (see _check_compilation) on the tracks
+        of one directory and tag the compilations found.
+        """
+        compilations = deque()
+        ccheck = {}
+        for tr in dirtracks:
+            self._check_compilation(ccheck, compilations, tr)
+        for basedir, album in compilations:
+            base = basedir.replace('"', '\\"')
+            alb = album.replace('"', '\\"')
+            items = [
+                tr
+                for tr in dirtracks
+                if tr.get_tag_raw('__basedir') == base and
+                # FIXME: this is ugly
+                alb in "".join(tr.get_tag_raw('album') or []).lower()
+            ]
+            for item in items:
+                item.set_tag_raw('__compilation', (basedir, album))
 
     def rescan(
         self, notify_interval: Optional[int] = None, force_update: bool = False
@@ -748,6 +967,12 @@ class Library:
         Rescan the associated folder and add the contained files
         to the Collection
 
+        Files in directories that have not changed since the last scan are
+        skipped (see :class:`_LibraryWalk`), unless `force_update` is set.
+
+        If the ``collection/scan_threads`` option is more than 1, tags are
+        read by that many threads in parallel.
+
         :returns: Whether the caller should reschedule this call, due to the
             collection not being ready
         """
@@ -762,39 +987,84 @@ class Library:
         logger.info("Scanning library: %s", self.location)
         self.scanning = True
         libloc = Gio.File.new_for_uri(self.location)
+        if force_update:
+            fingerprints = {}
+        else:
+            fingerprints = self.collection._dir_fingerprints.get(self.location, {})
+        walk = _LibraryWalk(libloc, fingerprints)
+
+        threads = settings.get_option('collection/scan_threads', 1)
+        with event.batch():
+            if threads > 1:
+                completed = self._scan_files_parallel(
+                    walk, threads, notify_interval, force_update
+                )
+            else:
+                completed = self._scan_files(walk, notify_interval, force_update)
+        if not completed:
+            self.scanning = False
+            logger.info("Scan canceled")
+            return False
+
+        removals = deque()
+        for tr in self.collection.tracks.values():
+            tr = tr._track
+            loc = tr.get_loc_for_io()
+            if not loc:
+                continue
+            gloc = Gio.File.new_for_uri(loc)
+            try:
+                if not gloc.has_prefix(libloc):
+                    continue
+            except UnicodeDecodeError:
+                logger.exception("Error decoding file location")
+                continue
+
+            # The files of unchanged directories are all still there
+            parent = gloc.get_parent()
+            if parent is not None and parent.get_uri() in walk.unchanged:
+                continue
+
+            if not (gloc.query_exists(None) or tr.is_supported()):
+                removals.append(tr)
+
+        for tr in removals:
+            logger.debug("Removing %s", tr)
+            self.collection.remove(tr)
+
+        if walk.fingerprints != fingerprints:
+            all_fingerprints = dict(self.collection._dir_fingerprints)
+            all_fingerprints[self.location] = walk.fingerprints
+            self.collection._dir_fingerprints = all_fingerprints
+            self.collection._dirty = True
+
+        logger.info("Scan completed: %s", self.location)
+        self.scanning = False
+        return False
 
+    def _scan_files(
+        self, walk: '_LibraryWalk', notify_interval: Optional[int], force_update: bool
+    ) -> bool:
+        """
+        Scan all files of the library, one after another.
+
+        :returns: False if the scan was stopped
+        """
         count = 0
         dirtracks = deque()
-        compilations = deque()
-        ccheck = {}
-        for fil in common.walk(libloc):
+        for fil, info in walk:
             count += 1
-            type = fil.query_info(
-                "standard::type", Gio.FileQueryInfoFlags.NONE, None
-            ).get_file_type()
+            type = info.get_file_type()
             if type == Gio.FileType.DIRECTORY:
                 if dirtracks:
-                    for tr in dirtracks:
-                        self._check_compilation(ccheck, compilations, tr)
-                    for basedir, album in compilations:
-                        base = basedir.replace('"', '\\"')
-                        alb = album.replace('"', '\\"')
-                        items = [
-                            tr
-                            for tr in dirtracks
-                            if tr.get_tag_raw('__basedir') == base and
-                            # FIXME: this is ugly
-                            alb in "".join(tr.get_tag_raw('album') or []).lower()
-                        ]
-                        for item in items:
-                            item.set_tag_raw('__compilation', (basedir, album))
+                    self._mark_compilations(dirtracks)
                 dirtracks = deque()
-                compilations = deque()
-                ccheck = {}
             elif type == Gio.FileType.REGULAR:
-                tr = self.update_track(fil, force_update=force_update)
+                tr, is_new = self._scan_track(fil, force_update, info)
                 if not tr:
                     continue
+                if is_new:
+                    self.collection.add(tr)
 
                 if dirtracks is not None:
                     dirtracks.append(tr)
@@ -814,42 +1084,123 @@ class Library:
                         dirtracks = None
 
             if self.collection and self.collection._scan_stopped:
-                self.scanning = False
-                logger.info("Scan canceled")
                 return False
 
             # progress update
             if notify_interval is not None and count % notify_interval == 0:
-                event.log_event('tracks_scanned', self, count)
+                event.log_event('tracks_scanned', self, count + walk.skipped)
+
+        if dirtracks:
+            self._mark_compilations(dirtracks)
 
         # final progress update
         if notify_interval is not None:
-            event.log_event('tracks_scanned', self, count)
+            event.log_event('tracks_scanned', self, count + walk.skipped)
+        return True
 
-        removals = deque()
-        for tr in self.collection.tracks.values():
-            tr = tr._track
-            loc = tr.get_loc_for_io()
-            if not loc:
-                continue
-            gloc = Gio.File.new_for_uri(loc)
-            try:
-                if not gloc.has_prefix(libloc):
-                    continue
-            except UnicodeDecodeError:
-                logger.exception("Error decoding file location")
-                continue
+    def _scan_files_parallel(
+        self,
+        walk: '_LibraryWalk',
+        threads: int,
+        notify_interval: Optional[int],
+        force_update: bool,
+    ) -> bool:
+        """
+        Scan all files of the library, reading tags in a pool of `threads`
+        worker threads.
 
-            if not (gloc.query_exists(None) or tr.is_supported()):
-                removals.append(tr)
+        This thread walks the directories and hands every file to the pool.
+        Results are then processed per directory, in walk order: new tracks
+        are added to the collection in batches, and the compilation heuristic
+        runs on each directory's tracks as in the serial scan.
 
-        for tr in removals:
-            logger.debug("Removing %s", tr)
-            self.collection.remove(tr)
+        :returns: False if the scan was stopped
+        """
+        # Each entry holds the pending reads of one directory
+        pending: Deque[List['Future[Tuple[Optional[trax.Track], bool]]']] = deque()
+        # Reads which may not be done yet, oldest first
+        running: Deque['Future[Tuple[Optional[trax.Track], bool]]'] = deque()
+        max_in_flight = threads * 8
+        count = 0
+        last_notified = 0
+        new_tracks: List[trax.Track] = []
+
+        def finish_directory() -> None:
+            nonlocal count
+            futures = pending.popleft()
+            dirtracks = []
+            for future in futures:
+                try:
+                    tr, is_new = future.result()
+                except Exception:
+                    logger.exception("Error while scanning track")
+                    continue
+                if tr is None:
+                    continue
+                if is_new:
+                    new_tracks.append(tr)
+                dirtracks.append(tr)
+            count += len(futures)
+
+            # see _scan_files for the limit
+            if 0 < len(dirtracks) <= 110:
+                self._mark_compilations(dirtracks)
+            if len(new_tracks) >= self.ADD_BATCH_SIZE:
+                self.collection.add_tracks(new_tracks)
+                new_tracks.clear()
+
+        def notify() -> None:
+            nonlocal last_notified
+            if (
+                notify_interval is not None
+                and count // notify_interval > last_notified // notify_interval
+            ):
+                event.log_event('tracks_scanned', self, count + walk.skipped)
+                last_notified = count
+
+        with ThreadPoolExecutor(threads, thread_name_prefix='LibraryScan') as pool:
+            for fil, info in walk:
+                type = info.get_file_type()
+                if type == Gio.FileType.DIRECTORY:
+                    count += 1
+                    pending.append([])
+                elif type == Gio.FileType.REGULAR:
+                    future = pool.submit(self._scan_track, fil, force_update, info)
+                    pending[-1].append(future)
+                    running.append(future)
+
+                # Wait for the oldest reads when too many are queued. The
+                # directory being listed is never finished early, its tracks
+                # are needed together for the compilation heuristic.
+                while running and running[0].done():
+                    running.popleft()
+                while len(running) > max_in_flight:
+                    wait((running.popleft(),), return_when=FIRST_COMPLETED)
+                while len(pending) > 1 and all(f.done() for f in pending[0]):
+                    finish_directory()
+
+                if self.collection and self.collection._scan_stopped:
+                    # Keep the tracks read so far, like the serial scan does
+                    for futures in pending:
+                        for future in futures:
+                            future.cancel()
+                    if new_tracks:
+                        self.collection.add_tracks(new_tracks)
+                    return False
+
+                notify()
+
+            while pending:
+                finish_directory()
+                notify()
+
+        if new_tracks:
+            self.collection.add_tracks(new_tracks)
 
-        logger.info("Scan completed: %s", self.location)
-        self.scanning = False
-        return False
+        # final progress update
+        if notify_interval is not None:
+            event.log_event('tracks_scanned', self, count + walk.skipped)
+        return True
 
     def add(self, loc: str, move: bool = False) -> None:
         """
@@ -28,6 +28,7 @@
 General functions and classes shared in the codebase
 """
 
+import bisect
 from collections import deque
 import collections.abc
 from functools import wraps, partial
@@ -39,7 +40,7 @@ import shelve
 import subprocess
 import sys
 import threading
-from typing import Deque, Generic, Iterable, List, TypeVar
+from typing import Deque, Generic, Iterable, List, Optional, Tuple, TypeVar
 import urllib.parse
 import urllib.request
 import weakref
@@ -385,16 +386,20 @@ def open_file_directory(path_or_uri: str) -> None:
         subprocess.Popen(["xdg-open", (f.get_parent() or f).get_parse_name()])
 
 
-def open_shelf(path):
+def open_shelf(path, autocommit=True, wal=False):
     """
     Opens a python shelf file, used to store various types of metadata
+
+    :param autocommit: If False, changes are only committed on sync() or
+        close(), in one transaction
+    :param wal: Use write-ahead logging, see :class:`xl.sqlitedbm.SqliteDbm`
     """
 
     import sqlite3
     from xl import sqlitedbm
 
     try:
-        db = sqlitedbm.SqliteDbm(path)
+        db = sqlitedbm.SqliteDbm(path, autocommit=autocommit, wal=wal)
     except sqlite3.Error:
         try:
             from xl.migrations.database import to_sqlite
@@ -410,7 +415,7 @@ def open_shelf(path):
             raise Exception(
                 f"Failed migrating {path!r}, make sure you have the Python berkeleydb or bsddb3 package installed"
             )
-        db = sqlitedbm.SqliteDbm(path)
+        db = sqlitedbm.SqliteDbm(path, autocommit=autocommit, wal=wal)
     return shelve.Shelf(db, protocol=PICKLE_PROTOCOL)
 
 
@@ -504,6 +509,14 @@ class cached:
         return partial(self.__call__, obj)
 
 
+#: File attributes queried by :func:`walk_with_info`
+WALK_ATTRIBUTES = (
+    "standard::type,standard::size,"
+    "standard::is-symlink,standard::name,"
+    "standard::symlink-target,time::modified"
+)
+
+
 def walk(root: Gio.File) -> Iterable[Gio.File]:
     """
     Walk through a Gio directory, yielding each file
@@ -518,40 +531,81 @@ def walk(root: Gio.File) -> Iterable[Gio.File]:
         directory to walk through
     :returns: a generator object
     """
-    queue: Deque[Gio.File] = deque()
-    queue.append(root)
+    for fil, _info in walk_with_info(root):
+        yield fil
+
+
+def walk_with_info(root: Gio.File) -> Iterable[Tuple[Gio.File, Gio.FileInfo]]:
+    """
+    Like :func:`walk`, but yield each file together with the
+    :class:`Gio.FileInfo` returned by the directory enumeration,
+    so that callers don't need to query it again.
+
+    The info holds the attributes in :data:`WALK_ATTRIBUTES`. Symbolic
+    links are followed, so the type, size and modification time are those
+    of the link target.
+
+    :param root: a :class:`Gio.File` representing the
+        directory to walk through
+    :returns: a generator object
+    """
+    try:
+        root_info = root.query_info(WALK_ATTRIBUTES, Gio.FileQueryInfoFlags.NONE, None)
+    except GLib.Error:
+        logger.exception("Unhandled exception while walking on %s.", root)
+        return
+    queue: Deque[Tuple[Gio.File, Gio.FileInfo]] = deque()
+    queue.append((root, root_info))
 
     while len(queue) > 0:
-        dir = queue.pop()
-        yield dir
+        dir, dir_info = queue.pop()
+        yield dir, dir_info
         try:
-            for fileinfo in dir.enumerate_children(
-                "standard::type,"
-                "standard::is-symlink,standard::name,"
-                "standard::symlink-target,time::modified",
-                Gio.FileQueryInfoFlags.NONE,
-                None,
-            ):
-                fil = dir.get_child(fileinfo.get_name())
-                # FIXME: recursive symlinks could cause an infinite loop
-                if fileinfo.get_is_symlink():
-                    target = fileinfo.get_symlink_target()
-                    if "://" not in target and not os.path.isabs(target):
-                        fil2 = dir.get_child(target)
-                    else:
-                        fil2 = Gio.File.new_for_uri(target)
-                    # already in the collection, we'll get it anyway
-                    if fil2.has_prefix(root):
-                        continue
+            for fil, fileinfo in walk_children(dir, root):
+                if fil is None:
+                    continue
                 type = fileinfo.get_file_type()
                 if type == Gio.FileType.DIRECTORY:
-                    queue.append(fil)
+                    queue.append((fil, fileinfo))
                 elif type == Gio.FileType.REGULAR:
-                    yield fil
+                    yield fil, fileinfo
         except GLib.Error:  # why doesn't gio offer more-specific errors?
             logger.exception("Unhandled exception while walking on %s.", dir)
 
 
+def walk_children(
+    dir: Gio.File, root: Gio.File
+) -> Iterable[Tuple[Optional[Gio.File], Gio.FileInfo]]:
+    """
+    Enumerate the children of `dir`, a directory reached by a walk of
+    `root`, yielding each with its :class:`Gio.FileInfo`, which holds the
+    attributes in :data:`WALK_ATTRIBUTES`.
+
+    Symbolic links to files within `root` are yielded with None instead of
+    a file, since the walk reaches their targets anyway.
+
+    :raises GLib.Error: if `dir` cannot be enumerated
+    """
+    for fileinfo in dir.enumerate_children(
+        WALK_ATTRIBUTES,
+        Gio.FileQueryInfoFlags.NONE,
+        None,
+    ):
+        fil = dir.get_child(fileinfo.get_name())
+        # FIXME: recursive symlinks could cause an infinite loop
+        if fileinfo.get_is_symlink():
+            target = fileinfo.get_symlink_target()
+            if "://" not in target and not os.path.isabs(target):
+                fil2 = dir.get_child(target)
+            else:
+                fil2 = Gio.File.new_for_uri(target)
+            # already in the collection, we'll get it anyway
+            if fil2.has_prefix(root):
+                yield None, fileinfo
+                continue
+        yield fil, fileinfo
+
+
 def walk_directories(root: Gio.File) -> Iterable[Gio.File]:
     """
     Walk through a Gio directory, yielding each subdirectory
@@ -635,22 +689,37 @@ class MetadataList:
     allow the metadata to act much like a dictionary, with a few
     optimizations.
 
+    Metadata is stored sparsely, keyed by index, so entries without
+    metadata cost nothing and slicing only touches the entries which
+    have some.
+
     List aspects that are not supported:
         * sort
         * comparisons other than equality
         * multiply
     """
 
-    __slots__ = ['__list', 'metadata']
+    __slots__ = ['__list', '__meta']
 
     def __init__(self, iterable=[], metadata=[]):
         self.__list = list(iterable)
         meta = list(metadata)
         if meta and len(meta) != len(self.__list):
             raise ValueError("Length of metadata must match length of items.")
-        if not meta:
-            meta = [None] * len(self.__list)
-        self.metadata = meta
+        self.__meta = {i: m for i, m in enumerate(meta) if m is not None}
+
+    def __get_metadata(self):
+        meta = self.__meta
+        return [meta.get(i) for i in range(len(self.__list))]
+
+    def __set_metadata(self, metadata):
+        meta = list(metadata)
+        if len(meta) != len(self.__list):
+            raise ValueError("Length of metadata must match length of items.")
+        self.__meta = {i: m for i, m in enumerate(meta) if m is not None}
+
+    #: The metadata of all entries, as a list (None for no metadata)
+    metadata = property(__get_metadata, __set_metadata)
 
     def __repr__(self):
         return "MetadataList(%s)" % self.__list
@@ -662,7 +731,7 @@ class MetadataList:
         return self.__list.__iter__()
 
     def __add__(self, other):
-        l = MetadataList(self, self.metadata)
+        l = self[:]
         l.extend(other)
         return l
 
@@ -675,24 +744,74 @@ class MetadataList:
             other = list(other)
         return self.__list == other
 
+    def __index(self, i):
+        """
+        Returns the non-negative index for ``i``
+        """
+        return range(len(self.__list))[i]
+
     def __getitem__(self, i):
         val = self.__list.__getitem__(i)
         if isinstance(i, slice):
-            return MetadataList(val, self.metadata.__getitem__(i))
+            indices = range(len(self.__list))[i]
+            l = MetadataList(val)
+            l.__meta = {
+                indices.index(j): m for j, m in self.__meta.items() if j in indices
+            }
+            return l
         else:
             return val
 
     def __setitem__(self, i, value):
+        if not isinstance(i, slice):
+            i = self.__index(i)
+            self.__list[i] = value
+            self.__meta.pop(i, None)
+            return
+
+        indices = range(len(self.__list))[i]
         self.__list.__setitem__(i, value)
         if isinstance(value, MetadataList):
-            metadata = list(value.metadata)
+            added = value.__meta
+        else:
+            added = {}
+
+        meta = self.__meta
+        if indices.step == 1:
+            start = indices.start
+            end = start + len(indices)
+            shift = len(value) - len(indices)
+            if meta:
+                meta = {
+                    j if j < start else j + shift: m
+                    for j, m in meta.items()
+                    if not start <= j < end
+                }
+            for j, m in added.items():
+                meta[start + j] = m
         else:
-            metadata = [None] * len(value)
-        self.metadata.__setitem__(i, metadata)
+            # Extended slices keep the length of the list
+            for j in indices:
+                meta.pop(j, None)
+            for j, m in added.items():
+                meta[indices[j]] = m
+        self.__meta = meta
 
     def __delitem__(self, i):
+        if isinstance(i, slice):
+            indices = range(len(self.__list))[i]
+        else:
+            indices = range(self.__index(i), self.__index(i) + 1)
         self.__list.__delitem__(i)
-        self.metadata.__delitem__(i)
+        if not self.__meta:
+            return
+        if indices.step < 0:
+            indices = indices[::-1]
+        self.__meta = {
+            j - bisect.bisect_left(indices, j): m
+            for j, m in self.__meta.items()
+            if j not in indices
+        }
 
     def append(self, other, metadata=None):
         self.insert(len(self), other, metadata=metadata)
@@ -706,8 +825,10 @@ class MetadataList:
             e = len(self) + 1
         else:
             e = i
+        position = range(len(self))[i:e].start
         self[i:e] = [item]
-        self.metadata[i:e] = [metadata]
+        if metadata is not None:
+            self.__meta[position] = metadata
 
     def pop(self, i=-1):
         item = self[i]
@@ -719,7 +840,8 @@ class MetadataList:
 
     def reverse(self):
         self.__list.reverse()
-        self.metadata.reverse()
+        last = len(self.__list) - 1
+        self.__meta = {last - j: m for j, m in self.__meta.items()}
 
     def index(self, i, start=0, end=None):
         if end is None:
@@ -730,22 +852,62 @@ class MetadataList:
     def count(self, i):
         return self.__list.count(i)
 
+    def permuted(self, order):
+        """
+        Returns a new list with the entries at the given indices,
+        in that order, along with their metadata
+
+        :param order: the indices of the entries to take
+        """
+        items = self.__list
+        l = MetadataList([items[j] for j in order])
+        meta = self.__meta
+        if meta:
+            l.__meta = {k: meta[j] for k, j in enumerate(order) if j in meta}
+        return l
+
+    def with_items(self, iterable):
+        """
+        Returns a new list of other items, which carry the metadata
+        of the entries at the same indices in this list
+
+        :param iterable: the items, as many as there are entries
+        """
+        l = MetadataList(iterable)
+        if len(l) != len(self):
+            raise ValueError("Length of metadata must match length of items.")
+        l.__meta = dict(self.__meta)
+        return l
+
+    def meta_items(self):
+        """
+        Returns the entries which have metadata
+
+        :returns: (index, metadata) pairs, by index
+        """
+        return sorted(self.__meta.items())
+
     def get_meta_key(self, index, key, default=None):
-        if not self.metadata[index]:
+        meta = self.__meta.get(self.__index(index))
+        if not meta:
             return default
-        return self.metadata[index].get(key, default)
+        return meta.get(key, default)
 
     def set_meta_key(self, index, key, value):
-        if not self.metadata[index]:
-            self.metadata[index] = {}
-        self.metadata[index][key] = value
+        index = self.__index(index)
+        meta = self.__meta.get(index)
+        if not meta:
+            meta = self.__meta[index] = {}
+        meta[key] = value
 
     def del_meta_key(self, index, key):
-        if not self.metadata[index]:
+        index = self.__index(index)
+        meta = self.__meta.get(index)
+        if not meta:
             raise KeyError(key)
-        del self.metadata[index][key]
-        if not self.metadata[index]:
-            self.metadata[index] = None
+        del meta[key]
+        if not meta:
+            del self.__meta[index]
 
 
 class ProgressThread(GObject.Object, threading.Thread):
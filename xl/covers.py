@@ -30,12 +30,17 @@ Provides the base for obtaining and storing covers, also known
 as album art.
 """
 
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import contextlib
 from gi.repository import GLib
 from gi.repository import Gio
 import logging
 import hashlib
 import os
 import pickle
+import threading
+import time
 from typing import Optional
 
 from xl.nls import gettext as _
@@ -110,6 +115,185 @@ class Cacher:
         return None
 
 
+class ThumbnailCache:
+    """
+    On-disk cache of scaled down covers, in any number of sizes.
+
+    Thumbnails are stored as individual files, one directory per size.
+    Once they take more than `max_size` bytes, the least recently used
+    thumbnails are removed.
+    """
+
+    def __init__(self, cache_dir, max_size):
+        """
+        :param cache_dir: directory to use for the cache. will be
+            created if it does not exist.
+        :param max_size: the total size of the thumbnails to keep, in bytes
+        """
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            pass
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        # Total size of the thumbnails, counted on first add
+        self.__total_size = None
+
+    def __path(self, key, size):
+        return os.path.join(self.cache_dir, str(size), key)
+
+    def get(self, key, size):
+        """
+        Retrieve a thumbnail. Returns None if there is no thumbnail
+        of this size for the key.
+
+        :param key: the key of the full size image
+        :param size: the size of the thumbnail
+        """
+        path = self.__path(key, size)
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+            # Remember the use, for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def add(self, key, size, data):
+        """
+        Adds a thumbnail to the cache, removing the least recently used
+        thumbnails if the cache gets too big.
+
+        :param key: the key of the full size image
+        :param size: the size of the thumbnail
+        :param data: the thumbnail data, as a bytestring
+        """
+        path = self.__path(key, size)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fp:
+                fp.write(data)
+        except OSError:
+            logger.warning("Could not store cover thumbnail %s", path, exc_info=True)
+            return
+
+        with self.__lock:
+            if self.__total_size is None:
+                self.__total_size = sum(
+                    size for _mtime, size, _path in self.__list_files()
+                )
+            else:
+                self.__total_size += len(data) - old_size
+            if self.__total_size > self.max_size:
+                self.__evict()
+
+    def remove(self, key):
+        """
+        Removes the thumbnails of all sizes for a key.
+
+        :param key: the key of the full size image
+        """
+        for size in self.__list_sizes():
+            path = self.__path(key, size)
+            try:
+                file_size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            with self.__lock:
+                if self.__total_size is not None:
+                    self.__total_size -= file_size
+
+    def __list_sizes(self):
+        try:
+            return [
+                entry.name for entry in os.scandir(self.cache_dir) if entry.is_dir()
+            ]
+        except OSError:
+            return []
+
+    def __list_files(self):
+        """
+        :returns: (modification time, size, path) of all thumbnails
+        """
+        files = []
+        for size in self.__list_sizes():
+            try:
+                entries = list(os.scandir(os.path.join(self.cache_dir, size)))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def __evict(self):
+        """
+        Removes the least recently used thumbnails, down to 3/4 of the
+        maximum size so that this does not run on every add
+        """
+        files = self.__list_files()
+        files.sort()
+        total_size = sum(size for _mtime, size, _path in files)
+        target = self.max_size * 3 // 4
+        for _mtime, size, path in files:
+            if total_size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+        self.__total_size = total_size
+
+
+def _scale_cover(data, size):
+    """
+    Scales down image data to fit into a square, keeping its ratio
+
+    :param data: the image data
+    :param size: the width and height to fit into
+    :returns: the scaled image as PNG or JPEG data, or None if
+        the data could not be loaded
+    """
+
+    def on_size_prepared(loader, width, height):
+        scale = min(size / float(width), size / float(height))
+        if scale < 1.0:
+            loader.set_size(max(1, int(width * scale)), max(1, int(height * scale)))
+
+    # Imported here so that xl does not need GdkPixbuf until covers are shown
+    from gi.repository import GdkPixbuf
+
+    loader = GdkPixbuf.PixbufLoader()
+    loader.connect('size-prepared', on_size_prepared)
+    try:
+        loader.write(data)
+        loader.close()
+    except GLib.Error:
+        return None
+    pixbuf = loader.get_pixbuf()
+    if pixbuf is None:
+        return None
+
+    if pixbuf.get_has_alpha():
+        success, thumbnail = pixbuf.save_to_bufferv('png', [], [])
+    else:
+        success, thumbnail = pixbuf.save_to_bufferv('jpeg', ['quality'], ['90'])
+    if not success:
+        return None
+    return thumbnail
+
+
 class CoverManager(providers.ProviderHandler):
     """
     Handles finding covers from various sources.
@@ -117,16 +301,32 @@ class CoverManager(providers.ProviderHandler):
 
     DB_VERSION = 2
 
+    #: Albums without covers are searched again after this many seconds
+    MISSING_COVER_EXPIRY = 604800  # one week
+
     def __init__(self, location):
         """
         :param location: The directory to load and store data in.
         """
         providers.ProviderHandler.__init__(self, "covers")
         self.__cache = Cacher(os.path.join(location, 'cache'))
+        self.__thumbnails = ThumbnailCache(
+            os.path.join(location, 'thumbnails'),
+            settings.get_option('covers/thumbnail_cache_size', 64) * 1024 * 1024,
+        )
         self.location = location
         self.methods = {}
         self.order = settings.get_option('covers/preferred_order', [])
+        # album key -> db_string, stored in SQLite (see load)
         self.db = {'version': self.DB_VERSION}
+        # album key -> time of the last search which found no cover
+        self.missing = {}
+        self.__db_lock = threading.RLock()
+        # Results of the last find_covers calls
+        self.__found_covers = common.LimitedCache(5)
+        self.__found_lock = threading.Lock()
+        # method name -> semaphore limiting the threads using the method
+        self.__method_slots = {}
         self.load()
         for method in self.get_providers():
             self.on_provider_added(method)
@@ -251,10 +451,25 @@ class CoverManager(providers.ProviderHandler):
         if key is None:
             return None
 
-        return self.db.get(key)
+        with self.__db_lock:
+            return self.db.get(key)
+
+    def _get_method_slot(self, method):
+        """
+        Returns a context manager to hold while using a method, which
+        limits the number of threads using it at once to its
+        `concurrency`
+        """
+        concurrency = getattr(method, 'concurrency', 1)
+        if concurrency is None:
+            return contextlib.nullcontext()
+        with self.__found_lock:
+            slot = self.__method_slots.get(method.name)
+            if slot is None:
+                slot = threading.BoundedSemaphore(concurrency)
+                self.__method_slots[method.name] = slot
+        return slot
 
-    @common.synchronized
-    @common.cached(5)
     def find_covers(self, track, limit=-1, local_only=False):
         """
         Find all covers for a track
@@ -266,15 +481,25 @@ class CoverManager(providers.ProviderHandler):
         """
         if track is None:
             return
+        key = (track, limit, local_only)
+        with self.__found_lock:
+            covers = self.__found_covers.get(key)
+        if covers is not None:
+            return covers
+
         covers = []
         for method in self._get_methods(fixed=True):
             if local_only and method.use_cache:
                 continue
-            new = method.find_covers(track, limit=limit)
+            with self._get_method_slot(method):
+                new = method.find_covers(track, limit=limit)
             new = ["%s:%s" % (method.name, x) for x in new]
             covers.extend(new)
             if limit != -1 and len(covers) >= limit:
                 break
+
+        with self.__found_lock:
+            self.__found_covers[key] = covers
         return covers
 
     def set_cover(self, track, db_string, data=None):
@@ -294,8 +519,9 @@ class CoverManager(providers.ProviderHandler):
             db_string = "cache:%s" % self.__cache.add(data)
         key = self._get_track_key(track)
         if key:
-            self.db[key] = db_string
-            self.timeout_save()
+            with self.__db_lock:
+                self.db[key] = db_string
+                self.missing.pop(key, None)
             event.log_event('cover_set', self, track)
 
     def remove_cover(self, track):
@@ -310,9 +536,15 @@ class CoverManager(providers.ProviderHandler):
         db_string = self.get_db_string(track)
         if db_string is None:
             return
-        del self.db[key]
+        with self.__db_lock:
+            try:
+                del self.db[key]
+            except KeyError:
+                return
         self.__cache.remove(db_string)
-        self.timeout_save()
+        source, data = db_string.split(":", 1)
+        if source == "cache":
+            self.__thumbnails.remove(data)
         event.log_event('cover_removed', self, track)
 
     def get_cover(self, track, save_cover=True, set_only=False, use_default=False):
@@ -351,6 +583,78 @@ class CoverManager(providers.ProviderHandler):
 
         return self.get_default_cover() if use_default else None
 
+    def get_covers(self, tracks, size=None, stopper=None):
+        """
+        Gets the covers for many tracks, usually one track per album,
+        like :meth:`get_cover` with ``save_cover=True``.
+
+        Tracks are handled by up to ``covers/fetch_threads`` threads at
+        once; each cover method is still only used by as many threads
+        as its `concurrency` allows. Albums for which no cover was found
+        are skipped by later calls for :attr:`MISSING_COVER_EXPIRY` seconds.
+
+        :param tracks: the tracks to get the covers for
+        :param size: if set, get thumbnails of this size instead, see
+            :meth:`get_cover_thumbnail`
+        :param stopper: a :class:`threading.Event` which stops the
+            search once set
+        :returns: an iterator of (track, cover data or None), in the
+            order the searches complete
+        """
+
+        def get_cover(track):
+            # Do not search again for albums known to have no cover
+            key = self._get_track_key(track)
+            if key is not None:
+                with self.__db_lock:
+                    last_search = self.missing.get(key)
+                    if last_search is not None:
+                        if time.time() - last_search < self.MISSING_COVER_EXPIRY:
+                            return None
+                        del self.missing[key]
+
+            if size is None:
+                data = self.get_cover(track, save_cover=True)
+            else:
+                data = self.get_cover_thumbnail(track, size, save_cover=True)
+
+            if key is not None and self.get_db_string(track) is None:
+                with self.__db_lock:
+                    self.missing[key] = time.time()
+            return data
+
+        threads = settings.get_option('covers/fetch_threads', 4)
+        tracks = iter(tracks)
+        with ThreadPoolExecutor(threads, thread_name_prefix='CoverFetch') as pool:
+            pending = {}
+            try:
+                while True:
+                    # Keep the pool busy without queueing all tracks at once
+                    while len(pending) < threads * 2:
+                        if stopper is not None and stopper.is_set():
+                            return
+                        track = next(tracks, None)
+                        if track is None:
+                            break
+                        pending[pool.submit(get_cover, track)] = track
+                    if not pending:
+                        return
+
+                    done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        track = pending.pop(future)
+                        try:
+                            data = future.result()
+                        except Exception:
+                            logger.exception("Error while fetching cover")
+                            data = None
+                        yield track, data
+                        if stopper is not None and stopper.is_set():
+                            return
+            finally:
+                for future in pending:
+                    future.cancel()
+
     def get_cover_data(self, db_string, use_default=False):
         """
         Get the raw image data for a cover.
@@ -366,11 +670,79 @@ class CoverManager(providers.ProviderHandler):
         else:
             method = self.methods.get(source)
             if method:
-                ret = method.get_cover_data(data)
+                with self._get_method_slot(method):
+                    ret = method.get_cover_data(data)
         if ret is None and use_default is True:
             ret = self.get_default_cover()
         return ret
 
+    def get_cover_thumbnail(
+        self, track, size, save_cover=True, set_only=False, use_default=False
+    ):
+        """
+        Get the cover for a given track, scaled down to fit into a
+        `size` x `size` square. Thumbnails are generated once for each
+        size and kept on disk.
+
+        The other parameters have the same meaning as for
+        :meth:`get_cover`.
+
+        :param track: the Track to get the cover for.
+        :param size: the maximum width and height of the thumbnail,
+                e.g. 48 or 100
+        :returns: the raw image data of the thumbnail, or None
+        """
+        db_string = self.get_db_string(track) if track is not None else None
+        if db_string:
+            thumbnail = self.get_thumbnail_data(db_string, size)
+            if thumbnail:
+                return thumbnail
+
+        data = self.get_cover(
+            track, save_cover=save_cover, set_only=set_only, use_default=use_default
+        )
+        if not data:
+            return None
+        return self.get_thumbnail(data, size)
+
+    def get_thumbnail_data(self, db_string, size):
+        """
+        Get the raw image data for a cover, scaled down to fit into
+        a `size` x `size` square.
+
+        :param db_string: The db_string identifying the cover to get.
+        :param size: the maximum width and height of the thumbnail
+        """
+        source, key = db_string.split(":", 1)
+        if source == "cache":
+            # Cached covers are keyed by the hash of their data already
+            thumbnail = self.__thumbnails.get(key, size)
+            if thumbnail is not None:
+                return thumbnail
+        data = self.get_cover_data(db_string)
+        if not data:
+            return None
+        return self.get_thumbnail(data, size)
+
+    def get_thumbnail(self, data, size):
+        """
+        Scales down raw image data to fit into a `size` x `size` square,
+        keeping the ratio. The result is cached on disk by the hash of
+        `data`.
+
+        :param data: the raw image data
+        :param size: the maximum width and height of the thumbnail
+        :returns: the raw image data of the thumbnail, or None if `data`
+            is not a valid image
+        """
+        key = hashlib.sha256(data).hexdigest()
+        thumbnail = self.__thumbnails.get(key, size)
+        if thumbnail is None:
+            thumbnail = _scale_cover(data, size)
+            if thumbnail is not None:
+                self.__thumbnails.add(key, size, thumbnail)
+        return thumbnail
+
     def get_default_cover(self):
         """
         Get the raw image data for the cover to show if there is no
@@ -382,6 +754,40 @@ class CoverManager(providers.ProviderHandler):
     def load(self):
         """
         Load the saved db
+
+        The db is stored in SQLite, in ``covers.sqlite``. The pickled
+        ``covers.db`` of older versions is moved there on first load.
+        """
+        self.missing = common.open_shelf(
+            os.path.join(self.location, 'missing_covers.sqlite'), wal=True
+        )
+        path = os.path.join(self.location, 'covers.sqlite')
+        if os.path.exists(path):
+            self.db = common.open_shelf(path, wal=True)
+        else:
+            data = self.__load_pickle()
+            if data and data.get('version', 1) < 2:
+                # Version 1 keys cannot be stored in SQLite, keep the db in
+                # memory until xl.migrations.database.covers_1to2 has
+                # converted them and calls save()
+                self.db = data
+            else:
+                if data:
+                    logger.info("Moving covers.db to covers.sqlite")
+                self.db = data or {'version': self.DB_VERSION}
+                self.save()
+
+        version = self.db.get('version', 1)
+        if version > self.DB_VERSION:
+            logger.error(
+                "covers.db version (%s) higher than supported (%s); using anyway",
+                version,
+                self.DB_VERSION,
+            )
+
+    def __load_pickle(self):
+        """
+        Load the pickled db of older versions, if there is one
         """
         path = os.path.join(self.location, 'covers.db')
         data = None
@@ -398,44 +804,46 @@ class CoverManager(providers.ProviderHandler):
                     pass
             if data:
                 break
-        if data:
-            self.db = data
-        version = self.db.get('version', 1)
-        if version > self.DB_VERSION:
-            logger.error(
-                "covers.db version (%s) higher than supported (%s); using anyway",
-                version,
-                self.DB_VERSION,
-            )
-
-    @common.glib_wait_seconds(60)
-    def timeout_save(self):
-        self.save()
+        return data
 
     def save(self):
         """
         Save the db
+
+        Changes are written to the database as they are made, so this only
+        does something when the db was replaced by a dict, e.g. after it
+        was loaded from an old ``covers.db``.
         """
-        path = os.path.join(self.location, 'covers.db')
-        try:
-            with open(path + ".new", 'wb') as f:
-                pickle.dump(self.db, f, common.PICKLE_PROTOCOL)
-        except IOError:
-            return
-        try:
-            os.rename(path, path + ".old")
-        except OSError:
-            pass  # if it doesn'texist we don't care
-        os.rename(path + ".new", path)
-        try:
-            os.remove(path + ".old")
-        except OSError:
-            pass
+        with self.__db_lock:
+            if not isinstance(self.db, dict):
+                return
+            path = os.path.join(self.location, 'covers.sqlite')
+            # Write all entries in one transaction, to a new file so that
+            # an interrupted save is not mistaken for a complete db
+            try:
+                os.remove(path + ".new")
+            except OSError:
+                pass
+            db = common.open_shelf(path + ".new", autocommit=False)
+            try:
+                for key, value in self.db.items():
+                    db[key] = value
+            finally:
+                db.close()
+            os.replace(path + ".new", path)
+            self.db = common.open_shelf(path, wal=True)
 
     def on_provider_added(self, provider):
         self.methods[provider.name] = provider
         if provider.name not in self.order:
             self.order.append(provider.name)
+        # Providers are registered again on every start, the albums
+        # without covers only need to be searched again for new ones
+        with self.__db_lock:
+            names = self.__load_missing_methods()
+            if provider.name not in names:
+                self.missing.clear()
+                self.__save_missing_methods(names + [provider.name])
 
     def on_provider_removed(self, provider):
         try:
@@ -444,6 +852,33 @@ class CoverManager(providers.ProviderHandler):
             pass
         if provider.name in self.order:
             self.order.remove(provider.name)
+        # Albums without covers still have none, but they were not searched
+        # by this method if it's added again
+        with self.__db_lock:
+            names = self.__load_missing_methods()
+            if provider.name in names:
+                names.remove(provider.name)
+                self.__save_missing_methods(names)
+
+    def __load_missing_methods(self):
+        """
+        :returns: the names of the methods the albums in :attr:`missing`
+            were searched with
+        """
+        try:
+            with open(os.path.join(self.location, 'missing_covers.methods')) as f:
+                return f.read().split()
+        except OSError:
+            return []
+
+    def __save_missing_methods(self, names):
+        path = os.path.join(self.location, 'missing_covers.methods')
+        try:
+            with open(path + '.new', 'w') as f:
+                f.write('\n'.join(names))
+            os.replace(path + '.new', path)
+        except OSError:
+            logger.warning("Could not save %s", path, exc_info=True)
 
     def set_preferred_order(self, order):
         """
@@ -457,18 +892,22 @@ class CoverManager(providers.ProviderHandler):
         self.order = order
         settings.set_option('covers/preferred_order', list(order))
 
-    def get_cover_for_tracks(self, tracks, db_strings_to_ignore):
+    def get_cover_for_tracks(self, tracks, db_strings_to_ignore, size=None):
         """
         For tracks, try to find a cover
         Basically returns the first cover found
         :param tracks: list of tracks [xl.trax.Track]
         :param db_strings_to_ignore: list [str]
-        :return: GdkPixbuf.Pixbuf or None if no cover found
+        :param size: if set, return a thumbnail of this size instead,
+            see get_thumbnail_data [int]
+        :return: the raw image data or None if no cover found
         """
         for track in tracks:
             db_string = self.get_db_string(track)
             if db_string and db_string not in db_strings_to_ignore:
                 db_strings_to_ignore.append(db_string)
+                if size is not None:
+                    return self.get_thumbnail_data(db_string, size)
                 return self.get_cover_data(db_string)
 
         return None  # No cover found
@@ -492,6 +931,8 @@ class CoverSearchMethod:
     #: Priority for fixed-position backends. Lower is earlier, non-fixed
     #  backends will always be 50.
     fixed_priority = 50
+    #: How many threads may use the backend at once, None for no limit
+    concurrency = 1
 
     def find_covers(self, track, limit=-1):
         """
@@ -524,6 +965,7 @@ class TagCoverFetcher(CoverSearchMethod):
     cover_tags = ["cover", "coverart"]
     fixed = True
     fixed_priority = 30
+    concurrency = None
 
     def find_covers(self, track, limit=-1):
         covers = []
@@ -569,11 +1011,23 @@ class LocalFileCoverFetcher(CoverSearchMethod):
     preferred_names = []
     fixed = True
     fixed_priority = 31
+    concurrency = None
+    #: Number of directory listings to keep, about one per album of a
+    #  large library so that the listings made while scanning it are used
+    LISTING_CACHE_SIZE = 10000
+    #: Directories modified less than this many seconds ago are not cached,
+    #  since their mtime may not change with further changes
+    RECENT_SECONDS = 2
 
     def __init__(self):
         CoverSearchMethod.__init__(self)
 
+        # directory URI -> (mtime, image file names), least recently used first
+        self.__listings = collections.OrderedDict()
+        self.__listings_lock = threading.Lock()
+
         event.add_callback(self.on_option_set, 'covers_localfile_option_set')
+        event.add_callback(self.on_directory_listed, 'library_directory_listed')
         self.on_option_set(
             'covers_localfile_option_set', settings, 'covers/localfile/preferred_names'
         )
@@ -586,26 +1040,42 @@ class LocalFileCoverFetcher(CoverSearchMethod):
             return []
         basedir = Gio.File.new_for_uri(track.get_loc_for_io()).get_parent()
         try:
-            if (
-                not basedir.query_info(
-                    "standard::type", Gio.FileQueryInfoFlags.NONE, None
-                ).get_file_type()
-                == Gio.FileType.DIRECTORY
-            ):
-                return []
+            info = basedir.query_info(
+                "standard::type,time::modified", Gio.FileQueryInfoFlags.NONE, None
+            )
         except GLib.Error:
             return []
+        if not info.get_file_type() == Gio.FileType.DIRECTORY:
+            return []
+
+        uri = basedir.get_uri()
+        modified = info.get_modification_date_time()
+        mtime = modified.to_unix() if modified is not None else 0
+        with self.__listings_lock:
+            listing = self.__listings.get(uri)
+            if listing is not None:
+                self.__listings.move_to_end(uri)
+        if listing is not None and listing[0] == mtime:
+            names = listing[1]
+        else:
+            try:
+                names = self._get_image_names(
+                    fileinfo.get_name()
+                    for fileinfo in basedir.enumerate_children(
+                        "standard::type,standard::name",
+                        Gio.FileQueryInfoFlags.NONE,
+                        None,
+                    )
+                    if fileinfo.get_file_type() == Gio.FileType.REGULAR
+                )
+            except GLib.Error:
+                return []
+            self._add_listing(uri, mtime, names)
+
         covers = []
-        for fileinfo in basedir.enumerate_children(
-            "standard::type" ",standard::name", Gio.FileQueryInfoFlags.NONE, None
-        ):
-            gloc = basedir.get_child(fileinfo.get_name())
-            if not fileinfo.get_file_type() == Gio.FileType.REGULAR:
-                continue
-            filename = gloc.get_basename()
-            base, ext = os.path.splitext(filename)
-            if ext.lower() not in self.extensions:
-                continue
+        for filename in names:
+            gloc = basedir.get_child(filename)
+            base = os.path.splitext(filename)[0]
             if base in self.preferred_names:
                 covers.insert(0, gloc.get_uri())
             else:
@@ -615,6 +1085,29 @@ class LocalFileCoverFetcher(CoverSearchMethod):
         else:
             return covers[:limit]
 
+    def _get_image_names(self, names):
+        """
+        Returns the names of the possible cover images among file names
+        """
+        return [
+            name
+            for name in names
+            if os.path.splitext(name)[1].lower() in self.extensions
+        ]
+
+    def _add_listing(self, uri, mtime, names):
+        """
+        Caches the image names of a directory, unless it was modified too
+        recently to tell later changes by its mtime
+        """
+        if not mtime or mtime >= time.time() - self.RECENT_SECONDS:
+            return
+        with self.__listings_lock:
+            self.__listings[uri] = (mtime, names)
+            self.__listings.move_to_end(uri)
+            if len(self.__listings) > self.LISTING_CACHE_SIZE:
+                self.__listings.popitem(last=False)
+
     def get_cover_data(self, db_string):
         try:
             data = Gio.File.new_for_uri(db_string).load_contents(None)[1]
@@ -629,6 +1122,13 @@ class LocalFileCoverFetcher(CoverSearchMethod):
         if option == 'covers/localfile/preferred_names':
             self.preferred_names = settings.get_option(option, ['album', 'cover'])
 
+    def on_directory_listed(self, e, walk, listing):
+        """
+        Caches the directory listings made while scanning libraries
+        """
+        uri, mtime, names = listing
+        self._add_listing(uri, mtime, self._get_image_names(names))
+
 
 #: The singleton :class:`CoverManager` instance
 MANAGER = CoverManager(location=xdg.get_data_home_path("covers", check_exists=False))
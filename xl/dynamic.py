@@ -27,13 +27,17 @@
 import logging
 import os
 import random
+import threading
 import time
 
-from xl import xdg, providers, settings
+from xl import common, event, xdg, providers, settings
 from xl.trax import search
 
 logger = logging.getLogger(__name__)
 
+#: Similar artists are looked up again after one week
+SIMILAR_ARTISTS_EXPIRY = 604800
+
 
 class DynamicManager(providers.ProviderHandler):
     """
@@ -44,9 +48,20 @@ class DynamicManager(providers.ProviderHandler):
         providers.ProviderHandler.__init__(self, "dynamic_playlists")
         self.buffersize = settings.get_option("playback/dynamic_buffer", 5)
         self.collection = collection
-        self.cachedir = os.path.join(xdg.get_cache_dir(), 'dynamic')
-        if not os.path.exists(self.cachedir):
-            os.makedirs(self.cachedir)
+        self.cache_location = os.path.join(xdg.get_cache_dir(), 'dynamic.cache')
+        # artist -> (last update, similar artists), opened on first use
+        self.__cache = None
+        self.__cache_lock = threading.Lock()
+        event.add_callback(self.on_quit_application, 'quit_application')
+
+    def on_quit_application(self, *args):
+        """
+        Closes the similar artists cache
+        """
+        with self.__cache_lock:
+            if self.__cache is not None:
+                self.__cache.close()
+                self.__cache = None
 
     def find_similar_tracks(self, track, limit=-1, exclude=[]):
         """
@@ -65,26 +80,49 @@ class DynamicManager(providers.ProviderHandler):
             return []
         tracks = []
         random.shuffle(artists)
+        exclude = set(exclude)
+        artist_tracks = self.find_artist_tracks(artist for _rel, artist in artists)
         i = 0
         while (limit > len(tracks) or limit == -1) and i < len(artists):
-            artist = artists[i][1].replace('"', '\\\"')
+            choices = artist_tracks[artists[i][1]]
             i += 1
-            searchres = search.search_tracks_from_string(
-                self.collection, 'artist=="%s"' % artist, case_sensitive=False
-            )
-            choices = [x.track for x in searchres]
-            if choices == []:
-                continue
-            random.shuffle(choices)
-            j = 0
-            while j < len(choices):
-                track = choices[j]
-                if track not in exclude:
-                    tracks.append(track)
-                    break
-                j += 1
+            choices = [x for x in choices if x not in exclude]
+            if choices:
+                track = random.choice(choices)
+                tracks.append(track)
+                exclude.add(track)
         return tracks
 
+    def find_artist_tracks(self, artists):
+        """
+        Finds the tracks of the collection by each of the given artists,
+        case-insensitively.
+
+        The artists are looked up in the tag index of the collection when it
+        has one, so only the tracks which may match are checked.
+
+        @param artists: the artist names to look for
+        @return: a dict of artist name -> list of tracks
+        """
+        index = getattr(self.collection, 'tag_index', None)
+        result = {}
+        for artist in artists:
+            if artist in result:
+                continue
+            matcher = search.TracksMatcher(
+                'artist=="%s"' % artist.replace('"', '\\"'), case_sensitive=False
+            )
+            candidates = None if index is None else matcher.candidates(index)
+            if candidates is None:
+                result[artist] = [
+                    x.track for x in search.search_tracks(self.collection, [matcher])
+                ]
+            else:
+                result[artist] = [
+                    x for x in candidates if matcher.match(search.SearchResultTrack(x))
+                ]
+        return result
+
     def find_similar_artists(self, track):
         info = self._load_saved_info(track)
         if info == []:
@@ -104,40 +142,36 @@ class DynamicManager(providers.ProviderHandler):
         info.sort(reverse=True)  # TODO: merge artists that are the same
         return info
 
+    def __get_cache(self):
+        """
+        Opens the similar artists cache if needed, must hold the cache lock
+        """
+        if self.__cache is None:
+            self.__cache = common.open_shelf(self.cache_location)
+        return self.__cache
+
     def _load_saved_info(self, track):
-        artist = track.get_tag_raw('artist')
+        artist = track.get_tag_raw('artist', join=True)
         if not artist:
             return []
-        filename = os.path.join(self.cachedir, ','.join(artist))
-        if not os.path.exists(filename):
-            return []
-        with open(filename) as f:
-            line = f.readline()
-            if line == '':
+        with self.__cache_lock:
+            try:
+                last_update, info = self.__get_cache()[artist]
+            except KeyError:
                 return []
-            last_update = float(line)
-            if 604800 < time.time() - last_update:  # one week
-                info = self._query_sources(track)
-                if info != []:
-                    self._save_info(track, info)
-                    return info
-            info = []
-            for line in f:
-                try:
-                    rel, artist = line.strip().split(" ", 1)
-                    info.append((rel, artist))
-                except Exception:
-                    pass
-        return info
+        if SIMILAR_ARTISTS_EXPIRY < time.time() - last_update:
+            newinfo = self._query_sources(track)
+            if newinfo != []:
+                self._save_info(track, newinfo)
+                return newinfo
+        return list(info)
 
     def _save_info(self, track, info):
         if info == []:
             return
-        filename = os.path.join(self.cachedir, track.get_tag_raw('artist', join=True))
-        with open(filename, 'w') as f:
-            f.write("%s\n" % time.time())
-            for item in info:
-                f.write("%.2f %s\n" % item)
+        artist = track.get_tag_raw('artist', join=True)
+        with self.__cache_lock:
+            self.__get_cache()[artist] = (time.time(), list(info))
 
     def populate_playlist(self, playlist):
         """
@@ -155,16 +189,10 @@ class DynamicManager(providers.ProviderHandler):
             needed = 1
         curr = playlist.current
 
-        starttime = time.time()
         tracks = self.find_similar_tracks(curr, needed, playlist)
 
-        remainingtime = 5 - (time.time() - starttime)
-
-        if remainingtime > 0:
-            time.sleep(remainingtime)
-
         if playlist.current_position != current_pos:
-            return  # we skipped in that 5 seconds, so ignore it
+            return  # we skipped during the lookup, so ignore it
         playlist.extend(tracks)
         logger.debug("Added %s tracks.", len(tracks))
 
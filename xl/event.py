@@ -37,6 +37,7 @@ Events should be emitted AFTER the given event has taken place. Often the
 most appropriate spot is immediately before a return statement.
 """
 
+import contextlib
 from inspect import ismethod
 import logging
 import re
@@ -139,9 +140,61 @@ def add_ui_callback(function, evty=None, obj=None, *args, **kwargs):
     return EVENT_MANAGER.add_callback(function, evty, obj, args, kwargs, ui=True)
 
 
+def add_batch_callback(function, evty=None, obj=None, *args, **kwargs):
+    """
+    Adds a callback for batches of events.
+
+    Events emitted inside a :func:`batch` scope are delivered together
+    when the scope ends, as ``function(evty, events, *args, **kwargs)``
+    where `events` is the list of :class:`Event` of type `evty` that were
+    emitted, in order. Events emitted outside of a batch are delivered
+    right away, as a list of one event.
+
+    Use this for callbacks that can handle many events at once, e.g. to
+    refresh a view once for all the tracks whose tags changed during a
+    collection scan.
+
+    The parameters have the same meaning as for :func:`add_callback`.
+
+    :returns: a convenience function that you can call to remove the callback.
+    """
+    global EVENT_MANAGER
+    return EVENT_MANAGER.add_callback(function, evty, obj, args, kwargs, batch=True)
+
+
+def add_ui_batch_callback(function, evty=None, obj=None, *args, **kwargs):
+    """
+    Adds a callback for batches of events, see :func:`add_batch_callback`.
+    The callback is guaranteed to always be called on the UI thread.
+
+    :returns: a convenience function that you can call to remove the callback.
+    """
+    global EVENT_MANAGER
+    return EVENT_MANAGER.add_callback(
+        function, evty, obj, args, kwargs, ui=True, batch=True
+    )
+
+
+def batch():
+    """
+    Returns a context manager which collects the events emitted by the
+    current thread, to deliver them together to batch callbacks when the
+    outermost scope ends. Other callbacks are still called for each event
+    as it is emitted.
+
+    Example::
+
+        with event.batch():
+            for track in tracks:
+                track.set_tag_raw('genre', genre)
+    """
+    global EVENT_MANAGER
+    return EVENT_MANAGER.batch()
+
+
 def remove_callback(function, evty=None, obj=None):
     """
-    Removes a callback. Can remove both ui and non-ui callbacks.
+    Removes a callback. Can remove ui, non-ui and batch callbacks.
 
     The parameters passed should match those that were passed when adding
     the callback
@@ -262,11 +315,23 @@ class EventManager:
     Manages all Events
     """
 
+    #: A batch delivers its events early once it holds this many
+    BATCH_SIZE = 1000
+
     def __init__(self, use_logger=False, logger_filter=None, verbose=False):
         # sacrifice space for speed in emit
         self.all_callbacks = {}
         self.callbacks = {}
         self.ui_callbacks = {}
+        self.all_batch_callbacks = {}
+        self.batch_callbacks = {}
+        self.ui_batch_callbacks = {}
+        # (id of callbacks dict, event type) -> callbacks for any object,
+        # callbacks per object (or None), see _get_callbacks. Cleared when
+        # callbacks are added or removed.
+        self.dispatch_tables = {}
+        # per thread: events of the open batch, batch nesting depth
+        self.batches = threading.local()
         self.use_logger = use_logger
         self.use_verbose_logger = verbose
         self.logger_filter = logger_filter
@@ -300,53 +365,101 @@ class EventManager:
             self._emit(event, self.all_callbacks, emit_logmsg, emit_verbose)
         else:
             # Don't issue the log message twice
-            with self.pending_ui_lock:
-                do_emit = not self.pending_ui
-                self.pending_ui.append(
-                    (event, self.ui_callbacks, emit_logmsg, emit_verbose)
+            if emit_logmsg or self._get_callbacks(
+                self.ui_callbacks, event.type, event.object
+            ):
+                self._queue_ui(
+                    self._emit, (event, self.ui_callbacks, emit_logmsg, emit_verbose)
                 )
-
-            if do_emit:
-                GLib.idle_add(self._emit_pending)
             self._emit(event, self.callbacks, False, emit_verbose)
 
+        if self.all_batch_callbacks:
+            events = getattr(self.batches, 'events', None)
+            if events is None:
+                self._emit_batch([event])
+            else:
+                events.append(event)
+                if len(events) >= self.BATCH_SIZE:
+                    self.batches.events = []
+                    self._emit_batch(events)
+
+    def _queue_ui(self, function, args):
+        """
+        Calls `function` with `args` on the UI thread, after the calls
+        queued before
+        """
+        with self.pending_ui_lock:
+            do_emit = not self.pending_ui
+            self.pending_ui.append((function, args))
+
+        if do_emit:
+            GLib.idle_add(self._emit_pending)
+
     def _emit_pending(self):
         with self.pending_ui_lock:
-            events = self.pending_ui
+            calls = self.pending_ui
             self.pending_ui = []
 
-        for event in events:
-            self._emit(*event)
+        for function, args in calls:
+            function(*args)
 
-    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose):
-        # Accumulate in this set to ensure callbacks only get called once
-        callbacks = set()
+    def _get_callbacks(self, exc_callbacks, evty, obj):
+        """
+        :returns: the callbacks of `exc_callbacks` for an event
 
+        The callbacks for each event type are looked up once and kept in
+        :attr:`dispatch_tables` until callbacks are added or removed.
+        """
+        key = (id(exc_callbacks), evty)
+        table = self.dispatch_tables.get(key)
+        if table is None:
+            with self.lock:
+                any_object = []
+                per_object = weakref.WeakKeyDictionary()
+                for tcall in [_NONE, evty]:
+                    tcb = exc_callbacks.get(tcall)
+                    if tcb is None:
+                        continue
+                    for ocall, ocb in tcb.items():
+                        if ocall is _NONE:
+                            any_object.extend(ocb)
+                        else:
+                            per_object[ocall] = per_object.get(ocall, ()) + tuple(ocb)
+                table = (tuple(any_object), per_object or None)
+                self.dispatch_tables[key] = table
+
+        callbacks, per_object = table
+        if per_object is not None:
+            callbacks += per_object.get(obj, ())
+        return callbacks
+
+    def _forget_callback(self, exc_callbacks, cb):
+        """
+        Removes a callback that has been garbage collected.. but really,
+        should be using remove_callback to clean up after your event handler
+        """
         with self.lock:
-            for tcall in [_NONE, event.type]:
-                tcb = exc_callbacks.get(tcall)
-                if tcb is not None:
-                    for ocall in [_NONE, event.object]:
-                        ocb = tcb.get(ocall)
-                        if ocb is not None:
-                            callbacks.update(ocb)
-
-        # However, do not actually call the callbacks from within the lock
+            for evty, tcb in list(exc_callbacks.items()):
+                for obj, callbacks in list(tcb.items()):
+                    if cb in callbacks:
+                        callbacks.remove(cb)
+                        if not callbacks:
+                            del tcb[obj]
+                if not tcb:
+                    del exc_callbacks[evty]
+            self.dispatch_tables = {}
+
+    def _emit(self, event, exc_callbacks, emit_logmsg, emit_verbose):
+        # Do not call the callbacks from within the lock
         # -> Otherwise non-ui threads could accidentally block the UI if
         #    they decide to run for too long
+        callbacks = self._get_callbacks(exc_callbacks, event.type, event.object)
 
         for cb in callbacks:
             try:
                 fn = cb.wfunction()
                 if fn is None:
-                    # Remove callbacks that have been garbage collected.. but
-                    # really, should be using remove_callback to clean up after
-                    # your event handler
-                    with self.lock:
-                        try:
-                            exc_callbacks[event.type][event.object].remove(cb)
-                        except (KeyError, ValueError):
-                            pass
+                    self._forget_callback(exc_callbacks, cb)
                 else:
                     if emit_verbose:
                         logger.debug(
@@ -370,13 +483,66 @@ class EventManager:
                 event.data,
             )
 
+    def _emit_batch(self, events):
+        """
+        Delivers the events of a batch to the batch callbacks
+        """
+        if threading.current_thread() == _UiThread:
+            self._call_batch(events, self.all_batch_callbacks)
+        else:
+            if self.ui_batch_callbacks:
+                self._queue_ui(self._call_batch, (events, self.ui_batch_callbacks))
+            self._call_batch(events, self.batch_callbacks)
+
+    def _call_batch(self, events, exc_callbacks):
+        # (callback, event type) -> events, in order
+        calls = {}
+        for event in events:
+            for cb in self._get_callbacks(exc_callbacks, event.type, event.object):
+                try:
+                    calls[(cb, event.type)].append(event)
+                except KeyError:
+                    calls[(cb, event.type)] = [event]
+
+        for (cb, evty), cb_events in calls.items():
+            try:
+                fn = cb.wfunction()
+                if fn is None:
+                    self._forget_callback(exc_callbacks, cb)
+                else:
+                    fn(evty, cb_events, *cb.args, **cb.kwargs)
+                fn = None
+            except Exception:
+                logger.exception("Event callback exception caught!")
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collects the events emitted by this thread within the scope, see
+        :func:`xl.event.batch`
+        """
+        batches = self.batches
+        depth = getattr(batches, 'depth', 0)
+        if depth == 0:
+            batches.events = []
+        batches.depth = depth + 1
+        try:
+            yield
+        finally:
+            batches.depth = depth
+            if depth == 0:
+                events = batches.events
+                batches.events = None
+                if events:
+                    self._emit_batch(events)
+
     def emit_async(self, event):
         """
         Same as emit(), but does not block.
         """
         GLib.idle_add(self.emit, event)
 
-    def add_callback(self, function, evty, obj, args, kwargs, ui=False):
+    def add_callback(self, function, evty, obj, args, kwargs, ui=False, batch=False):
         """
         Registers a callback.
         You should always specify at least one of event type or object.
@@ -386,12 +552,20 @@ class EventManager:
             to any. [string]
         @param obj: The object to listen to events from. Defaults
             to any. [string]
+        @param ui: Whether to call the function on the UI thread
+        @param batch: Whether the function takes batches of events, see
+            :func:`xl.event.add_batch_callback`
 
         Returns a convenience function that you can call to
         remove the callback.
         """
 
-        if ui:
+        if batch:
+            all_cbs = [
+                self.ui_batch_callbacks if ui else self.batch_callbacks,
+                self.all_batch_callbacks,
+            ]
+        elif ui:
             all_cbs = [self.ui_callbacks, self.all_callbacks]
         else:
             all_cbs = [self.callbacks, self.all_callbacks]
@@ -418,6 +592,8 @@ class EventManager:
                 # add the actual callback
                 callbacks.append(cb)
 
+            self.dispatch_tables = {}
+
         if self.use_logger:
             if (
                 not self.logger_filter
@@ -446,7 +622,15 @@ class EventManager:
             obj = _NONE
 
         with self.lock:
-            for cbs in [self.callbacks, self.all_callbacks, self.ui_callbacks]:
+            self.dispatch_tables = {}
+            for cbs in [
+                self.callbacks,
+                self.all_callbacks,
+                self.ui_callbacks,
+                self.batch_callbacks,
+                self.all_batch_callbacks,
+                self.ui_batch_callbacks,
+            ]:
                 remove = []
                 try:
                     callbacks = cbs[evty][obj]
@@ -37,10 +37,23 @@ from typing import Dict, Tuple, Union
 from gi.repository import GLib
 from gi.repository import GObject
 
-from xl import common, providers, settings, trax
+from xl import common, event, providers, settings, trax
 from xl.common import TimeSpan
 from xl.nls import gettext as _, ngettext
 
+#: Changes whenever tag formatting providers are added or removed, so that
+#: compiled templates look their providers up again
+_provider_generation = 0
+
+
+def _on_provider_changed(*args):
+    global _provider_generation
+    _provider_generation += 1
+
+
+event.add_callback(_on_provider_changed, 'tag-formatting_provider_added')
+event.add_callback(_on_provider_changed, 'tag-formatting_provider_removed')
+
 
 # NOTE: the following two classes used to subclass string._TemplateMetaclass
 # and string.Template from string module. However, python 3.9 reorganized
@@ -158,6 +171,63 @@ class ParameterTemplate(metaclass=_ParameterTemplateMetaclass):
         return self.pattern.sub(convert, self.template)
 
 
+class _Segment:
+    """
+    An identifier of a compiled format, with its parameters
+    """
+
+    __slots__ = [
+        'identifier',
+        'arguments',
+        'parameters',
+        'prefix',
+        'suffix',
+        'pad',
+        'padstring',
+        'provider',
+    ]
+
+    def __init__(self, identifier, arguments):
+        """
+        :param identifier: the identifier
+        :param arguments: all parameters of the identifier
+        """
+        self.identifier = identifier
+        self.arguments = arguments
+        parameters = dict(arguments)
+        self.prefix = parameters.pop('prefix', '')
+        self.suffix = parameters.pop('suffix', '')
+        self.pad = parameters.pop('pad', 0)
+        self.padstring = parameters.pop('padstring', '')
+        #: the parameters left for the substitution
+        self.parameters = parameters
+        #: the tag formatting provider, see :class:`TrackFormatter`
+        self.provider = None
+
+    def decorate(self, substitute):
+        """
+        Applies the padding, prefix and suffix to a substituted value
+        """
+        pad = int(self.pad)
+        padstring = self.padstring
+
+        if pad > 0 and padstring:
+            # Decrease pad length by value length
+            pad = max(0, pad - len(substitute))
+            # Retrieve the maximum multiplier for the pad string
+            padcount = pad // len(padstring) + 1
+            # Generate pad string
+            padstring = padcount * padstring
+            # Clamp pad string
+            padstring = padstring[0:pad]
+            substitute = '%s%s' % (padstring, substitute)
+
+        if substitute:
+            substitute = '%s%s%s' % (self.prefix, substitute, self.suffix)
+
+        return substitute
+
+
 class Formatter(GObject.Object):
     R"""
     A generic text formatter based on a format string
@@ -193,6 +263,7 @@ class Formatter(GObject.Object):
 
         self._template = ParameterTemplate(format)
         self._substitutions = {}
+        self.__compiled = None
 
     def do_get_property(self, property):
         """
@@ -232,17 +303,55 @@ class Formatter(GObject.Object):
 
         :returns: the extractions
         """
-        matches = self._template.pattern.finditer(self._template.template)
-        extractions: Formatter.Extractions = {}
+        _parts, segments = self._compile()
+        return {
+            needle: (segment.identifier, dict(segment.arguments))
+            for needle, segment in segments.items()
+        }
+
+    def _compile(self):
+        """
+        Compiles the format string, or returns the compiled format if the
+        format string did not change since
+
+        The compiled format is a list of ``(text, needle)`` parts, and a
+        dict of needle -> :class:`_Segment` for the identifiers. Literal
+        parts have no needle; the text of the other parts is used in
+        place of identifiers without substitution.
+        """
+        template = self._template.template
+        compiled = self.__compiled
+        if (
+            compiled is None
+            or compiled[0] != template
+            or compiled[1] != _provider_generation
+        ):
+            generation = _provider_generation
+            parts, segments = self._build(template)
+            compiled = self.__compiled = (template, generation, parts, segments)
+        return compiled[2], compiled[3]
+
+    def _build(self, template):
+        """
+        Compiles a format string, see :meth:`_compile`
+        """
+        delimiter = self._template.delimiter
+        parts = []
+        segments = {}
+        text = []
+        end = 0
 
         # Extract list of identifiers and parameters from the format string
-        for match in matches:
+        for match in self._template.pattern.finditer(template):
             groups = match.groupdict()
+            text.append(template[end : match.start()])
+            end = match.end()
 
             # We only care about braced and named, not escaped and invalid
             identifier = groups['braced'] or groups['named']
 
             if identifier is None:
+                text.append(delimiter)
                 continue
 
             identifier_parts = [identifier]
@@ -274,9 +383,38 @@ class Formatter(GObject.Object):
 
             # Required to make multiple occurrences of the same
             # identifier with different parameters work
-            extractions[':'.join(identifier_parts)] = (identifier, parameters)
+            needle = ':'.join(identifier_parts)
+            segments[needle] = _Segment(identifier, parameters)
+
+            if text:
+                parts.append((''.join(text), None))
+                text = []
+            if groups['braced'] is None:
+                parts.append((delimiter + needle, needle))
+            else:
+                parts.append((delimiter + '{' + needle + '}', needle))
+
+        text.append(template[end:])
+        parts.append((''.join(text), None))
 
-        return extractions
+        return parts, segments
+
+    @staticmethod
+    def _join(parts, substitutions):
+        """
+        Joins the parts of a compiled format, with the substitutions
+        for their needles
+        """
+        return ''.join(
+            [
+                (
+                    text
+                    if needle is None or needle not in substitutions
+                    else '%s' % (substitutions[needle],)
+                )
+                for text, needle in parts
+            ]
+        )
 
     def format(self, *args):
         """
@@ -286,43 +424,24 @@ class Formatter(GObject.Object):
         :returns: the formatted text
         :rtype: string
         """
-        extractions = self.extract()
+        parts, segments = self._compile()
         substitutions = {}
 
-        for needle, (identifier, parameters) in extractions.items():
+        for needle, segment in segments.items():
             substitute = None
 
             if needle in self._substitutions:
                 substitute = self._substitutions[needle]
-            elif identifier in self._substitutions:
-                substitute = self._substitutions[identifier]
+            elif segment.identifier in self._substitutions:
+                substitute = self._substitutions[segment.identifier]
 
             if substitute is not None:
-                prefix = parameters.pop('prefix', '')
-                suffix = parameters.pop('suffix', '')
-                pad = int(parameters.pop('pad', 0))
-                padstring = parameters.pop('padstring', '')
-
                 if callable(substitute):
-                    substitute = substitute(*args, **parameters)
-
-                if pad > 0 and padstring:
-                    # Decrease pad length by value length
-                    pad = max(0, pad - len(substitute))
-                    # Retrieve the maximum multiplier for the pad string
-                    padcount = pad // len(padstring) + 1
-                    # Generate pad string
-                    padstring = padcount * padstring
-                    # Clamp pad string
-                    padstring = padstring[0:pad]
-                    substitute = '%s%s' % (padstring, substitute)
-
-                if substitute:
-                    substitute = '%s%s%s' % (prefix, substitute, suffix)
+                    substitute = substitute(*args, **segment.parameters)
 
-                substitutions[needle] = substitute
+                substitutions[needle] = segment.decorate(substitute)
 
-        return self._template.safe_substitute(substitutions)
+        return self._join(parts, substitutions)
 
 
 class ProgressTextFormatter(Formatter):
@@ -405,23 +524,58 @@ class TrackFormatter(Formatter):
                 'First argument to format() needs ' 'to be of type xl.trax.Track'
             )
 
-        extractions = self.extract()
-        self._substitutions = {}
+        parts, segments = self._compile()
+        return self.__format(parts, segments, track, markup_escape)
 
-        for identifier, (tag, parameters) in extractions.items():
-            provider = providers.get_provider('tag-formatting', tag)
+    def format_many(self, tracks, markup_escape=False):
+        """
+        Returns the strings for many tracks at once, sparing
+        the lookup of the compiled format for each track
+
+        :param tracks: the tracks to take data from
+        :type tracks: iterable of :class:`xl.trax.Track`
+        :param markup_escape: whether to escape markup-like
+            characters in tag values
+        :type markup_escape: bool
+        :returns: the formatted texts, in the order of `tracks`
+        :rtype: list of strings
+        """
+        parts, segments = self._compile()
+        return [
+            self.__format(parts, segments, track, markup_escape) for track in tracks
+        ]
+
+    def _build(self, template):
+        """
+        Compiles a format string, binding the tag formatting providers
+        """
+        parts, segments = Formatter._build(self, template)
+
+        for segment in segments.values():
+            segment.provider = providers.get_provider(
+                'tag-formatting', segment.identifier
+            )
+
+        return parts, segments
+
+    def __format(self, parts, segments, track, markup_escape):
+        substitutions = {}
+
+        for needle, segment in segments.items():
+            provider = segment.provider
 
             if provider is None:
-                substitute = track.get_tag_display(tag)
+                substitute = track.get_tag_display(segment.identifier)
             else:
-                substitute = provider.format(track, parameters)
+                substitute = provider.format(track, segment.arguments)
 
             if markup_escape:
                 substitute = GLib.markup_escape_text(substitute)
 
-            self._substitutions[identifier] = substitute
+            if substitute is not None:
+                substitutions[needle] = segment.decorate(substitute)
 
-        return Formatter.format(self)
+        return self._join(parts, substitutions)
 
 
 class TagFormatter:
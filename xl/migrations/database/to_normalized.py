@@ -0,0 +1,125 @@
+# Copyright (C) 2026  The Exaile developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+__all__ = ['migrate', 'revert']
+
+import logging
+import os
+import shelve
+import shutil
+import sqlite3
+
+from xl import common, sqlitedbm
+from xl.trax.trackstore import SqliteTrackStore
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(path: str) -> bool:
+    """
+    Move a track database from a shelf (one pickle per track) to a normalized
+    :class:`SqliteTrackStore` in the same file.
+
+    A copy of the original file is kept as ``<path>-shelf.bak``.
+
+    :return: Whether a migration is performed
+    """
+    if not os.path.exists(path):
+        return False
+
+    pdata = common.open_shelf(path)
+    try:
+        if not len(pdata):
+            return False
+
+        version = pdata.get('_dbversion')
+        if version is not None and version < 2:
+            import xl.migrations.database as dbmig
+
+            dbmig.handle_migration(None, pdata, version, 2.0)
+
+        logger.info("Moving %s to the normalized track store", path)
+        shutil.copyfile(path, path + "-shelf.bak")
+
+        with SqliteTrackStore(path) as store, store.transaction():
+            for k, value in pdata.items():
+                if k.startswith("tracks-"):
+                    tags, key, attrs = value
+                    store.put_track(key, tags, attrs)
+                else:
+                    store.set_meta(k, value)
+    finally:
+        pdata.close()
+
+    _drop_tables(path, "Dict")
+    return True
+
+
+def revert(path: str) -> bool:
+    """
+    Move a track database from a normalized :class:`SqliteTrackStore` back to
+    a shelf, e.g. after switching ``collection/database_engine`` back to
+    ``shelve``.
+
+    :return: Whether a migration is performed
+    """
+    if not SqliteTrackStore.is_track_store(path):
+        return False
+
+    logger.info("Moving %s back to the shelf track database", path)
+    shutil.copyfile(path, path + "-normalized.bak")
+
+    # Read everything first so that the two connections don't fight over the
+    # database lock.
+    with SqliteTrackStore(path) as store:
+        items = [
+            ("tracks-%s" % key, (tags, key, attrs))
+            for key, tags, attrs in store.iter_tracks()
+        ]
+        items.extend(store.iter_meta())
+
+    pdata = shelve.Shelf(
+        sqlitedbm.SqliteDbm(path, autocommit=False), protocol=common.PICKLE_PROTOCOL
+    )
+    try:
+        for k, value in items:
+            pdata[k] = value
+    finally:
+        pdata.close()
+
+    _drop_tables(path, "Tracks", "TrackTags", "Meta")
+    return True
+
+
+def _drop_tables(path: str, *tables: str) -> None:
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            for table in tables:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
@@ -29,21 +29,23 @@ Provides the fundamental objects for handling a list of tracks contained
 in playlists as well as methods to import and export from various file formats.
 """
 
-from gi.repository import Gio
+from gi.repository import Gio, GLib
 
+import bisect
 from collections import deque
 from datetime import datetime, timedelta
 import logging
-import operator
 import os
 import pickle
 import random
 import re
 import sys
+import threading
 import time
 from typing import NamedTuple
 import urllib.parse
 import urllib.request
+import weakref
 
 from xl import common, dynamic, event, main, providers, settings, trax, xdg
 from xl.common import GioFileInputStream, GioFileOutputStream, MetadataList
@@ -904,6 +906,160 @@ class XSPFConverter(FormatConverter):
 providers.register('playlist-format-converter', XSPFConverter())
 
 
+_unread_tracks = []
+_unread_tracks_lock = threading.Lock()
+
+
+def _read_tags_later(tracks):
+    """
+    Reads the tags of tracks in the background once the main loop is
+    idle, skipping tracks which are gone by then (e.g. because their
+    playlist was only loaded for its name)
+    """
+    with _unread_tracks_lock:
+        start = not _unread_tracks
+        _unread_tracks.extend(weakref.ref(track) for track in tracks)
+    if start:
+        GLib.idle_add(_read_unread_tracks)
+
+
+def _read_unread_tracks():
+    with _unread_tracks_lock:
+        refs = _unread_tracks[:]
+        del _unread_tracks[:]
+    _read_tags(refs)
+    return False
+
+
+@common.threaded
+def _read_tags(refs):
+    with event.batch():
+        for ref in refs:
+            track = ref()
+            if track is not None:
+                track.read_tags()
+
+
+class _ShuffleState:
+    """
+    Shuffle candidates of a playlist, kept so that picking the next
+    track does not need to look at the whole playlist
+
+    Positions with shuffle history are not candidates. Positions are
+    also grouped by album, in disc and track number order.
+    """
+
+    def __init__(self, tracks, played):
+        """
+        :param tracks: the tracks of the playlist
+        :param played: the positions with shuffle history
+        """
+        self.remaining = []
+        self.slots = {}
+        self.album_keys = []
+        self.albums = {}
+        self.album_counts = {}
+        self.album_choices = []
+        self.album_slots = {}
+        self.__add_tracks(0, tracks, set(played), list.append)
+        for group in self.albums.values():
+            group.sort()
+
+    @staticmethod
+    def album_key(track):
+        album = track.get_tag_raw('album')
+        if album is not None:
+            album = tuple(album)
+        return album
+
+    def __add_tracks(self, start, tracks, played, add):
+        albums = self.albums
+        for position, track in enumerate(tracks, start):
+            album = self.album_key(track)
+            self.album_keys.append(album)
+            sort_key = (
+                [
+                    track.get_tag_sort('discnumber'),
+                    track.get_tag_sort('tracknumber'),
+                ],
+                position,
+            )
+            add(albums.setdefault(album, []), sort_key)
+            if position not in played:
+                self.unmark_played(position)
+
+    def extend(self, start, tracks):
+        """
+        Adds tracks appended to the playlist at ``start``
+        """
+        self.__add_tracks(start, tracks, (), bisect.insort)
+
+    def mark_played(self, position):
+        """
+        Removes a position from the candidates
+        """
+        slot = self.slots.pop(position, None)
+        if slot is None:
+            return
+        last = self.remaining.pop()
+        if last != position:
+            self.remaining[slot] = last
+            self.slots[last] = slot
+
+        album = self.album_keys[position]
+        self.album_counts[album] -= 1
+        if not self.album_counts[album] and album:
+            slot = self.album_slots.pop(album)
+            last = self.album_choices.pop()
+            if last != album:
+                self.album_choices[slot] = last
+                self.album_slots[last] = slot
+
+    def unmark_played(self, position):
+        """
+        Adds a position back to the candidates
+        """
+        if position in self.slots:
+            return
+        self.slots[position] = len(self.remaining)
+        self.remaining.append(position)
+
+        album = self.album_keys[position]
+        count = self.album_counts.get(album, 0)
+        self.album_counts[album] = count + 1
+        if not count and album:
+            self.album_slots[album] = len(self.album_choices)
+            self.album_choices.append(album)
+
+    def random_track(self):
+        """
+        :returns: a random candidate position, or -1
+        """
+        if not self.remaining:
+            return -1
+        return random.choice(self.remaining)
+
+    def random_album(self):
+        """
+        :returns: the first position of a random album with
+            candidates left, or -1
+        """
+        if not self.album_choices:
+            return -1
+        album = random.choice(self.album_choices)
+        return self.albums[album][0][1]
+
+    def next_on_album(self, position):
+        """
+        :returns: the position of the track following the one at
+            ``position`` on its album, further down the playlist, or -1
+        """
+        for sort_key, next_position in self.albums[self.album_keys[position]]:
+            if next_position > position:
+                return next_position
+        return -1
+
+
 class Playlist:
     # TODO: how do we document events in sphinx?
     """
@@ -977,6 +1133,8 @@ class Playlist:
         # spat_position: <int> index in self.__tracks or -1 if no SPAT set
         # shuffle_history_counter: <int> count of tracks queued in shuffle mode
         #   Start positive so we can just do an if directly on the value.
+        # shuffle_state: <_ShuffleState> or None, built when shuffling
+        #   and dropped when tracks are changed other than appended.
         self.__dirty = False
         self.__needs_save = False
         self.__name = name
@@ -984,6 +1142,7 @@ class Playlist:
         self.__current_position = -1
         self.__spat_position = -1
         self.__shuffle_history_counter = 1
+        self.__shuffle_state = None
 
         event.add_callback(self.on_playback_track_start, "playback_track_start")
 
@@ -1099,8 +1258,8 @@ class Playlist:
         """
         return [
             (i, self.__tracks[i])
-            for i in range(len(self))
-            if self.__tracks.get_meta_key(i, 'playlist_shuffle_history')
+            for i, meta in self.__tracks.meta_items()
+            if meta.get('playlist_shuffle_history')
         ]
 
     def clear_shuffle_history(self):
@@ -1108,11 +1267,17 @@ class Playlist:
         Clear the history of played
         tracks from a shuffle run
         """
-        for i in range(len(self)):
-            try:
+        for i, meta in self.__tracks.meta_items():
+            if "playlist_shuffle_history" in meta:
                 self.__tracks.del_meta_key(i, "playlist_shuffle_history")
-            except Exception:
-                pass
+        self.__shuffle_state = None
+
+    def __get_shuffle_state(self):
+        if self.__shuffle_state is None:
+            self.__shuffle_state = _ShuffleState(
+                self.__tracks, (i for i, tr in self.get_shuffle_history())
+            )
+        return self.__shuffle_state
 
     @common.threaded
     def __fetch_dynamic_tracks(self):
@@ -1123,61 +1288,34 @@ class Playlist:
         Returns a valid next track if shuffle is activated based
         on random_mode
         """
+        if mode == 'random':
+            if not self.__tracks:
+                return -1, None
+            position = random.randrange(len(self.__tracks))
+            return position, self.__tracks[position]
+
+        state = self.__get_shuffle_state()
         if mode == "album":
-            # TODO: we really need proper album-level operations in
-            # xl.trax for this
-            try:
-                # Try and get the next track on the album
+            position = -1
+            if current_position != -1:
+                # Regroup if the album of the current track was changed
+                track = self.__tracks[current_position]
+                if state.album_keys[current_position] != state.album_key(track):
+                    self.__shuffle_state = None
+                    state = self.__get_shuffle_state()
                 # NB If the user starts the playlist from the middle
                 # of the album some tracks of the album remain off the
                 # tracks_history, and the album can be selected again
                 # randomly from its first track
-                if current_position == -1:
-                    raise IndexError
-                curr = self[current_position]
-                t = [
-                    x
-                    for i, x in enumerate(self)
-                    if x.get_tag_raw('album') == curr.get_tag_raw('album')
-                    and i > current_position
-                ]
-                t = trax.sort_tracks(['discnumber', 'tracknumber'], t)
-                return self.__tracks.index(t[0]), t[0]
-
-            except IndexError:  # Pick a new album
-                hist = set(self.get_shuffle_history())
-                albums = set()
-                for i, x in enumerate(self):
-                    if (i, x) in hist:
-                        continue
-                    alb = x.get_tag_raw('album')
-                    if alb:
-                        albums.add(tuple(alb))
-                if not albums:
-                    return -1, None
-                album = list(random.choice(list(albums)))
-                t = [x for x in self if x.get_tag_raw('album') == album]
-                t = trax.sort_tracks(['tracknumber'], t)
-                return self.__tracks.index(t[0]), t[0]
-        elif mode == 'random':
-            try:
-                return random.choice(
-                    [(i, self.__tracks[i]) for i, tr in enumerate(self.__tracks)]
-                )
-            except IndexError:
-                return -1, None
+                position = state.next_on_album(current_position)
+            if position == -1:  # Pick a new album
+                position = state.random_album()
         else:
-            hist = {i for i, tr in self.get_shuffle_history()}
-            try:
-                return random.choice(
-                    [
-                        (i, self.__tracks[i])
-                        for i, tr in enumerate(self.__tracks)
-                        if i not in hist
-                    ]
-                )
-            except IndexError:  # no more tracks
-                return -1, None
+            position = state.random_track()
+
+        if position == -1:  # no more tracks
+            return -1, None
+        return position, self.__tracks[position]
 
     def __get_next(self, current_position):
         # don't recalculate
@@ -1204,6 +1342,8 @@ class Playlist:
                     self.__shuffle_history_counter,
                 )
                 self.__shuffle_history_counter += 1
+                if self.__shuffle_state is not None:
+                    self.__shuffle_state.mark_played(current_position)
             next_index, next = self.__next_random_track(current_position, shuffle_mode)
             if next is None:
                 self.clear_shuffle_history()
@@ -1281,13 +1421,18 @@ class Playlist:
 
         if shuffle_mode != 'disabled':
             shuffle_hist, prev_index = max(
-                (self.__tracks.get_meta_key(i, 'playlist_shuffle_history', 0), i)
-                for i in range(len(self))
+                (
+                    (meta.get('playlist_shuffle_history', 0), i)
+                    for i, meta in self.__tracks.meta_items()
+                ),
+                default=(0, -1),
             )
 
             if shuffle_hist:
                 self.current_position = prev_index
                 self.__tracks.del_meta_key(prev_index, 'playlist_shuffle_history')
+                if self.__shuffle_state is not None:
+                    self.__shuffle_state.unmark_played(prev_index)
         else:
             position = self.current_position - 1
             if position < 0:
@@ -1402,29 +1547,28 @@ class Playlist:
         :param positions: list of track positions to randomize
         :type positions: iterable
         """
-        # Turn 2 lists into a list of tuples
-        tracks = list(zip(self.__tracks, self.__tracks.metadata))
+        # Shuffle the indices, then take the tracks in that order
+        order = list(range(len(self.__tracks)))
 
         if positions:
             # For 2 items, simple swapping is most reasonable
             if len(positions) == 2:
-                tracks[positions[0]], tracks[positions[1]] = (
-                    tracks[positions[1]],
-                    tracks[positions[0]],
+                order[positions[0]], order[positions[1]] = (
+                    order[positions[1]],
+                    order[positions[0]],
                 )
             else:
                 # Extract items and shuffle them
-                shuffle_tracks = [t for i, t in enumerate(tracks) if i in positions]
-                random.shuffle(shuffle_tracks)
+                shuffle_order = sorted(set(positions))
+                random.shuffle(shuffle_order)
 
                 # Put shuffled items back
                 for position in positions:
-                    tracks[position] = shuffle_tracks.pop()
+                    order[position] = shuffle_order.pop()
         else:
-            random.shuffle(tracks)
+            random.shuffle(order)
 
-        # Turn list of tuples into 2 tuples
-        self[:] = MetadataList(*zip(*tracks))
+        self[:] = self.__tracks.permuted(order)
 
     def sort(self, tags, reverse=False):
         """
@@ -1435,14 +1579,13 @@ class Playlist:
         :param reverse: whether the sorting shall be reversed
         :type reverse: boolean
         """
-        data = zip(self.__tracks, self.__tracks.metadata)
-        data = trax.sort_tracks(
-            tags, data, trackfunc=operator.itemgetter(0), reverse=reverse
+        order = trax.sort_tracks(
+            tags,
+            range(len(self.__tracks)),
+            trackfunc=self.__tracks.__getitem__,
+            reverse=reverse,
         )
-        l = MetadataList()
-        l.extend([x[0] for x in data])
-        l.metadata = [x[1] for x in data]
-        self[:] = l
+        self[:] = self.__tracks.permuted(order)
 
     # TODO[0.4?]: drop our custom disk playlist format in favor of an
     # extended XSPF playlist (using xml namespaces?).
@@ -1536,6 +1679,7 @@ class Playlist:
         f.close()
 
         trs = []
+        unread = []
 
         for loc in locs:
             meta = None
@@ -1544,13 +1688,18 @@ class Playlist:
                 loc = "\t".join(splitted[:-1])
                 meta = splitted[-1]
 
-            track = None
-            track = trax.Track(uri=loc)
-
-            # re-add meta
-            if not track:
-                continue
-            if not track.is_local() and meta is not None:
+            # Tracks of the collection are known already. The tags of
+            # others are read later, until then the saved ones are used.
+            track = trax.Track.get_existing(loc)
+            unknown = track is None
+            if unknown:
+                track = trax.Track(uri=loc, scan=False)
+                if track.is_local():
+                    unread.append(track)
+
+            # re-add meta, unless the track was loaded already, e.g. by
+            # the collection, and may have newer tags
+            if meta is not None and unknown:
                 meta = urllib.parse.parse_qs(meta)
                 for k, v in meta.items():
                     track.set_tag_raw(k, v[0], notify_changed=False)
@@ -1558,6 +1707,9 @@ class Playlist:
             trs.append(track)
 
         self.__tracks[:] = trs
+        self.__shuffle_state = None
+        if unread:
+            _read_tags_later(unread)
 
         for item, val in items.items():
             if item in self.save_attrs:
@@ -1593,6 +1745,37 @@ class Playlist:
             step = 1
         return (start, end, step)
 
+    def __shift_positions(self, removed, added):
+        """
+        Moves the current and SPAT positions across a change which
+        replaced the tracks at the ``removed`` positions by ``added``,
+        without searching the whole playlist for their markers.
+
+        :param removed: (position, track) pairs before the change
+        :param added: :class:`MetadataList` of (position, track) pairs
+            after the change
+        """
+        removed_positions = {i for i, tr in removed}
+        positions = []
+        for position, key in (
+            (self.__current_position, "playlist_current_position"),
+            (self.__spat_position, "playlist_spat_position"),
+        ):
+            if position in removed_positions:
+                position = -1
+            elif position >= 0:
+                position -= sum(1 for i in removed_positions if i < position)
+                for i in sorted(i for i, tr in added):
+                    if i <= position:
+                        position += 1
+            # Markers move along with their metadata, e.g. when sorting
+            for j, meta in added.meta_items():
+                i = added[j][0]
+                if meta.get(key) and (position < 0 or i < position):
+                    position = i
+            positions.append(position)
+        self.__current_position, self.__spat_position = positions
+
     def __adjust_current_pos(self, oldpos, removed, added):
         newpos = oldpos
         for i, tr in removed:
@@ -1619,30 +1802,37 @@ class Playlist:
 
             start, end, step = self.__tuple_from_slice(i)
 
-            if isinstance(value, MetadataList):
-                metadata = value.metadata
-            else:
-                metadata = [None] * len(value)
-
             if step != 1:
                 if len(value) != len(oldtracks):
                     raise ValueError("Extended slice assignment must match sizes.")
             self.__tracks.__setitem__(i, value)
-            removed = MetadataList(
-                zip(range(start, end, step), oldtracks), oldtracks.metadata
-            )
+            removed = oldtracks.with_items(zip(range(start, end, step), oldtracks))
             if step == 1:
                 end = start + len(value)
 
-            added = MetadataList(zip(range(start, end, step), value), metadata)
+            added = zip(range(start, end, step), value)
+            if isinstance(value, MetadataList):
+                added = value.with_items(added)
+            else:
+                added = MetadataList(added)
         else:
             if not isinstance(value, trax.Track):
                 raise ValueError("Need trax.Track object, got %r" % type(value))
+            i = range(len(self))[i]
             self.__tracks[i] = value
             removed = [(i, oldtracks)]
-            added = [(i, value)]
-
-        self.on_tracks_changed()
+            added = MetadataList([(i, value)])
+
+        self.__shift_positions(removed, added)
+        if self.__shuffle_state is not None:
+            if (
+                not removed
+                and not added.meta_items()
+                and start == len(self) - len(added)
+            ):
+                self.__shuffle_state.extend(start, value)
+            else:
+                self.__shuffle_state = None
 
         if removed:
             event.log_event('playlist_tracks_removed', self, removed)
@@ -1655,19 +1845,20 @@ class Playlist:
     def __delitem__(self, i):
         if isinstance(i, slice):
             start, end, step = self.__tuple_from_slice(i)
+        else:
+            i = range(len(self))[i]
         oldtracks = self.__getitem__(i)
         oldpos = self.current_position
         self.__tracks.__delitem__(i)
         removed = MetadataList()
 
         if isinstance(i, slice):
-            removed = MetadataList(
-                zip(range(start, end, step), oldtracks), oldtracks.metadata
-            )
+            removed = oldtracks.with_items(zip(range(start, end, step), oldtracks))
         else:
             removed = [(i, oldtracks)]
 
-        self.on_tracks_changed()
+        self.__shift_positions(removed, MetadataList())
+        self.__shuffle_state = None
         event.log_event('playlist_tracks_removed', self, removed)
         self.__adjust_current_pos(oldpos, removed, [])
         self.__needs_save = self.__dirty = True
@@ -1731,20 +1922,116 @@ class Playlist:
                 self.__fetch_dynamic_tracks()
 
     def on_tracks_changed(self, *args):
-        for idx in range(len(self.__tracks)):
-            if self.__tracks.get_meta_key(idx, "playlist_current_position"):
+        """
+        Searches the playlist for the current and SPAT positions
+        """
+        meta_items = self.__tracks.meta_items()
+        for idx, meta in meta_items:
+            if meta.get("playlist_current_position"):
                 self.__current_position = idx
                 break
         else:
             self.__current_position = -1
-        for idx in range(len(self.__tracks)):
-            if self.__tracks.get_meta_key(idx, "playlist_spat_position"):
+        for idx, meta in meta_items:
+            if meta.get("playlist_spat_position"):
                 self.__spat_position = idx
                 break
         else:
             self.__spat_position = -1
 
 
+class _SmartPlaylistResults:
+    """
+    Tracks of a collection matching smart playlist queries, kept up to
+    date as the collection changes, so that opening a smart playlist
+    does not search the whole collection again
+
+    Changes are only recorded when they happen, and applied to the
+    cached queries the next time one is needed.
+    """
+
+    def __init__(self, collection):
+        self.__lock = threading.Lock()
+        #: (search string, or match) -> [matcher, tracks, sorted tracks]
+        self.__queries = {}
+        #: tracks added, removed or changed since the last update
+        self.__changed = set()
+        event.add_callback(self.on_tracks_added, 'tracks_added', collection)
+        event.add_callback(self.on_tracks_removed, 'tracks_removed', collection)
+        event.add_callback(self.on_track_tags_changed, 'track_tags_changed')
+
+    def on_tracks_added(self, type, collection, locations):
+        self.__add_changed(collection.get_track_by_loc(loc) for loc in locations)
+
+    def on_tracks_removed(self, type, collection, locations):
+        self.__add_changed(trax.Track.get_existing(loc) for loc in locations)
+
+    def on_track_tags_changed(self, type, track, tags):
+        self.__add_changed((track,))
+
+    def __add_changed(self, tracks):
+        with self.__lock:
+            if self.__queries:
+                self.__changed.update(tr for tr in tracks if tr is not None)
+
+    def __update(self, collection):
+        changed = self.__changed
+        if not changed:
+            return
+        self.__changed = set()
+
+        # Searching again is cheaper after big changes, e.g. a rescan
+        if len(changed) > len(collection) // 4:
+            self.__queries.clear()
+            return
+
+        for track in changed:
+            member = collection.get_track_by_loc(track.get_loc_for_io()) is track
+            for matcher, tracks, sorted_tracks in self.__queries.values():
+                if member and matcher.match(trax.SearchResultTrack(track)):
+                    tracks.add(track)
+                elif track in tracks:
+                    tracks.remove(track)
+                else:
+                    continue
+                sorted_tracks.clear()
+
+    def get_tracks(self, collection, search_string, or_match, sort_by, reverse):
+        """
+        Returns the tracks of the collection matching a query
+
+        :param sort_by: tags to sort the tracks by, or None to
+            return them in no particular order
+        :returns: a new list of tracks
+        """
+        with self.__lock:
+            self.__update(collection)
+            query = self.__queries.get((search_string, or_match))
+            if query is None:
+                matcher = trax.TracksMatcher(search_string, case_sensitive=False)
+                tracks = {t.track for t in trax.search_tracks(collection, [matcher])}
+                query = [matcher, tracks, {}]
+                self.__queries[(search_string, or_match)] = query
+            matcher, tracks, sorted_tracks = query
+
+            if sort_by is None:
+                return list(tracks)
+            key = (tuple(sort_by), reverse)
+            trs = sorted_tracks.get(key)
+            if trs is None:
+                trs = sorted_tracks[key] = trax.sort_tracks(
+                    sort_by, tracks, reverse=reverse
+                )
+            return trs[:]
+
+
+_smart_playlist_results = weakref.WeakKeyDictionary()
+
+# Smart playlists being generated by this thread, by name, to reuse
+# nested references and to detect cycles between them
+_smart_playlists_resolving = threading.local()
+
+
 class SmartPlaylist:
     """
     Represents a Smart Playlist.
@@ -1907,39 +2194,82 @@ class SmartPlaylist:
         @param collection: the collection to search (leave None to
                 search internal ref)
         """
+        resolving = getattr(_smart_playlists_resolving, 'playlists', None)
+        if resolving is None:
+            _smart_playlists_resolving.playlists = {}
+            try:
+                return self.get_playlist(collection)
+            finally:
+                del _smart_playlists_resolving.playlists
+
+        if self.name in resolving:
+            pl = resolving[self.name]
+            if pl is None:
+                raise ValueError("%s references itself" % self.name)
+            return pl
+        resolving[self.name] = None
+
         pl = Playlist(name=self.name)
         if not collection:
             collection = self.collection
         if not collection:  # if there wasn't one set we might not have one
+            resolving[self.name] = pl
             return pl
 
         search_string, matchers = self._create_search_data(collection)
 
-        matcher = trax.TracksMatcher(search_string, case_sensitive=False)
+        order = False
+        if self.random_sort:
+            sort_by = None
+        elif self.sort_tags:
+            order = self.sort_order
+            sort_by = [self.sort_tags] + list(common.BASE_SORT_TAGS)
+        else:
+            sort_by = common.BASE_SORT_TAGS
 
-        # prepend for now, since it is likely to remove more tracks, and
-        # smart playlists don't support mixed and/or expressions yet
-        for m in matchers:
-            matcher.prepend_matcher(m, self.or_match)
+        if not matchers and not self.__has_relative_params():
+            results = _smart_playlist_results.get(collection)
+            if results is None:
+                results = _smart_playlist_results[collection] = _SmartPlaylistResults(
+                    collection
+                )
+            trs = results.get_tracks(
+                collection, search_string, self.or_match, sort_by, order
+            )
+        else:
+            matcher = trax.TracksMatcher(search_string, case_sensitive=False)
+
+            # prepend for now, since it is likely to remove more tracks, and
+            # smart playlists don't support mixed and/or expressions yet
+            for m in matchers:
+                matcher.prepend_matcher(m, self.or_match)
+
+            trs = [t.track for t in trax.search_tracks(collection, [matcher])]
+            if sort_by is not None:
+                trs = trax.sort_tracks(sort_by, trs, reverse=order)
 
-        trs = [t.track for t in trax.search_tracks(collection, [matcher])]
         if self.random_sort:
             random.shuffle(trs)
-        else:
-            order = False
-            if self.sort_tags:
-                order = self.sort_order
-                sort_by = [self.sort_tags] + list(common.BASE_SORT_TAGS)
-            else:
-                sort_by = common.BASE_SORT_TAGS
-            trs = trax.sort_tracks(sort_by, trs, reverse=order)
         if self.track_count > 0 and len(trs) > self.track_count:
             trs = trs[: self.track_count]
 
         pl.extend(trs)
 
+        resolving[self.name] = pl
         return pl
 
+    def __has_relative_params(self):
+        """
+        Whether the results depend on the current time
+        """
+        for param in self.search_params:
+            if isinstance(param, str):
+                continue
+            fieldtype = tag_data.get(param[0])
+            if fieldtype is not None and fieldtype.type == 'timestamp':
+                return True
+        return False
+
     def _create_search_data(self, collection):
         """
         Creates a search string + matchers based on the internal params
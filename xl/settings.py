@@ -30,10 +30,12 @@ Central storage of application and user settings
 
 import ast
 from configparser import RawConfigParser, NoSectionError, NoOptionError
+import copy
 import logging
 import os
 import sys
-from typing import Any, ClassVar
+import threading
+from typing import Any, ClassVar, Dict
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +45,8 @@ from xl.nls import gettext as _
 
 MANAGER = None
 
+_MISSING = object()
+
 
 class SettingsManager(RawConfigParser):
     """
@@ -58,6 +62,10 @@ class SettingsManager(RawConfigParser):
     # number as this hash.
     _serial: int
 
+    #: Decoded option values by option path, or _MISSING for options that
+    #: don't exist
+    _cache: Dict[str, Any]
+
     def __init__(self, location=None, default_location=None):
         """
         Sets up the settings manager. Expects a location
@@ -75,6 +83,8 @@ class SettingsManager(RawConfigParser):
         self.location = location
         self._saving = False
         self._dirty = False
+        self._cache = {}
+        self._cache_lock = threading.Lock()
 
         self._serial = self.__class__._last_serial = self.__class__._last_serial + 1
 
@@ -150,6 +160,7 @@ class SettingsManager(RawConfigParser):
         except NoSectionError:
             self.add_section(section)
             self.set(section, key, value)
+        self._invalidate_cache()
 
         self._dirty = True
 
@@ -170,17 +181,27 @@ class SettingsManager(RawConfigParser):
         :param default: a default value to use as fallback
         :returns: the option value or *default*
         """
-        splitvals = option.split('/')
-        section, key = "/".join(splitvals[:-1]), splitvals[-1]
-
         try:
-            value = self.get(section, key)
-            value = self._str_to_val(value)
-        except NoSectionError:
-            value = default
-        except NoOptionError:
-            value = default
-
+            value = self._cache[option]
+        except KeyError:
+            with self._cache_lock:
+                splitvals = option.split('/')
+                section, key = "/".join(splitvals[:-1]), splitvals[-1]
+
+                try:
+                    value = self.get(section, key)
+                    value = self._str_to_val(value)
+                except NoSectionError:
+                    value = _MISSING
+                except NoOptionError:
+                    value = _MISSING
+                self._cache[option] = value
+
+        if value is _MISSING:
+            return default
+        if isinstance(value, (list, dict)):
+            # Callers may modify the value they get
+            return copy.deepcopy(value)
         return value
 
     def has_option(self, option):
@@ -210,6 +231,7 @@ class SettingsManager(RawConfigParser):
         section, key = "/".join(splitvals[:-1]), splitvals[-1]
 
         RawConfigParser.remove_option(self, section, key)
+        self._invalidate_cache()
 
     def _set_direct(self, option, value):
         """
@@ -229,9 +251,21 @@ class SettingsManager(RawConfigParser):
         except NoSectionError:
             self.add_section(section)
             self.set(section, key, value)
+        self._invalidate_cache()
 
         event.log_event('option_set', self, option)
 
+    def _invalidate_cache(self):
+        """
+        Drops cached values after an option has been changed
+        """
+        # Option keys are case insensitive, so several paths can refer to
+        # the same option. Changes are rare enough to simply drop them all.
+        # The lock makes sure that a get_option() which read the old value
+        # doesn't store it after this.
+        with self._cache_lock:
+            self._cache.clear()
+
     def _val_to_str(self, value):
         """
         Turns a value of some type into a string so it
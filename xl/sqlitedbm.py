@@ -54,6 +54,7 @@ class SqliteDbm(MutableMapping[bytes, bytes]):
         *,
         autocommit: bool = True,
         mode: Literal['ro', 'rw', 'rwc'] = 'rwc',
+        wal: bool = False,
     ):
         """
         Open a database.
@@ -62,11 +63,22 @@ class SqliteDbm(MutableMapping[bytes, bytes]):
         :param autocommit: Commit after every change instead of requiring sync.
         :param mode: Database open mode: ro = read only, rw = read/write, rwc =
             read/write/create.
+        :param wal: Switch the database to write-ahead logging, which makes
+            commits cheaper and lets readers run concurrently with a writer.
+            This setting is persistent.
         """
 
         self.autocommit = autocommit
         path_urlquoted = urllib.parse.quote(os.fsencode(path))
         uri = f"file:{path_urlquoted}?mode={mode}"
+        if wal and mode != 'ro':
+            # The journal mode can't be changed inside a transaction, which
+            # Python >= 3.12 opens right away if autocommit is off.
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
         if sys.version_info >= (3, 12):
             self.conn = conn = sqlite3.connect(
                 uri, autocommit=autocommit, check_same_thread=False, uri=True
@@ -104,6 +116,13 @@ class SqliteDbm(MutableMapping[bytes, bytes]):
         if not self.autocommit:
             self.conn.commit()
 
+    def rollback(self) -> None:
+        """
+        Discard the changes made since the last sync. Without autocommit
+        only, since every change is committed right away otherwise.
+        """
+        self.conn.rollback()
+
     def __contains__(self, key: Union[str, bytes]) -> bool:
         key = self.__fix_type(key)
         return (
@@ -35,6 +35,7 @@ from xl.trax.track import Track
 from xl.trax.trackdb import TrackDB
 from xl.trax.search import (
     SearchResultTrack,
+    TagIndex,
     search_tracks,
     search_tracks_from_string,
     TracksMatcher,
@@ -25,11 +25,12 @@
 # from your version.
 
 import re
-from typing import Collection
+import threading
+from typing import Callable, Collection, Dict, Iterable, Optional, Set, Tuple
 
 from xl.unicode import shave_marks
 
-__all__ = ['TracksMatcher', 'search_tracks']
+__all__ = ['TagIndex', 'TracksMatcher', 'search_tracks']
 
 
 class SearchResultTrack:
@@ -78,12 +79,28 @@ class _Matcher:
     def _matches(self, value):
         raise NotImplementedError
 
+    def candidates(self, index):
+        """
+        Find the tracks that may match this condition using a
+        :class:`TagIndex`.
+
+        :returns: a superset of the matching tracks of the index, or None
+            if the index cannot answer this condition
+        """
+        return None
+
 
 class _ExactMatcher(_Matcher):
     """
     Condition for exact matches
     """
 
+    def candidates(self, index):
+        # internal tags are compared as numbers
+        if self.content is None or self.tag.startswith("__"):
+            return None
+        return index.lookup(self.tag, self.content)
+
     def _matches(self, value):
         if self.tag.startswith("__"):
             try:
@@ -112,6 +129,11 @@ class _InMatcher(_Matcher):
         except TypeError:
             return False
 
+    def candidates(self, index):
+        if not self.content:
+            return None
+        return index.find(self.tag, self.content)
+
 
 class _RegexMatcher(_Matcher):
     """
@@ -176,6 +198,9 @@ class _NotMetaMatcher:
     def match(self, srtrack):
         return not self.matcher.match(srtrack)
 
+    def candidates(self, index):
+        return None
+
 
 class _OrMetaMatcher:
     """
@@ -191,6 +216,9 @@ class _OrMetaMatcher:
     def match(self, srtrack):
         return self.left.match(srtrack) or self.right.match(srtrack)
 
+    def candidates(self, index):
+        return _union_candidates((self.left, self.right), index)
+
 
 class _MultiMetaMatcher:
     """
@@ -209,6 +237,9 @@ class _MultiMetaMatcher:
                 return False
         return True
 
+    def candidates(self, index):
+        return _intersect_candidates(self.matchers, index)
+
 
 class _ManyMultiMetaMatcher:
     """
@@ -239,6 +270,48 @@ class _ManyMultiMetaMatcher:
                     self.tags.update(ma.tags)
         return matched
 
+    def candidates(self, index):
+        return _union_candidates(self.matchers, index)
+
+
+def _matcher_candidates(matcher, index):
+    # Matchers from elsewhere (e.g. playlists) may not support indexes
+    candidates = getattr(matcher, 'candidates', None)
+    if candidates is None:
+        return None
+    return candidates(index)
+
+
+def _union_candidates(matchers, index):
+    """
+    :returns: the tracks that may match any of the matchers, or None
+    """
+    result = set()
+    for ma in matchers:
+        candidates = _matcher_candidates(ma, index)
+        if candidates is None:
+            return None
+        result |= candidates
+    return result
+
+
+def _intersect_candidates(matchers, index):
+    """
+    :returns: the tracks that may match all of the matchers, or None
+    """
+    result = None
+    for ma in matchers:
+        candidates = _matcher_candidates(ma, index)
+        if candidates is None:
+            continue
+        if result is None:
+            result = set(candidates)
+        else:
+            result &= candidates
+        if not result:
+            break
+    return result
+
 
 class TracksMatcher:
     """
@@ -297,6 +370,18 @@ class TracksMatcher:
             return True
         return False
 
+    def candidates(self, index):
+        """
+        Find the tracks that may match these criteria using a
+        :class:`TagIndex`, without testing every track. Conditions that the
+        index cannot answer (numbers, regular expressions, NOT...) are
+        ignored here.
+
+        :returns: a superset of the matching tracks of the index, or None
+            if no condition can be answered by the index
+        """
+        return _intersect_candidates(self.matchers, index)
+
     def __tokens_to_matchers(self, tokens, matchers=None):
         """
         Converts a token hierarchy to a list of matchers
@@ -513,6 +598,9 @@ class TracksInList:
     def match(self, track):
         return track.track in self._tracks
 
+    def candidates(self, index):
+        return self._tracks
+
 
 class TracksNotInList(TracksInList):
     """
@@ -522,15 +610,164 @@ class TracksNotInList(TracksInList):
     def match(self, track):
         return track.track not in self._tracks
 
+    def candidates(self, index):
+        return None
+
+
+class TagIndex:
+    """
+    Inverted index from tag values to tracks, which lets
+    :func:`search_tracks` skip the tracks that cannot match.
+
+    A tag is indexed when it is first searched, and then kept up to date
+    through :meth:`add_tracks`, :meth:`remove_tracks` and
+    :meth:`update_track`. Values are indexed as returned by
+    :meth:`Track.get_tag_search`, case-folded. Lookups therefore return a
+    superset of the tracks matching a condition; the search still checks
+    every candidate against the full condition.
+    """
+
+    def __init__(self, get_tracks: Callable[[], Iterable], lock=None):
+        """
+        :param get_tracks: returns all tracks to index, called when a tag is
+            indexed
+        :param lock: the lock to hold while using the index. Indexing gets
+            tag values, which may load the tags of lazily-loaded tracks, so
+            a :class:`xl.trax.TrackDB` passes the lock it loads tags with.
+        """
+        self.__get_tracks = get_tracks
+        self.__lock = threading.RLock() if lock is None else lock
+        #: tag -> value -> tracks
+        self.__values: Dict[str, Dict[str, Set]] = {}
+        #: tag -> track -> values, to update the index when a track changes
+        self.__track_values: Dict[str, Dict[object, Tuple[str, ...]]] = {}
+
+    def clear(self) -> None:
+        """
+        Forget all indexed tags, e.g. after the tracks were replaced
+        """
+        with self.__lock:
+            self.__values = {}
+            self.__track_values = {}
+
+    def add_tracks(self, tracks: Iterable) -> None:
+        with self.__lock:
+            for track in tracks:
+                for tag in self.__values:
+                    self.__add(tag, track)
+
+    def remove_tracks(self, tracks: Iterable) -> None:
+        with self.__lock:
+            for track in tracks:
+                for tag in self.__values:
+                    self.__remove(tag, track)
+
+    def update_track(self, track) -> None:
+        """
+        Re-index a track after its tags changed. Tracks that are not indexed
+        are ignored.
+        """
+        with self.__lock:
+            for tag, track_values in self.__track_values.items():
+                if track not in track_values:
+                    continue
+                self.__remove(tag, track)
+                self.__add(tag, track)
+
+    def lookup(self, tag: str, value: str) -> Set:
+        """
+        :returns: the tracks which may have `value` for `tag`
+        """
+        with self.__lock:
+            values = self.__get_values(tag)
+            return set(values.get(value.casefold(), ()))
 
-def search_tracks(trackiter, trackmatchers: Collection[TracksMatcher]):
+    def find(self, tag: str, substring: str) -> Set:
+        """
+        :returns: the tracks which may have a value containing `substring`
+            for `tag`
+        """
+        substring = substring.casefold()
+        result = set()
+        with self.__lock:
+            for value, tracks in self.__get_values(tag).items():
+                if substring in value:
+                    result |= tracks
+        return result
+
+    def __get_values(self, tag: str) -> Dict[str, Set]:
+        values = self.__values.get(tag)
+        if values is None:
+            values = self.__values[tag] = {}
+            self.__track_values[tag] = {}
+            for track in self.__get_tracks():
+                self.__add(tag, track)
+        return values
+
+    def __add(self, tag: str, track) -> None:
+        search_values = track.get_tag_search(tag, format=False)
+        if not isinstance(search_values, list):
+            search_values = [search_values]
+        # Only strings can match the indexed conditions
+        track_values = tuple(
+            {
+                value.casefold()
+                for value in search_values
+                if isinstance(value, str) and value != '__null__'
+            }
+        )
+        self.__track_values[tag][track] = track_values
+        values = self.__values[tag]
+        for value in track_values:
+            tracks = values.get(value)
+            if tracks is None:
+                values[value] = {track}
+            else:
+                tracks.add(track)
+
+    def __remove(self, tag: str, track) -> None:
+        track_values = self.__track_values[tag].pop(track, ())
+        values = self.__values[tag]
+        for value in track_values:
+            tracks = values[value]
+            tracks.discard(track)
+            if not tracks:
+                del values[value]
+
+
+def search_tracks(
+    trackiter,
+    trackmatchers: Collection[TracksMatcher],
+    index: Optional[TagIndex] = None,
+):
     """
     Search a set of tracks for those that match specified conditions.
 
     :param trackiter: An iterable object returning Track objects
     :param trackmatchers: A list of TrackMatcher objects
+    :param index: A :class:`TagIndex` of all tracks in `trackiter`, used to
+        skip tracks that cannot match. Defaults to the index of `trackiter`
+        if it is a :class:`xl.trax.TrackDB`.
     """
+    if index is None:
+        from xl.trax.trackdb import TrackDB
+
+        if isinstance(trackiter, TrackDB):
+            index = trackiter.tag_index
+
+    candidates = None
+    if index is not None:
+        candidates = _intersect_candidates(trackmatchers, index)
+        if candidates is not None and getattr(trackiter, 'tag_index', None) is index:
+            # The index covers all of trackiter, so only look at the candidates
+            trackiter = candidates
+            candidates = None
+
     for srtr in trackiter:
+        if candidates is not None:
+            track = srtr.track if isinstance(srtr, SearchResultTrack) else srtr
+            if track not in candidates:
+                continue
         if not isinstance(srtr, SearchResultTrack):
             srtr = SearchResultTrack(srtr)
         if all(tma.match(srtr) for tma in trackmatchers):
@@ -538,7 +775,7 @@ def search_tracks(trackiter, trackmatchers: Collection[TracksMatcher]):
 
 
 def search_tracks_from_string(
-    trackiter, search_string, case_sensitive=True, keyword_tags=None
+    trackiter, search_string, case_sensitive=True, keyword_tags=None, index=None
 ):
     """
     Convenience wrapper around search_tracks that builds matchers
@@ -552,7 +789,7 @@ def search_tracks_from_string(
             search_string, case_sensitive=case_sensitive, keyword_tags=keyword_tags
         )
     ]
-    return search_tracks(trackiter, matchers)
+    return search_tracks(trackiter, matchers, index=index)
 
 
 def match_track_from_string(
@@ -29,6 +29,7 @@ from copy import deepcopy
 import logging
 import operator
 import re
+import threading
 import time
 from typing import Dict, Generic, List, Optional, TypeVar, Union
 import unicodedata
@@ -77,6 +78,9 @@ _no_set_raw = {'__basename', '__loc'} | disk_tags
 
 _unset = object()
 
+#: Interned keys of Track._keys, so that every track shares the same tuples
+_KEY_CACHE_IDS: Dict[tuple, tuple] = {}
+
 
 class _MetadataCacher(Generic[_K, _V]):
     """Time- and size-limited LRU cache"""
@@ -156,15 +160,28 @@ class Track:
 
     # save a little memory this way
     __slots__ = [
-        "__tags",
+        "__tagdict",
+        "_loader",
+        "_on_read",
         "_scan_valid",
         "_dirty",
         "__weakref__",
         "_init",
         "_is_supported",
+        "_keys",
     ]
     # this is used to enforce the one-track-per-uri rule
     __tracksdict = weakref.WeakValueDictionary()
+    # tracks with tag changes that haven't been saved by a TrackDB yet, so
+    # that saving doesn't have to look at every track
+    __unsaved = weakref.WeakSet()
+    # held while changing tags, so that tags are not unloaded in the middle
+    # of a change; see _unload_tags
+    __edit_lock = threading.RLock()
+    # tracks whose saved sort and search values (see get_tag_sort) are no
+    # longer valid, e.g. because collection/strip_list changed. New values
+    # don't make a track unsaved, they're saved with its next change.
+    __keys_unsaved = weakref.WeakSet()
     # store a copy of the settings values here - much faster (0.25 cpu
     # seconds) (see _the_cuts_cb)
     __the_cuts = settings.get_option('collection/strip_list', [])
@@ -254,6 +271,9 @@ class Track:
         if self._init is False:
             return
 
+        self._loader = None
+        self._on_read = None
+        self._keys = None
         self.__tags = {}
         self._scan_valid = None  # whether our last tag read attempt worked
         self._is_supported = None
@@ -273,12 +293,136 @@ class Track:
         else:
             raise ValueError("Cannot create a Track from nothing")
 
+    @classmethod
+    def get_existing(cls, uri: str) -> Optional['Track']:
+        """
+        Get the Track for `uri` if there is one already, without creating
+        it or reading any tags.
+
+        :param uri: the location, as either a uri or a file path.
+        """
+        # Like set_loc, so that paths find the tracks created from them
+        return cls.__tracksdict.get(Gio.File.new_for_commandline_arg(uri).get_uri())
+
+    @classmethod
+    def _new_lazy(cls, uri: str, loader) -> 'Track':
+        """
+        PRIVATE, intended for TrackDB
+
+        Get the Track for `uri` without reading its tags. If the track doesn't
+        exist yet, its tags are only loaded when they are first needed, by
+        calling ``loader(track)``; the loader must call
+        :meth:`_set_loaded_tags`.
+
+        :param uri: the location, already normalized by Gio
+        """
+        try:
+            return cls.__tracksdict[uri]
+        except KeyError:
+            pass
+        tr = object.__new__(cls)
+        tr._init = False
+        tr._scan_valid = None
+        tr._is_supported = None
+        tr._dirty = False
+        tr._keys = None
+        tr.__tagdict = {'__loc': uri}
+        tr._loader = loader
+        tr._on_read = None
+        cls.__tracksdict[uri] = tr
+        return tr
+
+    def _set_loaded_tags(self, tags: dict, on_read=None) -> None:
+        """
+        PRIVATE, intended for TrackDB
+
+        Set the tags of a lazily-loaded track.
+
+        :param on_read: called as ``on_read(track)`` whenever the loaded
+            tags are used, e.g. to keep recently used tracks loaded
+        """
+        self._on_read = on_read
+        tags['__loc'] = self.__tagdict['__loc']
+        # Readers check _loader after getting the tags, so set it last
+        self.__tagdict = tags
+        self._loader = None
+
+    def _unload_tags(self, loader) -> bool:
+        """
+        PRIVATE, intended for TrackDB
+
+        Drop the tags of a track from memory; they will be loaded again
+        through ``loader(track)`` when needed. Tracks with unsaved changes are
+        not unloaded.
+
+        :returns: Whether the tags were unloaded
+        """
+        # Don't wait for tracks being changed, they are about to be dirty
+        if not self.__edit_lock.acquire(blocking=False):
+            return False
+        try:
+            if self._dirty or self._loader is not None:
+                return False
+            # Readers check _loader after getting the tags, so set it first
+            self._loader = loader
+            self.__tagdict = {'__loc': self.__tagdict['__loc']}
+            return True
+        finally:
+            self.__edit_lock.release()
+
+    def _ensure_loaded(self) -> None:
+        """
+        PRIVATE, intended for TrackDB
+
+        Load the tags of a lazily-loaded track now.
+        """
+        loader = self._loader
+        if loader is not None:
+            loader(self)
+
+    def __lock_tags(self) -> dict:
+        """
+        Take __edit_lock, with the tags loaded.
+
+        The loader takes TrackDB's lock, and TrackDB changes tags while
+        holding it, so the loader is never called with __edit_lock held.
+
+        :returns: the tags
+        """
+        while True:
+            self._ensure_loaded()
+            self.__edit_lock.acquire()
+            if self._loader is None:
+                return self.__tagdict
+            # Unloaded again in the meantime
+            self.__edit_lock.release()
+
+    def __get_tags(self) -> dict:
+        while True:
+            loader = self._loader
+            if loader is not None:
+                loader(self)
+            tags = self.__tagdict
+            # If the tags were unloaded by another thread in the meantime,
+            # these may be the tags of the unloaded track; load them again
+            if self._loader is None:
+                on_read = self._on_read
+                if on_read is not None:
+                    on_read(self)
+                return tags
+
+    def __set_tags(self, tags: dict) -> None:
+        self.__tagdict = tags
+
+    #: The tags dict. Accessing it loads the tags of lazily-loaded tracks.
+    __tags = property(__get_tags, __set_tags)
+
     def __register(self):
         """
         Register this instance into the global registry of Track
         objects.
         """
-        self.__tracksdict[self.__tags['__loc']] = self
+        self.__tracksdict[self.__tagdict['__loc']] = self
 
     def __unregister(self):
         """
@@ -286,7 +430,7 @@ class Track:
         Track objects.
         """
         try:
-            del self.__tracksdict[self.__tags['__loc']]
+            del self.__tracksdict[self.__tagdict['__loc']]
         except KeyError:
             pass
 
@@ -299,6 +443,7 @@ class Track:
         self.__unregister()
         gloc = Gio.File.new_for_commandline_arg(loc)
         self.__tags['__loc'] = gloc.get_uri()
+        self._keys = None
         self.__register()
         if notify_changed:
             event.log_event('track_tags_changed', self, {'__loc'})
@@ -317,7 +462,7 @@ class Track:
         Safe for IO operations via gio, not suitable for display to users
         as it may be in non-utf-8 encodings.
         """
-        return self.__tags['__loc']
+        return self.__tagdict['__loc']
 
     def get_local_path(self):
         """
@@ -386,12 +531,16 @@ class Track:
             logger.exception("Unknown exception: Could not write tags to file")
             return False
 
-    def read_tags(self, force=True, notify_changed=True):
+    def read_tags(self, force=True, notify_changed=True, mtime=None, size=None):
         """
         Reads tags from the file for this Track.
 
         :param force: If not True, then only read the tags if the file has
                       be modified.
+        :param mtime: The file's modification time as a unix timestamp, if
+                      the caller already knows it (e.g. from a directory
+                      enumeration). Otherwise it is queried from the file.
+        :param size: The file's size, known together with `mtime`
 
         Returns False if unsuccessful, and a Format object from
         `xl.metadata` otherwise.
@@ -405,18 +554,20 @@ class Track:
         try:
             # Retrieve file specific metadata
             gloc = Gio.File.new_for_uri(loc)
-            mtime = (
-                gloc.query_info("time::modified", Gio.FileQueryInfoFlags.NONE, None)
-                .get_modification_date_time()
-                .to_unix()
-            )
+            if mtime is None:
+                info = gloc.query_info(
+                    "time::modified,standard::size", Gio.FileQueryInfoFlags.NONE, None
+                )
+                mtime = info.get_modification_date_time().to_unix()
+                size = info.get_size()
             f = metadata.get_format(loc)
-            if not force and self.__tags.get('__modified', 0) >= mtime:
+            if not force and self._is_unchanged(mtime, size):
                 return f
 
             # Read the tags
             ntags = f.read_all()
             ntags['__modified'] = mtime
+            ntags['__filesize'] = size
 
             # TODO: this probably breaks on non-local files
             ntags['__basedir'] = gloc.get_parent().get_path()
@@ -452,6 +603,20 @@ class Track:
             logger.exception("Error reading tags for %s", loc)
             return False
 
+    def _is_unchanged(self, mtime, size):
+        """
+        PRIVATE, intended for xl.collection
+
+        Whether the file has not changed since its tags were read, judging
+        by its modification time and size.
+        """
+        tags = self.__tags
+        if tags.get('__modified', 0) < mtime:
+            return False
+        # Tracks read before the size was stored only have their mtime
+        old_size = tags.get('__filesize')
+        return old_size is None or size is None or old_size == size
+
     def is_local(self):
         """
         Determines whether a file is accessible on the local filesystem.
@@ -510,6 +675,7 @@ class Track:
         internal use only please
         """
         self.__tags = deepcopy(pickle_obj)
+        self._keys = None
 
     def list_tags(self):
         """
@@ -598,12 +764,20 @@ class Track:
             # dict (which was done prior to Exaile 4), otherwise we don't know that
             # the user wanted the tag to be deleted
             new_value = self._xform_set_values(tag, values)
-            if self.__tags.get(tag, _unset) != new_value:
-                changed.add(tag)
-                self.__tags[tag] = new_value
+            # The track must not be unloaded before it's marked as dirty
+            tags = self.__lock_tags()
+            try:
+                if tags.get(tag, _unset) != new_value:
+                    changed.add(tag)
+                    tags[tag] = new_value
+                    if not self._dirty:
+                        self._dirty = True
+                        self.__unsaved.add(self)
+            finally:
+                self.__edit_lock.release()
 
         if changed:
-            self._dirty = True
+            self._keys = None
             if notify_changed:
                 event.log_event("track_tags_changed", self, changed)
 
@@ -645,6 +819,8 @@ class Track:
         """
         Get a tag value in a form suitable for sorting.
 
+        Values of non-internal tags are cached until the tags change.
+
         :param tag: The name of the tag to get
         :param join: If True, joins lists of values into a
             single value.
@@ -654,6 +830,17 @@ class Track:
         :param extend_title: If the title tag is unknown, try to
             add some identifying information to it.
         """
+        if tag.startswith("__"):
+            return self.__get_tag_sort(tag, join, artist_compilations)
+        return self.__get_cached_key(
+            ('sort', tag, join, artist_compilations),
+            self.__get_tag_sort,
+            tag,
+            join,
+            artist_compilations,
+        )
+
+    def __get_tag_sort(self, tag, join, artist_compilations):
         # The two magic values here are to ensure that compilations
         # and unknown values are always sorted below all normal
         # values.
@@ -787,6 +974,8 @@ class Track:
         Get a tag value suitable for passing to the search system.
         This includes quoting and list joining.
 
+        Values of non-internal tags are cached until the tags change.
+
         :param format: pre-format into a search query.
         :param artist_compilations: If True, automatically handle
             albumartist and other compilations detections when
@@ -796,6 +985,17 @@ class Track:
 
         :returns: unicode string that is used for searching
         """
+        if tag.startswith("__"):
+            return self.__get_tag_search(tag, format, artist_compilations)
+        return self.__get_cached_key(
+            ('search', tag, format, artist_compilations),
+            self.__get_tag_search,
+            tag,
+            format,
+            artist_compilations,
+        )
+
+    def __get_tag_search(self, tag, format, artist_compilations):
         extraformat = ""
         if tag == "albumartist":
             if artist_compilations and self.__tags.get('__compilation'):
@@ -857,6 +1057,22 @@ class Track:
 
         return value
 
+    def __get_cached_key(self, key, getter, *args):
+        keys = self._keys
+        if keys is None:
+            keys = self._keys = {}
+        else:
+            value = keys.get(key, _unset)
+            if value is not _unset:
+                return value[:] if isinstance(value, list) else value
+
+        value = getter(*args)
+        # Don't cache the value if the tags changed in the meantime
+        if self._keys is keys:
+            keys[_KEY_CACHE_IDS.setdefault(key, key)] = value
+        # Callers may change the lists they get
+        return value[:] if isinstance(value, list) else value
+
     def _get_format_obj(self):
         f = _CACHER.get(self)
         if not f:
@@ -1105,6 +1321,11 @@ class Track:
         """
         if data == "collection/strip_list":
             cls._Track__the_cuts = settings.get_option('collection/strip_list', [])
+            # The cached sort values depend on it
+            for track in list(cls._Track__tracksdict.values()):
+                if track._keys is not None:
+                    track._keys = None
+                    cls._Track__keys_unsaved.add(track)
 
     ### Utility method intended for TrackDB ###
 
@@ -1113,6 +1334,52 @@ class Track:
         '''Internal API, returns number of track objects we have'''
         return len(cls._Track__tracksdict)
 
+    @classmethod
+    def _get_unsaved_tracks(cls) -> List['Track']:
+        '''Internal API, returns tracks with tag changes not saved yet'''
+        # Copy the underlying set of weakrefs in one go; iterating over the
+        # WeakSet itself fails if another thread changes tags meanwhile.
+        refs = cls._Track__unsaved.data.copy()
+        return [tr for tr in (ref() for ref in refs) if tr is not None]
+
+    def _set_saved(self) -> None:
+        '''Internal API, marks the tag changes of this track as saved'''
+        self._dirty = False
+        self.__unsaved.discard(self)
+        self.__keys_unsaved.discard(self)
+
+    @classmethod
+    def _get_key_cache_version(cls) -> tuple:
+        '''Internal API, returns what the cached sort values depend on'''
+        return tuple(cls._Track__the_cuts)
+
+    @classmethod
+    def _get_unsaved_key_tracks(cls) -> List['Track']:
+        '''Internal API, returns tracks with cached values not saved yet'''
+        refs = cls._Track__keys_unsaved.data.copy()
+        return [tr for tr in (ref() for ref in refs) if tr is not None]
+
+    def _get_keys(self) -> Optional[dict]:
+        '''Internal API, returns a copy of the cached sort/search values'''
+        keys = self._keys
+        if not keys:
+            return None
+        return dict(keys)
+
+    def _set_keys(self, keys: dict) -> None:
+        '''Internal API, restores cached values saved by _get_keys'''
+        if self._keys is None:
+            self._keys = {_KEY_CACHE_IDS.setdefault(k, k): v for k, v in keys.items()}
+
+    def _set_keys_unsaved(self) -> None:
+        '''Internal API, makes TrackDBs save the cached values again'''
+        self.__keys_unsaved.add(self)
+
+    def _set_unsaved(self) -> None:
+        '''Internal API, marks this track as having unsaved changes'''
+        self._dirty = True
+        self.__unsaved.add(self)
+
     def _write_rating_to_disk(self):
         if not settings.get_option(
             'collection/write_rating_to_audio_file_metadata', False
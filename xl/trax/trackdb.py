@@ -25,17 +25,26 @@
 # from your version.
 
 
+from collections import OrderedDict
 from copy import deepcopy
+from functools import partial
 import logging
+import threading
 from time import time
-from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from xl import common, event
 from xl.nls import gettext as _
+from xl.trax.search import TagIndex
 from xl.trax.track import Track
+from xl.trax.trackstore import SqliteTrackStore
 
 logger = logging.getLogger(__name__)
 
+#: TrackHolder attribute used to save the cached sort and search values of
+#: a track (see Track.get_tag_sort)
+_KEYS_ATTR = '_keys'
+
 
 class TrackHolder:
     def __init__(self, track, key, **kwargs):
@@ -58,6 +67,19 @@ class TrackDBIterator:
         return next(self.iter)[1]._track
 
 
+class _PendingSave(NamedTuple):
+    """Data of a save, collected by TrackDB._prepare_save"""
+
+    location: str
+    tracks: List[Track]
+    rows: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    attrs: Dict[str, Any]
+    deleted_keys: List[int]
+    added: Set[str]
+    #: Saves are written in the order of these numbers
+    number: int
+
+
 class TrackDB:
     """
     Manages a track database.
@@ -76,6 +98,14 @@ class TrackDB:
             of :class:`Track` objects.
     :param load_first: Set to True if this collection should be
             loaded before any tracks are created.
+    :param engine: How tracks are stored at `location`: 'shelve' for one
+            pickled entry per track, or 'sqlite' for normalized tables
+            (see :class:`xl.trax.trackstore.SqliteTrackStore`). An existing
+            database is migrated when the engine changes.
+    :param lazy_cache_size: If non-zero and `engine` is 'sqlite', tags of
+            stored tracks are only read from the database when they are first
+            needed, and at most this many loaded tracks without unsaved
+            changes are kept in memory.
     """
 
     def __init__(
@@ -84,6 +114,8 @@ class TrackDB:
         location: str = "",
         pickle_attrs: List[str] = [],
         loadfirst: bool = False,
+        engine: str = 'shelve',
+        lazy_cache_size: int = 0,
     ):
         """
         Sets up the trackDB.
@@ -102,15 +134,39 @@ class TrackDB:
 
         self.name = name
         self.location = location
+        self.engine = engine
+        self.lazy_cache_size = lazy_cache_size if engine == 'sqlite' else 0
+        #: Store kept open to load tags of lazily-loaded tracks
+        self._store: Optional[SqliteTrackStore] = None
+        #: Lazily-loaded tracks whose tags are in memory, least recently used
+        #: first, mapped to the loader used to load them again
+        self._loaded: 'OrderedDict[Track, partial]' = OrderedDict()
+        # Guards _loaded. Tags are read with the tracks' edit locks held, so
+        # reads must not wait for the lock of @common.synchronized methods.
+        self._loaded_lock = threading.Lock()
         self._dirty = False
         self.tracks: Dict[str, TrackHolder] = {}  # key is URI of the track
         self.pickle_attrs = pickle_attrs
         self.pickle_attrs += ['tracks', 'name', '_key']
-        self._saving = False
+        #: Locations of tracks added since the last save
+        self._added: Set[str] = set()
+        #: Number of saves that have been prepared but not written yet
+        self._pending_saves = 0
+        #: Serializes writing saves to the database
+        self._write_lock = threading.Condition()
+        #: Numbers of saves prepared and written so far; see _write_save
+        self._saves_prepared = 0
+        self._saves_written = 0
         #: Number to use for the next `tracks-*` database key
         self._key = 0
         self._dbversion = 2.0
         self._deleted_keys = []
+        # The lock of @common.synchronized methods; it's shared with the tag
+        # index, see TagIndex
+        self._sync_lock = threading.RLock()
+        #: Index of the tracks' tag values, used by searches
+        self.tag_index = TagIndex(self.__get_indexed_tracks, self._sync_lock)
+        event.add_callback(self._on_track_tags_changed, 'track_tags_changed')
         if location:
             self.load_from_location()
             self._timeout_save()
@@ -132,12 +188,23 @@ class TrackDB:
         """
         return len(self.tracks)
 
+    def __get_indexed_tracks(self) -> List[Track]:
+        return [holder._track for holder in list(self.tracks.values())]
+
+    def _on_track_tags_changed(self, type, track: Track, tags: Set[str]) -> None:
+        self.tag_index.update_track(track)
+
     @common.glib_wait_seconds(300)
     def _timeout_save(self):
         """
         Callback for auto-saving.
+
+        Only collecting the changes happens here, the database is written in
+        a background thread.
         """
-        self.save_to_location()
+        pending = self._prepare_save()
+        if pending is not None:
+            common.threaded(self._write_save)(pending)
         return True
 
     def set_name(self, name: str) -> None:
@@ -183,6 +250,20 @@ class TrackDB:
 
         logger.debug("Loading %s DB from %s.", self.name, location)
 
+        if self.engine == 'sqlite':
+            self._load_from_store(location)
+        else:
+            self._load_from_shelf(location)
+
+        self.tag_index.clear()
+        self._dirty = False
+
+    def _load_from_shelf(self, location: str) -> None:
+        if SqliteTrackStore.is_track_store(location):
+            from xl.migrations.database import to_normalized
+
+            to_normalized.revert(location)
+
         pdata = common.open_shelf(location)
 
         if "_dbversion" in pdata:
@@ -199,6 +280,7 @@ class TrackDB:
                     self, pdata, pdata['_dbversion'], self._dbversion
                 )
 
+        keys_valid = pdata.get('_key_cache_version') == Track._get_key_cache_version()
         for attr in self.pickle_attrs:
             try:
                 if 'tracks' == attr:
@@ -208,7 +290,7 @@ class TrackDB:
                         tr = Track(_unpickles=p[0])
                         loc = tr.get_loc_for_io()
                         if loc not in data:
-                            data[loc] = TrackHolder(tr, p[1], **p[2])
+                            data[loc] = self._new_holder(tr, p[1], p[2], keys_valid)
                         else:
                             logger.warning("Duplicate track found: %s", loc)
                             # presumably the second track was written because of an error,
@@ -224,7 +306,145 @@ class TrackDB:
 
         pdata.close()
 
-        self._dirty = False
+    def _load_from_store(self, location: str) -> None:
+        if not SqliteTrackStore.is_track_store(location):
+            from xl.migrations.database import to_normalized
+
+            to_normalized.migrate(location)
+
+        store = SqliteTrackStore(location)
+
+        version = store.get_meta('_dbversion', self._dbversion)
+        if int(version) > int(self._dbversion):
+            store.close()
+            raise common.VersionError("DB was created on a newer Exaile version.")
+
+        keys_valid = (
+            store.get_meta('_key_cache_version') == Track._get_key_cache_version()
+        )
+        for attr in self.pickle_attrs:
+            try:
+                if 'tracks' == attr:
+                    if self.lazy_cache_size:
+                        data = self._load_handles_from_store(store, keys_valid)
+                    else:
+                        data = self._load_tracks_from_store(store, keys_valid)
+                    setattr(self, attr, data)
+                else:
+                    setattr(self, attr, store.get_meta(attr, getattr(self, attr)))
+            except Exception:
+                # FIXME: Do something about this
+                logger.exception("Exception occurred while loading %s", location)
+
+        if self.lazy_cache_size:
+            if self._store is not None:
+                self._store.close()
+            self._store = store
+        else:
+            store.close()
+
+    def _load_tracks_from_store(
+        self, store: SqliteTrackStore, keys_valid: bool
+    ) -> Dict[str, TrackHolder]:
+        data = {}
+        duplicates = []
+        for key, tags, attrs in store.iter_tracks():
+            tr = Track(_unpickles=tags)
+            loc = tr.get_loc_for_io()
+            if loc not in data:
+                data[loc] = self._new_holder(tr, key, attrs, keys_valid)
+            else:
+                logger.warning("Duplicate track found: %s", loc)
+                duplicates.append(key)
+        store.delete_tracks(duplicates)
+        return data
+
+    def _load_handles_from_store(
+        self, store: SqliteTrackStore, keys_valid: bool
+    ) -> Dict[str, TrackHolder]:
+        """
+        Like _load_tracks_from_store, but the tracks are created without
+        tags; see _load_track_tags.
+        """
+        data = {}
+        for key, loc, attrs in store.iter_handles():
+            tr = Track._new_lazy(loc, partial(self._load_track_tags, key))
+            data[loc] = self._new_holder(tr, key, attrs, keys_valid)
+        return data
+
+    @staticmethod
+    def _new_holder(
+        track: Track, key: int, attrs: Dict[str, Any], keys_valid: bool
+    ) -> TrackHolder:
+        """
+        Create the holder of a loaded track, restoring the track's cached
+        sort and search values.
+
+        :param keys_valid: False if the cached values were computed with
+            other settings; they are then dropped, and saved again later.
+        """
+        attrs = dict(attrs)
+        keys = attrs.pop(_KEYS_ATTR, None)
+        if keys is not None:
+            if keys_valid:
+                track._set_keys(keys)
+            else:
+                track._set_keys_unsaved()
+        return TrackHolder(track, key, **attrs)
+
+    @common.synchronized
+    def _load_track_tags(self, key: int, track: Track) -> None:
+        """
+        Loader of lazily-loaded tracks, see Track._new_lazy
+        """
+        if track._loader is None:  # Loaded by another thread in the meantime
+            return
+        loader = track._loader
+        tags = None
+        if self._store is not None:
+            try:
+                row = self._store.get_track(key)
+            except Exception:
+                logger.exception("Failed loading tags of %s", track.get_loc_for_io())
+            else:
+                if row is not None:
+                    tags = row[0]
+        track._set_loaded_tags(tags or {}, self._on_loaded_track_read)
+        with self._loaded_lock:
+            self._loaded[track] = loader
+        self._unload_old_tracks(keep=track)
+
+    def _on_loaded_track_read(self, track: Track) -> None:
+        """
+        Marks a loaded track as recently used, so that it's unloaded last
+        """
+        with self._loaded_lock:
+            try:
+                self._loaded.move_to_end(track)
+            except KeyError:  # Removed from the database
+                pass
+
+    def _unload_old_tracks(self, keep: Optional[Track] = None) -> None:
+        """
+        Drop the tags of the least recently used loaded tracks until at most
+        `lazy_cache_size` remain. Tracks with unsaved changes are kept.
+
+        :param keep: a track not to unload, e.g. the one being loaded
+        """
+        excess = len(self._loaded) - self.lazy_cache_size
+        if excess <= 0 or self._pending_saves:
+            # Tracks in a pending save look saved but may not be in the
+            # store yet, so they can't be loaded again from there
+            return
+        with self._loaded_lock:
+            unloaded = []
+            for track, loader in self._loaded.items():
+                if track is not keep and track._unload_tags(loader):
+                    unloaded.append(track)
+                    if len(unloaded) == excess:
+                        break
+            for track in unloaded:
+                del self._loaded[track]
 
     @common.synchronized
     def save_to_location(self, location: Optional[str] = None):
@@ -234,63 +454,175 @@ class TrackDB:
 
         :param location: the location to save the data to
         """
-        if not self._dirty:
-            for track in self.tracks.values():
-                if track._track._dirty:
-                    self._dirty = True
-                    break
+        pending = self._prepare_save(location)
+        if pending is not None:
+            self._write_save(pending)
 
-        if not self._dirty:
-            return
+    @common.synchronized
+    def _prepare_save(self, location: Optional[str] = None) -> Optional[_PendingSave]:
+        """
+        Collect everything that needs to be written by a save.
+
+        This only copies the tracks that were added or changed since the last
+        save, and marks them as saved; if writing fails, they are marked as
+        unsaved again.
 
+        :return: the data to pass to _write_save, or None if there is nothing
+            to save
+        """
         if not location:
             location = self.location
         if not location:
             raise AttributeError(_("You did not specify a location to save the db"))
 
-        if self._saving:
-            return
-        self._saving = True
+        # Saving to another file has to write every track
+        full = location != self.location
+
+        if full:
+            tracks = list(self.tracks.values())
+        else:
+            # Tracks with changed tags or cached values, and added tracks
+            changed = {}
+            for tr in Track._get_unsaved_tracks() + Track._get_unsaved_key_tracks():
+                loc = tr.get_loc_for_io()
+                holder = self.tracks.get(loc)
+                if holder is not None and holder._track is tr:
+                    changed[loc] = holder
+            for loc in self._added:
+                holder = self.tracks.get(loc)
+                if holder is not None:
+                    changed[loc] = holder
+            tracks = list(changed.values())
+
+        if not (self._dirty or tracks or self._deleted_keys):
+            return None
 
-        logger.debug("Saving %s DB to %s.", self.name, location)
+        rows = []
+        for holder in tracks:
+            attrs = deepcopy(holder._attrs)
+            keys = holder._track._get_keys()
+            if keys:
+                attrs[_KEYS_ATTR] = keys
+            rows.append((holder._key, holder._track._pickles(), attrs))
+        attrs = {
+            attr: deepcopy(getattr(self, attr))
+            for attr in self.pickle_attrs
+            if attr != 'tracks'
+        }
+        attrs['_key_cache_version'] = Track._get_key_cache_version()
+        pending = _PendingSave(
+            location,
+            [holder._track for holder in tracks],
+            rows,
+            attrs,
+            list(self._deleted_keys),
+            set(self._added),
+            self._saves_prepared,
+        )
+        self._saves_prepared += 1
+        self._pending_saves += 1
+
+        # A copy in another file doesn't save the changes to our own
+        if not full:
+            for holder in tracks:
+                holder._track._set_saved()
+            self._added = set()
+            self._deleted_keys = []
+            self._dirty = False
+        return pending
+
+    def _write_save(self, pending: _PendingSave) -> None:
+        """
+        Write data collected by _prepare_save. This does not touch any track,
+        so it can run in a background thread.
+        """
+        with self._write_lock:
+            # Write saves in the order they were prepared, so that an older
+            # save never overwrites the changes of a newer one
+            self._write_lock.wait_for(lambda: self._saves_written == pending.number)
+            try:
+                logger.debug("Saving %s DB to %s.", self.name, pending.location)
+                if self.engine == 'sqlite':
+                    saved = self._save_to_store(pending)
+                else:
+                    saved = self._save_to_shelf(pending)
+            except Exception:
+                logger.exception("Failed to save music DB.")
+                saved = False
+            finally:
+                self._saves_written += 1
+                self._write_lock.notify_all()
+        self._finish_save(pending, saved)
 
+    @common.synchronized
+    def _finish_save(self, pending: _PendingSave, saved: bool) -> None:
+        self._pending_saves -= 1
+        if not saved:
+            # Try again next time; copies to other files were not marked saved
+            if pending.location == self.location:
+                for track in pending.tracks:
+                    track._set_unsaved()
+                self._added |= pending.added
+                self._deleted_keys = pending.deleted_keys + self._deleted_keys
+                self._dirty = True
+        elif self.lazy_cache_size:
+            self._unload_old_tracks()
+
+    def _save_to_shelf(self, pending: _PendingSave) -> bool:
         try:
-            pdata = common.open_shelf(location)
+            # One transaction for the whole save
+            pdata = common.open_shelf(pending.location, autocommit=False, wal=True)
             if pdata.get('_dbversion', self._dbversion) > self._dbversion:
+                pdata.close()
                 raise common.VersionError("DB was created on a newer Exaile.")
         except Exception:
             logger.exception("Failed to open music DB for writing.")
-            return
-
-        for attr in self.pickle_attrs:
-            # bad hack to allow saving of lists/dicts of Tracks
-            if 'tracks' == attr:
-                for k, track in self.tracks.items():
-                    key = "tracks-%s" % track._key
-                    if track._track._dirty or key not in pdata:
-                        pdata[key] = (
-                            track._track._pickles(),
-                            track._key,
-                            deepcopy(track._attrs),
-                        )
-            else:
-                pdata[attr] = deepcopy(getattr(self, attr))
+            return False
 
-        pdata['_dbversion'] = self._dbversion
-
-        for key in self._deleted_keys:
-            key = "tracks-%s" % key
-            if key in pdata:
-                del pdata[key]
-
-        pdata.sync()
-        pdata.close()
+        try:
+            for key, tags, attrs in pending.rows:
+                pdata["tracks-%s" % key] = (tags, key, attrs)
+            for attr, value in pending.attrs.items():
+                pdata[attr] = value
+
+            pdata['_dbversion'] = self._dbversion
+
+            for key in pending.deleted_keys:
+                key = "tracks-%s" % key
+                if key in pdata:
+                    del pdata[key]
+        except BaseException:
+            # Don't commit a partial save, it's all written again next time
+            pdata.dict.rollback()
+            raise
+        finally:
+            pdata.close()
+        return True
 
-        for track in self.tracks.values():
-            track._track._dirty = False
+    def _save_to_store(self, pending: _PendingSave) -> bool:
+        own_store = self._store is not None and pending.location == self.location
+        try:
+            store = self._store if own_store else SqliteTrackStore(pending.location)
+            if store.get_meta('_dbversion', self._dbversion) > self._dbversion:
+                if not own_store:
+                    store.close()
+                raise common.VersionError("DB was created on a newer Exaile.")
+        except Exception:
+            logger.exception("Failed to open music DB for writing.")
+            return False
 
-        self._dirty = False
-        self._saving = False
+        try:
+            with store.transaction():
+                for key, tags, attrs in pending.rows:
+                    store.put_track(key, tags, attrs)
+                for attr, value in pending.attrs.items():
+                    store.set_meta(attr, value)
+                store.set_meta('_dbversion', self._dbversion)
+                store.delete_tracks(pending.deleted_keys)
+        finally:
+            if not own_store:
+                store.close()
+        return True
 
     def get_track_by_loc(self, loc: str) -> Optional[Track]:
         """
@@ -329,6 +661,7 @@ class TrackDB:
         Like add(), but takes a list of :class:`xl.trax.Track`
         """
         locations = []
+        added = []
         now = time()
         for tr in tracks:
             if not tr.get_tag_raw('__date_added'):
@@ -341,10 +674,13 @@ class TrackDB:
             if not tr.is_supported():
                 continue
             locations += [location]
+            added.append(tr)
             self.tracks[location] = TrackHolder(tr, self._key)
+            self._added.add(location)
             self._key += 1
 
         if locations:
+            self.tag_index.add_tracks(added)
             event.log_event('tracks_added', self, locations)
             self._dirty = True
 
@@ -362,13 +698,23 @@ class TrackDB:
         Like remove(), but takes a list of :class:`xl.trax.Track`
         """
         locations = []
+        removed = []
 
         for tr in tracks:
             location = tr.get_loc_for_io()
             locations += [location]
+            removed.append(self.tracks[location]._track)
             self._deleted_keys.append(self.tracks[location]._key)
             del self.tracks[location]
-
+            self._added.discard(location)
+            if self.lazy_cache_size:
+                # The track may live on elsewhere (e.g. in a playlist) after
+                # its database row is gone, so make it a normal track.
+                tr._ensure_loaded()
+                with self._loaded_lock:
+                    self._loaded.pop(tr, None)
+
+        self.tag_index.remove_tracks(removed)
         event.log_event('tracks_removed', self, locations)
 
         self._dirty = True
@@ -0,0 +1,375 @@
+# Copyright (C) 2026  The Exaile developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+#
+# The developers of the Exaile media player hereby grant permission
+# for non-GPL compatible GStreamer and Exaile plugins to be used and
+# distributed together with GStreamer and Exaile. This permission is
+# above and beyond the permissions granted by the GPL license by which
+# Exaile is covered. If you modify this code, you may extend this
+# exception to your version of the code, but you are not obligated to
+# do so. If you do not wish to do so, delete this exception statement
+# from your version.
+
+"""
+Normalized SQLite storage for :class:`xl.trax.TrackDB`.
+
+Instead of one pickled blob per track (see :func:`xl.common.open_shelf`),
+every track is a row in the ``Tracks`` table. Common tags get their own
+indexed column; multi-valued, unusual or uncommon tags are stored one per
+row in the ``TrackTags`` side table.
+"""
+
+__all__ = ['SqliteTrackStore']
+
+
+import contextlib
+import os
+import pickle
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+import urllib.parse
+
+from xl import common
+
+#: Tags that get their own column: (tag, column name, whether the tag value
+#: is a list). A list value is only put in its column if it has exactly one
+#: string element; anything else goes to the TrackTags table.
+_COLUMNS: Tuple[Tuple[str, str, bool], ...] = (
+    ('artist', 'artist', True),
+    ('albumartist', 'albumartist', True),
+    ('album', 'album', True),
+    ('title', 'title', True),
+    ('genre', 'genre', True),
+    ('date', 'date', True),
+    ('tracknumber', 'tracknumber', True),
+    ('discnumber', 'discnumber', True),
+    ('__basedir', 'basedir', False),
+    ('__bitrate', 'bitrate', False),
+    ('__date_added', 'date_added', False),
+    ('__last_played', 'last_played', False),
+    ('__length', 'length', False),
+    ('__modified', 'modified', False),
+    ('__playcount', 'playcount', False),
+    ('__rating', 'rating', False),
+)
+
+_COLUMN_TAGS = frozenset(tag for tag, _column, _is_list in _COLUMNS)
+
+_INDEXED_COLUMNS = ('artist', 'albumartist', 'album', 'genre', 'basedir')
+
+_SCALAR_TYPES = (str, int, float)
+
+_unset = object()
+
+
+class SqliteTrackStore:
+    """
+    Stores track tags in normalized SQLite tables.
+
+    Keys are the integer keys of :class:`xl.trax.trackdb.TrackHolder`, so the
+    store can be written to incrementally. Other :class:`TrackDB` attributes
+    (``name``, ``_key``, ...) are pickled into the ``Meta`` table.
+
+    Writes are not committed until :meth:`commit` is called or the
+    :meth:`transaction` block ends.
+    """
+
+    conn: sqlite3.Connection
+
+    def __init__(self, path: Union[str, bytes, os.PathLike]):
+        """
+        Open (creating if needed) a track store.
+
+        :param path: Database file path. This may be the same file used by
+            :class:`xl.sqlitedbm.SqliteDbm`; the tables don't clash.
+        """
+        path_urlquoted = urllib.parse.quote(os.fsencode(path))
+        self.conn = conn = sqlite3.connect(
+            f"file:{path_urlquoted}?mode=rwc",
+            check_same_thread=False,
+            isolation_level=None,
+            uri=True,
+        )
+        # Tag columns are declared without a type so that SQLite does not
+        # apply type affinity, e.g. turning a '128' string into an integer.
+        columns = ", ".join(column for _tag, column, _is_list in _COLUMNS)
+        try:
+            # Write-ahead logging keeps commits cheap. Lazy track loading
+            # uses this same connection, so while a save is being written
+            # it also sees the save's uncommitted rows.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS Tracks "
+                f"(key INTEGER PRIMARY KEY, loc TEXT UNIQUE NOT NULL, {columns}, attrs BLOB)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS TrackTags (key INTEGER NOT NULL, "
+                "tag TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (key, tag)) "
+                "WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS Meta "
+                "(name TEXT PRIMARY KEY NOT NULL, value BLOB NOT NULL)"
+            )
+            for column in _INDEXED_COLUMNS:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS Tracks_{column} ON Tracks ({column})"
+                )
+        except Exception:
+            conn.close()
+            del self.conn
+            raise
+
+    @staticmethod
+    def is_track_store(path: Union[str, bytes, os.PathLike]) -> bool:
+        """
+        Check whether the given file contains a track store.
+
+        :return: False if the file doesn't exist, is not an SQLite database
+            (e.g. an old Berkeley DB shelf), or doesn't have a Tracks table
+        """
+        if not os.path.exists(path):
+            return False
+        path_urlquoted = urllib.parse.quote(os.fsencode(path))
+        try:
+            conn = sqlite3.connect(f"file:{path_urlquoted}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return False
+        try:
+            return (
+                conn.execute(
+                    "SELECT NULL FROM sqlite_master WHERE type = 'table' AND name = 'Tracks'"
+                ).fetchone()
+                is not None
+            )
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        if hasattr(self, "conn"):
+            try:
+                if self.conn.in_transaction:
+                    self.conn.commit()
+            finally:
+                self.conn.close()
+                del self.conn
+
+    __del__ = close
+
+    def __enter__(self) -> 'SqliteTrackStore':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM Tracks").fetchone()[0]
+
+    def commit(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group all writes done inside the block into one transaction, which is
+        rolled back if an exception is raised.
+        """
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+
+    def keys(self) -> Set[int]:
+        """
+        :return: the keys of all stored tracks
+        """
+        return {row[0] for row in self.conn.execute("SELECT key FROM Tracks")}
+
+    ### Meta attributes ###
+
+    def get_meta(self, name: str, default: Any = None) -> Any:
+        row = self.conn.execute(
+            "SELECT value FROM Meta WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def set_meta(self, name: str, value: Any) -> None:
+        self.__begin()
+        self.conn.execute(
+            "REPLACE INTO Meta VALUES (?, ?)",
+            (name, pickle.dumps(value, protocol=common.PICKLE_PROTOCOL)),
+        )
+
+    def iter_meta(self) -> Iterator[Tuple[str, Any]]:
+        for name, value in self.conn.execute("SELECT name, value FROM Meta"):
+            yield name, pickle.loads(value)
+
+    def has_meta(self, name: str) -> bool:
+        return (
+            self.conn.execute(
+                "SELECT NULL FROM Meta WHERE name = ?", (name,)
+            ).fetchone()
+            is not None
+        )
+
+    ### Tracks ###
+
+    def iter_tracks(self) -> Iterator[Tuple[int, Dict[str, Any], Dict[str, Any]]]:
+        """
+        Iterate over all stored tracks.
+
+        :return: iterator of (key, tags, holder attributes) tuples, in key
+            order
+        """
+        extra: Dict[int, Dict[str, Any]] = {}
+        for key, tag, value in self.conn.execute(
+            "SELECT key, tag, value FROM TrackTags"
+        ):
+            extra.setdefault(key, {})[tag] = pickle.loads(value)
+        for row in self.conn.execute(self.__select_tracks + " ORDER BY key"):
+            key = row[0]
+            yield key, self.__row_to_tags(row, extra.get(key)), self.__row_to_attrs(row)
+
+    def iter_handles(self) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Iterate over all stored tracks without reading their tags; see
+        :meth:`get_track`.
+
+        :return: iterator of (key, location, holder attributes) tuples, in
+            key order
+        """
+        for key, loc, attrs in self.conn.execute(
+            "SELECT key, loc, attrs FROM Tracks ORDER BY key"
+        ):
+            yield key, loc, ({} if attrs is None else pickle.loads(attrs))
+
+    def get_track(self, key: int) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Read a single track.
+
+        :return: (tags, holder attributes), or None if the key is not stored
+        """
+        row = self.conn.execute(
+            self.__select_tracks + " WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        extra = {
+            tag: pickle.loads(value)
+            for tag, value in self.conn.execute(
+                "SELECT tag, value FROM TrackTags WHERE key = ?", (key,)
+            )
+        }
+        return self.__row_to_tags(row, extra), self.__row_to_attrs(row)
+
+    def put_track(
+        self, key: int, tags: Dict[str, Any], attrs: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Insert or replace a track.
+
+        :param key: TrackHolder key
+        :param tags: the track's tags, as returned by ``Track._pickles``
+        :param attrs: TrackHolder attributes
+        """
+        row = [key, tags['__loc']]
+        for tag, _column, is_list in _COLUMNS:
+            value = tags.get(tag, _unset)
+            if value is _unset:
+                row.append(None)
+            elif is_list and _is_single_string(value):
+                row.append(value[0])
+            elif not is_list and type(value) in _SCALAR_TYPES:
+                row.append(value)
+            else:
+                # Stored in the side table instead
+                row.append(None)
+        row.append(
+            pickle.dumps(attrs, protocol=common.PICKLE_PROTOCOL) if attrs else None
+        )
+        extra = [
+            (key, tag, pickle.dumps(value, protocol=common.PICKLE_PROTOCOL))
+            for tag, value in tags.items()
+            if tag != '__loc' and not self.__in_column(tag, value)
+        ]
+
+        self.__begin()
+        self.conn.execute("DELETE FROM TrackTags WHERE key = ?", (key,))
+        self.conn.execute(
+            f"REPLACE INTO Tracks VALUES ({', '.join('?' * len(row))})", row
+        )
+        if extra:
+            self.conn.executemany("INSERT INTO TrackTags VALUES (?, ?, ?)", extra)
+
+    def delete_tracks(self, keys: Iterable[int]) -> None:
+        keys = [(key,) for key in keys]
+        if not keys:
+            return
+        self.__begin()
+        self.conn.executemany("DELETE FROM Tracks WHERE key = ?", keys)
+        self.conn.executemany("DELETE FROM TrackTags WHERE key = ?", keys)
+
+    ### Internal helpers ###
+
+    __select_tracks = "SELECT key, loc, %s, attrs FROM Tracks" % ", ".join(
+        column for _tag, column, _is_list in _COLUMNS
+    )
+
+    def __begin(self) -> None:
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+    @staticmethod
+    def __in_column(tag: str, value: Any) -> bool:
+        if tag not in _COLUMN_TAGS:
+            return False
+        if tag.startswith('__'):
+            return type(value) in _SCALAR_TYPES
+        return _is_single_string(value)
+
+    @staticmethod
+    def __row_to_tags(
+        row: Tuple[Any, ...], extra: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        tags: Dict[str, Any] = {'__loc': row[1]}
+        for (tag, _column, is_list), value in zip(_COLUMNS, row[2:-1]):
+            if value is not None:
+                tags[tag] = [value] if is_list else value
+        if extra:
+            tags.update(extra)
+        return tags
+
+    @staticmethod
+    def __row_to_attrs(row: Tuple[Any, ...]) -> Dict[str, Any]:
+        attrs = row[-1]
+        if attrs is None:
+            return {}
+        return pickle.loads(attrs)
+
+
+def _is_single_string(value: Any) -> bool:
+    return isinstance(value, list) and len(value) == 1 and type(value[0]) is str
@@ -171,7 +171,7 @@ class CoverManager(GObject.Object):
 
         outstanding = []
         # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
+        get_cover_thumbnail = COVER_MANAGER.get_cover_thumbnail
         default_cover_pixbuf = self.default_cover_pixbuf
         cover_size = self.cover_size
 
@@ -179,7 +179,9 @@ class CoverManager(GObject.Object):
             if self.stopper.is_set():
                 return
 
-            cover_data = get_cover(self.album_tracks[album][0], set_only=True)
+            cover_data = get_cover_thumbnail(
+                self.album_tracks[album][0], max(cover_size), set_only=True
+            )
             cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
 
             try:
@@ -205,16 +207,15 @@ class CoverManager(GObject.Object):
         """
         self.emit('fetch-started', len(self.outstanding))
 
-        # Speed up the following loop
-        get_cover = COVER_MANAGER.get_cover
-        save = COVER_MANAGER.save
-
-        for i, album in enumerate(self.outstanding[:]):
-            if self.stopper.is_set():
-                # Allow for "fetch-completed" signal to be emitted
-                break
+        albums = {self.album_tracks[album][0]: album for album in self.outstanding}
+        # Stops early when the stopper is set; "fetch-completed" is still
+        # emitted below
+        results = COVER_MANAGER.get_covers(
+            list(albums), max(self.cover_size), self.stopper
+        )
 
-            cover_data = get_cover(self.album_tracks[album][0], save_cover=True)
+        for i, (track, cover_data) in enumerate(results):
+            album = albums[track]
             cover_pixbuf = pixbuf_from_data(cover_data) if cover_data else None
 
             self.emit('fetch-progress', i + 1)
@@ -225,13 +226,6 @@ class CoverManager(GObject.Object):
             self.outstanding.remove(album)
             self.emit('cover-fetched', album, cover_pixbuf)
 
-            if i % 50 == 0:
-                logger.debug('Saving cover database')
-                save()
-
-        logger.debug('Saving cover database')
-        save()
-
         self.emit('fetch-completed', len(self.outstanding))
 
     def show_cover(self):
@@ -376,7 +370,9 @@ class CoverManager(GObject.Object):
 
         if path:
             album = self.model[path][0]
-            pixbuf = pixbuf_from_data(cover_data)
+            pixbuf = pixbuf_from_data(
+                COVER_MANAGER.get_thumbnail(cover_data, max(self.cover_size))
+            )
 
             self.emit('cover-fetched', album, pixbuf)
 
@@ -743,7 +739,7 @@ class CoverWidget(Gtk.EventBox):
             return
 
         width = settings.get_option('gui/cover_width', 100)
-        pixbuf = pixbuf_from_data(cover_data, (width, width))
+        pixbuf = pixbuf_from_data(COVER_MANAGER.get_thumbnail(cover_data, width))
         self.image.set_from_pixbuf(pixbuf)
         self.set_drag_source_enabled(True)
         self.cover_data = cover_data
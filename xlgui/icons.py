@@ -745,7 +745,9 @@ class IconManager:
         )
         get_cover_for_tracks = covers.MANAGER.get_cover_for_tracks
         db_string_list = []
-        cover_for_tracks = lambda tracks: get_cover_for_tracks(tracks, db_string_list)
+        cover_for_tracks = lambda tracks: get_cover_for_tracks(
+            tracks, db_string_list, cover_width
+        )
         filtered_covers = filter(
             None, map(cover_for_tracks, tracks)
         )  # Remove None cover tracks
@@ -58,6 +58,43 @@ def first_meaningful_char(s):
         return '_'
 
 
+def _bisect_right(items, key, keyfunc):
+    """
+    Like bisect.bisect_right, but compares keyfunc(item) with key
+    """
+    lo = 0
+    hi = len(items)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key < keyfunc(items[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class _CollectionNode:
+    """
+    A row of the collection tree: the tracks shown under it, and its child
+    rows once they have been grouped.
+
+    Nodes are stored in the last column of the tree model, so expanding a
+    row or getting its tracks doesn't need to search the collection.
+    """
+
+    __slots__ = ['sort_key', 'value', 'query', 'char', 'tracks', 'children']
+
+    def __init__(self, sort_key, value, query, char):
+        self.sort_key = sort_key
+        self.value = value
+        self.query = query
+        self.char = char
+        # location -> SearchResultTrack
+        self.tracks = {}
+        # list of _CollectionNode, or None if not grouped yet
+        self.children = None
+
+
 class Order:
     """
     An Order represents a structure for arranging Tracks into the
@@ -118,6 +155,9 @@ class Order:
     def format_track(self, level, track):
         return self.__formatters[level].format(track)
 
+    def format_tracks(self, level, tracks):
+        return self.__formatters[level].format_many(tracks)
+
 
 DEFAULT_ORDERS = [
     # fmt: off
@@ -174,6 +214,10 @@ class CollectionPanel(panel.Panel):
 
     ui_info = ('collection.ui', 'CollectionPanel')
 
+    #: Reload the whole tree instead of updating it when more tracks than
+    #: this have changed at once
+    INCREMENTAL_UPDATE_LIMIT = 1000
+
     def __init__(
         self,
         parent,
@@ -211,6 +255,10 @@ class CollectionPanel(panel.Panel):
         self.order = None
         self.tracks = []
         self.sorted_tracks = []
+        self._changed_locs = set()
+        self._root_node = _CollectionNode(None, None, None, None)
+        self._top_nodes = None
+        self._track_nodes = {}
 
         event.add_ui_callback(
             self._check_collection_empty, 'libraries_modified', collection
@@ -271,7 +319,7 @@ class CollectionPanel(panel.Panel):
             }
         )
         self.tree.connect('key-release-event', self.on_key_released)
-        event.add_ui_callback(self.refresh_tags_in_tree, 'track_tags_changed')
+        event.add_ui_batch_callback(self.refresh_tags_in_tree, 'track_tags_changed')
         event.add_ui_callback(
             self.refresh_tracks_in_tree, 'tracks_added', self.collection
         )
@@ -428,7 +476,8 @@ class CollectionPanel(panel.Panel):
             (lambda m, i, d: m.get_value(i, 1) is None), None
         )
 
-        self.model = Gtk.TreeStore(GdkPixbuf.Pixbuf, str, object)
+        # image, text, search query, _CollectionNode
+        self.model = Gtk.TreeStore(GdkPixbuf.Pixbuf, str, object, object)
 
         self.tree.connect("row-expanded", self.on_expanded)
 
@@ -436,11 +485,10 @@ class CollectionPanel(panel.Panel):
         """
         finds tracks matching a given iter.
         """
-        self.load_subtree(iter)
-        search = self.get_node_search_terms(iter)
-        matcher = trax.TracksMatcher(search)
-        srtrs = trax.search_tracks(self.tracks, [matcher])
-        return [x.track for x in srtrs]
+        node = self.model.get_value(iter, 3)
+        if node is None:
+            return []
+        return [srtr.track for srtr in node.tracks.values()]
 
     def append_to_playlist(self, item=None, event=None, replace=False):
         """
@@ -489,31 +537,172 @@ class CollectionPanel(panel.Panel):
 
         return " ".join(queries)
 
-    def refresh_tags_in_tree(self, type, track, tags):
-        if (
-            settings.get_option('gui/sync_on_tag_change', True)
-            and bool(tags & self.order.all_sort_tags())
-            and self.collection.loc_is_member(track.get_loc_for_io())
-        ):
+    def refresh_tags_in_tree(self, type, events):
+        if not settings.get_option('gui/sync_on_tag_change', True):
+            return
+        sort_tags = self.order.all_sort_tags()
+        changed = False
+        for e in events:
+            loc = e.object.get_loc_for_io()
+            if e.data & sort_tags and self.collection.loc_is_member(loc):
+                self._changed_locs.add(loc)
+                changed = True
+        if changed:
             self._refresh_tags_in_tree()
 
     def refresh_tracks_in_tree(self, type, obj, loc):
+        self._changed_locs.update(loc)
         self._refresh_tags_in_tree()
 
     @common.glib_wait(500)
     def _refresh_tags_in_tree(self):
         """
         Callback for when tags have changed and the tree
-        needs reloading.
+        needs updating.
         """
         # Trying to reload while we're rescanning is really inefficient,
         # so we delay it until we're done scanning.
         if self.collection._scanning:
             return True
-        self.resort_tracks()
-        self.load_tree()
+        locs = self._changed_locs
+        self._changed_locs = set()
+        if not self._update_tree(locs):
+            self.resort_tracks()
+            self.load_tree()
         return False
 
+    def _update_tree(self, locs):
+        """
+        Applies added, removed and changed tracks to the loaded tree.
+
+        Only the top level rows that the tracks were or are now shown
+        under are replaced; expanded rows are expanded again.
+
+        :param locs: locations of the tracks that changed
+        :returns: False if the tree has to be reloaded instead
+        """
+        nodes = self._top_nodes
+        if nodes is None or len(locs) > self.INCREMENTAL_UPDATE_LIMIT:
+            return False
+        if not locs:
+            return True
+
+        tags = self.order.get_sort_tags(0)
+        bottom = len(self.order) == 1
+        matcher = trax.TracksMatcher(
+            self.keyword.strip(),
+            case_sensitive=False,
+            keyword_tags=self._get_keyword_tags(),
+        )
+
+        root = self._root_node
+        changed = set()
+        tracks = []
+        srtrs = []
+        for loc in locs:
+            root.tracks.pop(loc, None)
+            node = self._track_nodes.pop(loc, None)
+            if node is not None:
+                del node.tracks[loc]
+                changed.add(node)
+            track = self.collection.get_track_by_loc(loc)
+            if track is None:
+                continue
+            tracks.append(track)
+            srtr = trax.SearchResultTrack(track)
+            if matcher.match(srtr):
+                srtrs.append(srtr)
+
+        try:
+            self.sorted_tracks = self._merge_sorted(
+                self.sorted_tracks, locs, tracks, tags
+            )
+            self.tracks = self._merge_sorted(
+                self.tracks, locs, srtrs, tags, lambda srtr: srtr.track
+            )
+        except TypeError:  # sort values of different types
+            return False
+
+        values = self.order.format_tracks(0, [srtr.track for srtr in srtrs])
+        for srtr, value in zip(srtrs, values):
+            track = srtr.track
+            loc = track.get_loc_for_io()
+            query = self._get_node_query(track, tags, bottom)
+            node = nodes.get((query, value))
+            if node is None:
+                node = self._new_node(track, tags, value, query)
+                nodes[(query, value)] = node
+            root.tracks[loc] = srtr
+            node.tracks[loc] = srtr
+            self._track_nodes[loc] = node
+            changed.add(node)
+
+        # Remove the rows of changed nodes, and all separators; the
+        # remaining rows are those of the unchanged nodes, in order.
+        expanded = set()
+        iter = self.model.get_iter_first()
+        for node in root.children:
+            while iter is not None and self.model.get_value(iter, 1) is None:
+                if not self.model.remove(iter):
+                    iter = None
+            if iter is None or self.model.get_value(iter, 3) is not node:
+                logger.debug("Collection tree out of sync, reloading")
+                return False
+            if node in changed:
+                # Regrouped when expanded again
+                node.children = None
+                if self.tree.row_expanded(self.model.get_path(iter)):
+                    expanded.add(node)
+                if not self.model.remove(iter):
+                    iter = None
+            else:
+                iter = self.model.iter_next(iter)
+
+        order = [node for node in root.children if node not in changed]
+        try:
+            for node in changed:
+                if node.tracks:
+                    pos = _bisect_right(order, node.sort_key, lambda n: n.sort_key)
+                    order.insert(pos, node)
+                else:
+                    del nodes[(node.query, node.value)]
+        except TypeError:
+            return False
+        root.children = order
+
+        image = self._get_level_image(0)
+        display_counts = settings.get_option('gui/display_track_counts', True)
+        draw_seps = settings.get_option('gui/draw_separators', True)
+        last_char = None
+        to_expand = []
+        iter = self.model.get_iter_first()
+        for node in order:
+            if draw_seps and last_char is not None and node.char != last_char:
+                self.model.insert_before(None, iter, [None, None, None, None])
+            last_char = node.char
+            if node not in changed:
+                iter = self.model.iter_next(iter)
+                continue
+            row = self._insert_node_row(None, iter, node, image, bottom, display_counts)
+            if node in expanded:
+                to_expand.append(row)
+
+        for row in to_expand:
+            self.tree.expand_row(self.model.get_path(row), False)
+        return True
+
+    @staticmethod
+    def _merge_sorted(items, locs, new_items, tags, trackfunc=lambda tr: tr):
+        """
+        Replaces the items for `locs` in a list sorted by `tags` with
+        `new_items`, keeping it sorted
+        """
+        items = [item for item in items if trackfunc(item).get_loc_for_io() not in locs]
+        keyfunc = lambda item: [trackfunc(item).get_tag_sort(t) for t in tags]
+        for item in new_items:
+            items.insert(_bisect_right(items, keyfunc(item), keyfunc), item)
+        return items
+
     def resort_tracks(self):
         # import time
         # print("sorting...", time.clock())
@@ -535,6 +724,9 @@ class CollectionPanel(panel.Panel):
         self.model.clear()
 
         self.root = None
+        self._root_node = _CollectionNode(None, None, None, None)
+        self._top_nodes = None
+        self._track_nodes = {}
         oldorder = self.order
         self.order = self.orders[self.choice.get_active()]
 
@@ -545,22 +737,48 @@ class CollectionPanel(panel.Panel):
         settings.set_option('gui/collection_active_view', self.choice.get_active())
 
         keyword = self.keyword.strip()
-        tags = list(SEARCH_TAGS)
-        tags += self.order.all_search_tags()
-        tags = list(set(tags))  # uniquify list to speed up search
-
-        self.tracks = list(
-            trax.search_tracks_from_string(
-                self.sorted_tracks, keyword, case_sensitive=False, keyword_tags=tags
+        tags = self._get_keyword_tags()
+
+        if keyword:
+            # Searching the collection only looks at the tracks the tag index
+            # finds, so sort the results instead of filtering sorted_tracks
+            self.tracks = trax.sort_result_tracks(
+                self.order.get_sort_tags(0),
+                trax.search_tracks_from_string(
+                    self.collection, keyword, case_sensitive=False, keyword_tags=tags
+                ),
             )
-        )
+        else:
+            self.tracks = [trax.SearchResultTrack(tr) for tr in self.sorted_tracks]
+        self._root_node.tracks = {
+            srtr.track.get_loc_for_io(): srtr for srtr in self.tracks
+        }
 
         self.load_subtree(None)
+        self._index_top_nodes()
 
         self.tree.set_model(self.model)
 
         self.emit('collection-tree-loaded')
 
+    def _get_keyword_tags(self):
+        """
+        :returns: the tags that search keywords are matched against
+        """
+        tags = list(SEARCH_TAGS)
+        tags += self.order.all_search_tags()
+        return list(set(tags))  # uniquify list to speed up search
+
+    @staticmethod
+    def _get_node_query(track, tags, bottom):
+        """
+        :returns: the search query of the row that shows `track`
+        """
+        match_query = " ".join([track.get_tag_search(t, format=True) for t in tags])
+        if bottom:
+            match_query += " " + track.get_tag_search("__loc", format=True)
+        return match_query
+
     def _expand_node_by_name(self, search_num, parent, name, rest=None):
         """
         Recursive function to expand all nodes in a hierarchical list of
@@ -591,59 +809,64 @@ class CollectionPanel(panel.Panel):
             item = rest.pop(0)
             GLib.idle_add(self._expand_node_by_name, search_num, parent, item, rest)
 
-    def load_subtree(self, parent):
+    def _index_top_nodes(self):
         """
-        Loads all the sub nodes for a specified node
-
-        @param node: the node
+        Remembers which top level node shows each track, for _update_tree
         """
-        previously_loaded = False  # was the subtree already loaded
-        iter_sep = None
-        if parent is None:
-            depth = 0
-        else:
-            if (
-                self.model.iter_n_children(parent) != 1
-                or self.model.get_value(self.model.iter_children(parent), 1) is not None
-            ):
-                previously_loaded = True
-            iter_sep = self.model.iter_children(parent)
-            depth = self.model.iter_depth(parent) + 1
-        if previously_loaded:
+        if self._root_node.children is None:
             return
+        nodes = {}
+        track_nodes = {}
+        for node in self._root_node.children:
+            key = (node.query, node.value)
+            if key in nodes:
+                # Rows can't be told apart, so updates need a reload
+                return
+            nodes[key] = node
+            for loc in node.tracks:
+                track_nodes[loc] = node
+        self._top_nodes = nodes
+        self._track_nodes = track_nodes
 
-        search = self.get_node_search_terms(parent)
+    @staticmethod
+    def _new_node(track, tags, value, query):
+        return _CollectionNode(
+            [track.get_tag_sort(t) for t in tags],
+            value,
+            query,
+            first_meaningful_char(track.get_tag_sort(tags[0])),
+        )
 
+    def _get_level_image(self, depth):
         try:
-            tags = self.order.get_sort_tags(depth)
-            matchers = [trax.TracksMatcher(search)]
-            srtrs = trax.search_tracks(self.tracks, matchers)
-            # sort only if we are not on top level, because tracks are
-            # already sorted by fist order
-            if depth > 0:
-                srtrs = trax.sort_result_tracks(tags, srtrs)
-        except IndexError:
-            return  # at the bottom of the tree
-        try:
-            image = getattr(self, "%s_image" % tags[-1])
+            return getattr(self, "%s_image" % self.order.get_sort_tags(depth)[-1])
         except Exception:
-            image = None
-        bottom = False
-        if depth == len(self.order) - 1:
-            bottom = True
+            return None
 
-        display_counts = settings.get_option('gui/display_track_counts', True)
-        draw_seps = settings.get_option('gui/draw_separators', True)
-        last_char = ''
+    def _get_child_nodes(self, node, depth):
+        """
+        Groups the tracks of a node into the nodes of the next level
+
+        :param node: the parent node
+        :param depth: the depth of the child nodes
+        :returns: the child nodes, in display order
+        """
+        if node.children is not None:
+            return node.children
+
+        tags = self.order.get_sort_tags(depth)
+        srtrs = node.tracks.values()
+        # sort only if we are not on top level, because tracks are
+        # already sorted by fist order
+        if depth > 0:
+            srtrs = trax.sort_result_tracks(tags, srtrs)
+        bottom = depth == len(self.order) - 1
+
+        children = []
         last_val = ''
         last_dval = ''
         last_matchq = ''
-        count = 0
-        first = True
-        path = None
-        expanded = False
-        to_expand = []
-
+        child = None
         for srtr in srtrs:
             # The value returned by get_tag_sort() may be of other
             # typa than str (e.g., an int for track number), hence
@@ -652,11 +875,7 @@ class CollectionPanel(panel.Panel):
             stagval = " ".join(stagvals)
             if last_val != stagval or bottom:
                 tagval = self.order.format_track(depth, srtr.track)
-                match_query = " ".join(
-                    [srtr.track.get_tag_search(t, format=True) for t in tags]
-                )
-                if bottom:
-                    match_query += " " + srtr.track.get_tag_search("__loc", format=True)
+                match_query = self._get_node_query(srtr.track, tags, bottom)
 
                 # Different *sort tags can cause stagval to not match
                 # but the below code will produce identical entries in
@@ -664,69 +883,97 @@ class CollectionPanel(panel.Panel):
                 # that new entries are added if and only if they will
                 # display different results, avoiding that problem.
                 if match_query != last_matchq or tagval != last_dval or bottom:
-                    if display_counts and path and not bottom:
-                        iter = self.model.get_iter(path)
-                        val = self.model.get_value(iter, 1)
-                        val = "%s (%s)" % (val, count)
-                        self.model.set_value(iter, 1, val)
-                        count = 0
-
                     last_val = stagval
                     last_dval = tagval
-                    if depth == 0 and draw_seps:
-                        val = srtr.track.get_tag_sort(tags[0])
-                        char = first_meaningful_char(val)
-                        if first:
-                            last_char = char
-                        else:
-                            if char != last_char and last_char != '':
-                                self.model.append(parent, [None, None, None])
-                            last_char = char
-                    first = False
-
                     last_matchq = match_query
-                    iter = self.model.append(parent, [image, tagval, match_query])
-                    path = self.model.get_path(iter)
-                    expanded = False
-                    if not bottom:
-                        self.model.append(iter, [None, None, None])
-            count += 1
-            if not expanded:
-                alltags = []
-                for i in range(depth + 1, len(self.order)):
-                    alltags.extend(self.order.get_sort_tags(i))
-                for t in alltags:
-                    if t in srtr.on_tags:
-                        # keep original path intact for following block
-                        newpath = path
-                        if depth > 0:
-                            # for some reason, nested iters are always
-                            # off by one in the terminal entry.
-                            newpath = Gtk.TreePath.new_from_indices(
-                                newpath[:-1] + [newpath[-1] - 1]
-                            )
-                        to_expand.append(newpath)
-                        expanded = True
-
-        if display_counts and path and not bottom:
-            iter = self.model.get_iter(path)
-            val = self.model.get_value(iter, 1)
-            val = "%s (%s)" % (val, count)
-            self.model.set_value(iter, 1, val)
-            count = 0
-
-        if (
-            settings.get_option("gui/expand_enabled", True)
-            and len(to_expand) < settings.get_option("gui/expand_maximum_results", 100)
-            and len(self.keyword.strip())
-            >= settings.get_option("gui/expand_minimum_term_length", 2)
-        ):
-            for row in to_expand:
-                GLib.idle_add(self.tree.expand_row, row, False)
+                    child = self._new_node(srtr.track, tags, tagval, match_query)
+                    children.append(child)
+            child.tracks[srtr.track.get_loc_for_io()] = srtr
+
+        node.children = children
+        return children
+
+    def _insert_node_row(self, parent, sibling, node, image, bottom, display_counts):
+        """
+        Adds the row of a node before `sibling`, or at the end if
+        `sibling` is None
+
+        :returns: the new row
+        """
+        text = node.value
+        if display_counts and not bottom:
+            text = "%s (%s)" % (text, len(node.tracks))
+        iter = self.model.insert_before(
+            parent, sibling, [image, text, node.query, node]
+        )
+        if not bottom:
+            self.model.append(iter, [None, None, None, None])
+        return iter
+
+    def load_subtree(self, parent):
+        """
+        Loads all the sub nodes for a specified node
+
+        @param node: the node
+        """
+        iter_sep = None
+        if parent is None:
+            node = self._root_node
+            depth = 0
+        else:
+            if (
+                self.model.iter_n_children(parent) != 1
+                or self.model.get_value(self.model.iter_children(parent), 1) is not None
+            ):
+                return  # the subtree was already loaded
+            iter_sep = self.model.iter_children(parent)
+            node = self.model.get_value(parent, 3)
+            depth = self.model.iter_depth(parent) + 1
+        if node is None or depth >= len(self.order):
+            return  # at the bottom of the tree
+
+        children = self._get_child_nodes(node, depth)
+        image = self._get_level_image(depth)
+        bottom = depth == len(self.order) - 1
+
+        display_counts = settings.get_option('gui/display_track_counts', True)
+        draw_seps = settings.get_option('gui/draw_separators', True)
+        last_char = None
+        rows = []
+
+        for child in children:
+            if depth == 0 and draw_seps:
+                if last_char is not None and child.char != last_char:
+                    self.model.append(parent, [None, None, None, None])
+                last_char = child.char
+            rows.append(
+                self._insert_node_row(
+                    parent, None, child, image, bottom, display_counts
+                )
+            )
 
         if iter_sep is not None:
             self.model.remove(iter_sep)
 
+        if settings.get_option("gui/expand_enabled", True) and len(
+            self.keyword.strip()
+        ) >= settings.get_option("gui/expand_minimum_term_length", 2):
+            # Expand the rows whose tracks matched the keywords on the tags
+            # of a lower level
+            alltags = []
+            for i in range(depth + 1, len(self.order)):
+                alltags.extend(self.order.get_sort_tags(i))
+            to_expand = [
+                row
+                for row, child in zip(rows, children)
+                if any(
+                    t in srtr.on_tags for srtr in child.tracks.values() for t in alltags
+                )
+            ]
+            if len(to_expand) < settings.get_option("gui/expand_maximum_results", 100):
+                for row in to_expand:
+                    GLib.idle_add(self.tree.expand_row, self.model.get_path(row), False)
+
 
 class CollectionDragTreeView(DragTreeView):
     """
@@ -795,10 +1042,7 @@ class CollectionDragTreeView(DragTreeView):
         :return: list of tracks [xl.trax.Track]
         """
         it = self.get_model().get_iter(path)
-        search = self.container.get_node_search_terms(it)
-        matcher = trax.TracksMatcher(search)
-        for i in trax.search_tracks(self.container.tracks, [matcher]):
-            yield i.track
+        yield from self.container._find_tracks(it)
 
 
 # vim: et sts=4 sw=4
@@ -474,7 +474,7 @@ class PlaylistsPanel(panel.Panel, BasePlaylistPanelMixin):
         )
 
     def _connect_events(self):
-        event.add_ui_callback(self.refresh_playlists, 'track_tags_changed')
+        event.add_ui_batch_callback(self.refresh_playlists, 'track_tags_changed')
         event.add_ui_callback(
             self._on_playlist_added, 'playlist_added', self.playlist_manager
         )
@@ -486,15 +486,14 @@ class PlaylistsPanel(panel.Panel, BasePlaylistPanelMixin):
         if isinstance(pl, SmartPlaylist):
             self.edit_selected_smart_playlist()
 
-    def refresh_playlists(self, type, track, tags):
+    def refresh_playlists(self, type, events):
         """
         wrapper so that multiple events dont cause multiple
         reloads in quick succession
         """
-        if settings.get_option('gui/sync_on_tag_change', True) and tags & {
-            'title',
-            'artist',
-        }:
+        if settings.get_option('gui/sync_on_tag_change', True) and any(
+            e.data & {'title', 'artist'} for e in events
+        ):
             self._refresh_playlists()
 
     @common.glib_wait(500)
@@ -42,7 +42,7 @@ from gi.repository import Pango
 
 from xl.nls import gettext as _
 from xl.metadata import CoverImage
-from xl import common, settings, trax, xdg
+from xl import common, event, settings, trax, xdg
 
 from xlgui.widgets import dialogs
 from xlgui.guiutil import GtkTemplate
@@ -406,7 +406,8 @@ class TrackPropertiesDialog(GObject.Object):
                 if response != Gtk.ResponseType.YES:
                     return
 
-            self._tags_write(modified)
+            with event.batch():
+                self._tags_write(modified)
 
             del self.trackdata
             del self.trackdata_original
@@ -31,6 +31,7 @@ from gi.repository import GObject
 from gi.repository import Gtk
 from gi.repository import Pango
 
+import collections
 import logging
 import sys
 
@@ -1173,7 +1174,13 @@ class PlaylistView(AutoScrollTreeView, providers.ProviderHandler):
         self.queue_draw()
 
     def _setup_models(self):
-        self.model = PlaylistModel(self.playlist, [], self.player, self)
+        if len(self.playlist) >= settings.get_option(
+            'gui/virtual_playlist_model_threshold', 5000
+        ):
+            model_class = VirtualPlaylistModel
+        else:
+            model_class = PlaylistModel
+        self.model = model_class(self.playlist, [], self.player, self)
         self.__setup_model_hook = self.model.connect(
             'data-loading', self._on_after_model_loading
         )
@@ -1808,10 +1815,13 @@ class PlaylistView(AutoScrollTreeView, providers.ProviderHandler):
         )
 
 
-class PlaylistModel(Gtk.ListStore):
+class _PlaylistModelBase:
     """
-    This ListStore contains all the information needed to render a playlist
-    via a PlaylistView. There are five columns:
+    What PlaylistModel and VirtualPlaylistModel have in common: the
+    columns, the playlist and player events they follow, and the way rows
+    are rendered.
+
+    There are five columns:
 
     * xl.trax.Track
     * dictionary (tag cache)
@@ -1828,11 +1838,6 @@ class PlaylistModel(Gtk.ListStore):
     columns are changed.
     """
 
-    __gsignals__ = {
-        # Called with true indicates starting operation, False ends op
-        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
-    }
-
     COL_TRACK = 0
     COL_CACHE = 1
     COL_PIXBUF = 2
@@ -1841,18 +1846,13 @@ class PlaylistModel(Gtk.ListStore):
 
     PARAM_COLS = (COL_PIXBUF, COL_SENSITIVE, COL_WEIGHT)
 
-    def __init__(self, playlist, column_names, player, parent):
-        # columns: Track, Pixbuf, dict (cache)
-        Gtk.ListStore.__init__(
-            self, object, object, GdkPixbuf.Pixbuf, bool, Pango.Weight
-        )
+    def _init_model(self, playlist, column_names, player, parent):
         self.playlist = playlist
         self.player = player
 
         self._set_columns(column_names)
 
         self.data_loading = False
-        self.data_load_queue = []
 
         self._redraw_timer = None
         self._redraw_queue = []
@@ -1902,16 +1902,13 @@ class PlaylistModel(Gtk.ListStore):
             self.player,
             destroy_with=parent,
         )
-        event.add_ui_callback(
+        event.add_ui_batch_callback(
             self.on_track_tags_changed, "track_tags_changed", destroy_with=parent
         )
 
         event.add_ui_callback(self.on_option_set, "gui_option_set", destroy_with=parent)
 
         self._setup_icons()
-        self.on_tracks_added(
-            None, self.playlist, list(enumerate(self.playlist))
-        )  # populate the list
 
     def _set_columns(self, column_names):
         self.column_names = set(column_names)
@@ -1958,15 +1955,6 @@ class PlaylistModel(Gtk.ListStore):
             self.pause_stop_pixbuf = self.pause_stop_pixbuf.scale_simple(s, s, t)
             self.clear_pixbuf = self.clear_pixbuf.scale_simple(s, s, t)
 
-    def _refresh_icons(self):
-        self._setup_icons()
-        itr = self.get_iter_first()
-        position = 0
-        while itr:
-            self.set(itr, self.PARAM_COLS, self._compute_row_params(position))
-            itr = self.iter_next(itr)
-            position += 1
-
     def on_option_set(self, typ, obj, data):
         if data == "gui/playlist_font":
             self._refresh_icons()
@@ -2016,6 +2004,61 @@ class PlaylistModel(Gtk.ListStore):
 
         return pixbuf, sensitive, weight
 
+    def on_playback_state_change(self, event_type, player_obj, track):
+        position = self.playlist.current_position
+        if position < 0 or position >= len(self):
+            return
+        self.update_row_params(position)
+
+    def on_track_tags_changed(self, type, events):
+        if not settings.get_option('gui/sync_on_tag_change', True):
+            return
+        column_names = self.column_names
+        tracks = [e.object for e in events if e.object and e.data & column_names]
+        if not tracks:
+            return
+
+        if self._redraw_timer:
+            GLib.source_remove(self._redraw_timer)
+        self._redraw_queue.extend(tracks)
+        self._redraw_timer = GLib.timeout_add(100, self._on_track_tags_changed)
+
+
+class PlaylistModel(_PlaylistModelBase, Gtk.ListStore):
+    """
+    This ListStore contains all the information needed to render a playlist
+    via a PlaylistView; see _PlaylistModelBase for its columns.
+    """
+
+    __gsignals__ = {
+        # Called with true indicates starting operation, False ends op
+        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
+    }
+
+    def __init__(self, playlist, column_names, player, parent):
+        # columns: Track, Pixbuf, dict (cache)
+        Gtk.ListStore.__init__(
+            self, object, object, GdkPixbuf.Pixbuf, bool, Pango.Weight
+        )
+        self.data_load_queue = []
+        # Track -> iters of the rows showing it. ListStore iters stay valid
+        # until their row is removed.
+        self._track_rows = {}
+        self._init_model(playlist, column_names, player, parent)
+
+        self.on_tracks_added(
+            None, self.playlist, list(enumerate(self.playlist))
+        )  # populate the list
+
+    def _refresh_icons(self):
+        self._setup_icons()
+        itr = self.get_iter_first()
+        position = 0
+        while itr:
+            self.set(itr, self.PARAM_COLS, self._compute_row_params(position))
+            itr = self.iter_next(itr)
+            position += 1
+
     def update_row_params(self, position):
         itr = self.iter_nth_child(None, position)
         if itr is not None:
@@ -2030,7 +2073,24 @@ class PlaylistModel(Gtk.ListStore):
         for position, track in reversed(tracks):
             if position < 0:
                 continue
-            self.remove(self.iter_nth_child(None, position))
+            itr = self.iter_nth_child(None, position)
+            self._forget_row(itr)
+            self.remove(itr)
+
+    def _forget_row(self, itr):
+        """
+        Removes a row from the track index
+        """
+        track = self.get_value(itr, self.COL_TRACK)
+        rows = self._track_rows.get(track)
+        if not rows:
+            return
+        for i, row in enumerate(rows):
+            if row.user_data == itr.user_data:
+                del rows[i]
+                break
+        if not rows:
+            del self._track_rows[track]
 
     def on_current_position_changed(self, event_type, playlist, positions):
         for position in positions:
@@ -2039,50 +2099,42 @@ class PlaylistModel(Gtk.ListStore):
             self.update_row_params(position)
 
     def on_spat_position_changed(self, event_type, playlist, positions):
-        pos = min(positions)
+        if self.playlist is not self.player.queue.current_playlist:
+            # Only the stop icons change
+            for position in positions:
+                if position >= 0:
+                    self.update_row_params(position)
+            return
 
+        # Rows are insensitive from the SPAT position on, so the rows
+        # between the old and the new position change, or all rows after
+        # the position if there was none before or there is none now.
+        pos = min(positions)
         if pos < 0:
-            pos = 0
-            itr = self.get_iter_first()
+            pos = max(positions)
+            end = None
         else:
-            itr = self.iter_nth_child(None, pos)
+            end = max(positions) + 1
+        if pos < 0:
+            return
 
-        while itr:
+        itr = self.iter_nth_child(None, pos)
+        while itr and (end is None or pos < end):
             self.set(itr, self.PARAM_COLS, self._compute_row_params(pos))
             itr = self.iter_next(itr)
             pos += 1
 
-    def on_playback_state_change(self, event_type, player_obj, track):
-        position = self.playlist.current_position
-        if position < 0 or position >= len(self):
-            return
-        self.update_row_params(position)
-
-    def on_track_tags_changed(self, type, track, tags):
-        if (
-            not track
-            or not settings.get_option('gui/sync_on_tag_change', True)
-            or not (tags & self.column_names)
-        ):
-            return
-
-        if self._redraw_timer:
-            GLib.source_remove(self._redraw_timer)
-        self._redraw_queue.append(track)
-        self._redraw_timer = GLib.timeout_add(100, self._on_track_tags_changed)
-
     def _on_track_tags_changed(self):
         self._redraw_timer = None
         redraw_queue = set(self._redraw_queue)
         self._redraw_queue = []
 
-        COL_TRACK = self.COL_TRACK
         COL_CACHE = self.COL_CACHE
 
-        for row in self:
-            if row[COL_TRACK] in redraw_queue:
-                row[COL_CACHE].clear()
-                self.row_changed(row.path, row.iter)
+        for track in redraw_queue:
+            for itr in self._track_rows.get(track, ()):
+                self.get_value(itr, COL_CACHE).clear()
+                self.row_changed(self.get_path(itr), itr)
 
     #
     # Loading data into the playlist:
@@ -2126,8 +2178,10 @@ class PlaylistModel(Gtk.ListStore):
         ]
 
     def _load_data_done(self, render_data):
+        track_rows = self._track_rows
         for args in render_data:
-            self.insert_with_valuesv(*args)
+            itr = self.insert_with_valuesv(*args)
+            track_rows.setdefault(args[2][0], []).append(itr)
 
         self.data_loading = False
         self.emit('data-loading', False)
@@ -2137,3 +2191,216 @@ class PlaylistModel(Gtk.ListStore):
             self.data_load_queue = []
 
             self._load_data(tracks)
+
+
+class VirtualPlaylistModel(_PlaylistModelBase, GObject.Object, Gtk.TreeModel):
+    """
+    A PlaylistModel for very large playlists: instead of storing a row for
+    every track, it reads the tracks from a copy of the playlist's track
+    list and computes row data only when the view asks for it. Tag caches
+    are kept for at most RENDER_CACHE_SIZE tracks.
+
+    The copy of the track list is updated together with the row signals,
+    so that the model always matches what its views have been told.
+    """
+
+    __gsignals__ = {
+        # Never emitted, loading is immediate; for PlaylistModel compatibility
+        'data-loading': (GObject.SignalFlags.RUN_LAST, None, (GObject.TYPE_BOOLEAN,))
+    }
+
+    #: Number of tracks whose tag cache is kept
+    RENDER_CACHE_SIZE = 2000
+
+    _COLUMN_TYPES = (
+        GObject.TYPE_PYOBJECT,
+        GObject.TYPE_PYOBJECT,
+        GdkPixbuf.Pixbuf.__gtype__,
+        GObject.TYPE_BOOLEAN,
+        Pango.Weight.__gtype__,
+    )
+
+    def __init__(self, playlist, column_names, player, parent):
+        GObject.Object.__init__(self)
+        self._parent = parent
+        self._tracks = list(playlist)
+        # Track -> positions of its rows, built when needed
+        self._track_positions = None
+        self._caches = collections.OrderedDict()
+        self._init_model(playlist, column_names, player, parent)
+
+    ### Gtk.TreeModel implementation ###
+
+    # Iters store the row index plus one, as a zero user_data reads back
+    # as None.
+
+    def _new_iter(self, position):
+        iter = Gtk.TreeIter()
+        iter.user_data = position + 1
+        return iter
+
+    @staticmethod
+    def _get_position(iter):
+        return iter.user_data - 1
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.LIST_ONLY
+
+    def do_get_n_columns(self):
+        return len(self._COLUMN_TYPES)
+
+    def do_get_column_type(self, index):
+        return self._COLUMN_TYPES[index]
+
+    def do_get_iter(self, path):
+        position = path.get_indices()[0]
+        if 0 <= position < len(self._tracks):
+            return True, self._new_iter(position)
+        return False, None
+
+    def do_get_path(self, iter):
+        return Gtk.TreePath((self._get_position(iter),))
+
+    def do_get_value(self, iter, column):
+        position = self._get_position(iter)
+        track = self._tracks[position]
+        if column == self.COL_TRACK:
+            return track
+        if column == self.COL_CACHE:
+            return self._get_cache(track)
+        return self._compute_row_params(position)[column - self.COL_PIXBUF]
+
+    # These two change the iter they get, and only return whether there is
+    # a row; a tuple would always be true for GTK.
+
+    def do_iter_next(self, iter):
+        position = self._get_position(iter) + 1
+        if position < len(self._tracks):
+            iter.user_data = position + 1
+            return True
+        return False
+
+    def do_iter_previous(self, iter):
+        position = self._get_position(iter) - 1
+        if position >= 0:
+            iter.user_data = position + 1
+            return True
+        return False
+
+    def do_iter_children(self, parent):
+        if parent is None and self._tracks:
+            return True, self._new_iter(0)
+        return False, None
+
+    def do_iter_has_child(self, iter):
+        return False
+
+    def do_iter_n_children(self, iter):
+        if iter is None:
+            return len(self._tracks)
+        return 0
+
+    def do_iter_nth_child(self, parent, n):
+        if parent is None and 0 <= n < len(self._tracks):
+            return True, self._new_iter(n)
+        return False, None
+
+    def do_iter_parent(self, child):
+        return False, None
+
+    ### Row data ###
+
+    def _get_cache(self, track):
+        caches = self._caches
+        try:
+            cache = caches[track]
+        except KeyError:
+            cache = caches[track] = {}
+            if len(caches) > self.RENDER_CACHE_SIZE:
+                caches.popitem(last=False)
+        else:
+            caches.move_to_end(track)
+        return cache
+
+    def _get_track_positions(self):
+        """
+        :returns: a dict of track -> the positions of its rows
+        """
+        positions = self._track_positions
+        if positions is None:
+            positions = self._track_positions = {}
+            for position, track in enumerate(self._tracks):
+                positions.setdefault(track, []).append(position)
+        return positions
+
+    def _redraw(self):
+        """
+        Redraws the visible rows, after row data changed that can't change
+        which rows are visible
+        """
+        if isinstance(self._parent, Gtk.Widget):
+            self._parent.queue_draw()
+
+    def _refresh_icons(self):
+        self._setup_icons()
+        self._redraw()
+
+    def update_row_params(self, position):
+        if 0 <= position < len(self._tracks):
+            self.row_changed(Gtk.TreePath((position,)), self._new_iter(position))
+
+    ### Event callbacks to keep the model in sync with the playlist ###
+
+    def on_tracks_added(self, event_type, playlist, tracks):
+        for position, track in tracks:
+            if self._track_positions is not None:
+                if position == len(self._tracks):
+                    self._track_positions.setdefault(track, []).append(position)
+                else:
+                    # Positions after it change
+                    self._track_positions = None
+            self._tracks.insert(position, track)
+            self.row_inserted(Gtk.TreePath((position,)), self._new_iter(position))
+
+    def on_tracks_removed(self, event_type, playlist, tracks):
+        for position, track in reversed(tracks):
+            if position < 0:
+                continue
+            del self._tracks[position]
+            self._track_positions = None
+            self.row_deleted(Gtk.TreePath((position,)))
+
+    def on_current_position_changed(self, event_type, playlist, positions):
+        for position in positions:
+            self.update_row_params(position)
+
+    def on_spat_position_changed(self, event_type, playlist, positions):
+        if self.playlist is not self.player.queue.current_playlist:
+            # Only the stop icons change
+            for position in positions:
+                self.update_row_params(position)
+            return
+
+        # The rows between the old and the new position change their
+        # sensitivity, see PlaylistModel.on_spat_position_changed
+        pos = min(positions)
+        if pos < 0:
+            # All rows after the position change; row data is computed on
+            # demand, so redrawing the visible ones is enough
+            self._redraw()
+            return
+        for position in range(pos, max(positions) + 1):
+            self.update_row_params(position)
+
+    def _on_track_tags_changed(self):
+        self._redraw_timer = None
+        redraw_queue = set(self._redraw_queue)
+        self._redraw_queue = []
+
+        track_positions = self._get_track_positions()
+        for track in redraw_queue:
+            self._caches.pop(track, None)
+            # Tell the views about every changed row, as it may have to be
+            # filtered differently now
+            for position in track_positions.get(track, ()):
+                self.row_changed(Gtk.TreePath((position,)), self._new_iter(position))
@@ -49,7 +49,7 @@ class Column(Gtk.TreeViewColumn):
     display = ''
     menu_title = classproperty(lambda c: c.display)
     renderer = Gtk.CellRendererText
-    formatter = classproperty(lambda c: TrackFormatter('$%s' % c.name))
+    formatter = classproperty(lambda c: c._get_default_formatter())
     size = 10  # default size
     autoexpand = False  # whether to expand to fit space in Autosize mode
     datatype = str
@@ -158,6 +158,16 @@ class Column(Gtk.TreeViewColumn):
 
         cell.props.text = text
 
+    @classmethod
+    def _get_default_formatter(cls):
+        # One formatter per column class, so that its format is only
+        # compiled once
+        formatter = cls.__dict__.get('_default_formatter')
+        if formatter is None:
+            formatter = TrackFormatter('$%s' % cls.name)
+            cls._default_formatter = formatter
+        return formatter
+
     def __repr__(self):
         return '%s(%r, %r, %r)' % (
             self.__class__.__name__,